@@ -3,8 +3,10 @@ import os
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-import openai
 from services.database_services import ChatbotDataService, ChatbotLogService
+from services.llm_backend import get_llm_backend
+from services.blob_cache import blob_cache
+from services.snapshot_publisher import snapshot_publisher
 from azure.storage.blob import BlobServiceClient
 import uuid
 
@@ -13,51 +15,51 @@ class ChatbotService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        openai.api_key = self.openai_api_key
+        self.llm_backend = get_llm_backend()
+        self.openai_api_key = self.llm_backend.api_key
+        self.client = self.llm_backend.async_client()
         
         # Azure Blob Storage setup
         self.connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         self.container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "restaurant-data")
         self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
         
-    def _upload_data_to_blob(self, restaurant_id: int, data: Dict[str, Any]) -> str:
-        """Upload restaurant data to Azure Blob Storage"""
+    def _upload_data_to_blob(self, restaurant_id: int, data: Dict[str, Any], current_blob: str = None) -> str:
+        """Publish restaurant data to Azure Blob Storage, skipping the upload if it hasn't changed"""
         try:
             container_client = self.blob_service_client.get_container_client(self.container_name)
-            
-            # Create container if it doesn't exist
-            if not container_client.exists():
-                container_client.create_container()
-                
-            # Convert data to JSON string
-            json_data = json.dumps(data, indent=2)
-            
-            # Create a unique blob name based on restaurant ID and timestamp
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            blob_name = f"restaurant_{restaurant_id}/{timestamp}.json"
-            
-            # Upload JSON data to blob
-            blob_client = container_client.get_blob_client(blob_name)
-            blob_client.upload_blob(json_data, overwrite=True)
-            
+            blob_name, _ = snapshot_publisher.publish(container_client, restaurant_id, data, current_blob)
             return blob_name
             
         except Exception as e:
             print(f"Error uploading data to Azure Blob Storage: {str(e)}")
             return None
 
+    def _publish_in_background(self, restaurant_id: int, data: Dict[str, Any], current_blob: str = None):
+        """Publish restaurant data after the response, recording the new blob path when it changed"""
+        def record_blob_path(blob_name: str):
+            # Runs on a publisher thread, so it can't use the request's session
+            from config.database import SessionLocal
+            from database.models import Restaurant
+            db = SessionLocal()
+            try:
+                db.query(Restaurant).filter(Restaurant.id == restaurant_id).update(
+                    {Restaurant.blob_storage_path: blob_name}, synchronize_session=False
+                )
+                db.commit()
+            finally:
+                db.close()
+        
+        container_client = self.blob_service_client.get_container_client(self.container_name)
+        snapshot_publisher.publish_in_background(
+            container_client, restaurant_id, data, current_blob, on_published=record_blob_path
+        )
+
     def _download_data_from_blob(self, blob_path: str) -> Dict[str, Any]:
-        """Download restaurant data from Azure Blob Storage"""
+        """Get restaurant data from Azure Blob Storage, through the local snapshot cache"""
         try:
             container_client = self.blob_service_client.get_container_client(self.container_name)
-            blob_client = container_client.get_blob_client(blob_path)
-            
-            # Download blob content
-            downloaded_blob = blob_client.download_blob()
-            data = json.loads(downloaded_blob.readall())
-            
-            return data
+            return blob_cache.get(container_client, blob_path)
             
         except Exception as e:
             print(f"Error downloading data from Azure Blob Storage: {str(e)}")
@@ -71,20 +73,22 @@ class ChatbotService:
         if not restaurant_data:
             return None
         
-        # Upload data to Azure Blob Storage
-        blob_path = self._upload_data_to_blob(restaurant_id, restaurant_data)
-        
-        # Update restaurant record with blob path
         from database.models import Restaurant
         restaurant = self.db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
-        if restaurant and blob_path:
+        current_blob = restaurant.blob_storage_path if restaurant else None
+        
+        # Upload data to Azure Blob Storage (nothing is written if it hasn't changed)
+        blob_path = self._upload_data_to_blob(restaurant_id, restaurant_data, current_blob)
+        
+        # Update restaurant record with blob path
+        if restaurant and blob_path and blob_path != current_blob:
             restaurant.blob_storage_path = blob_path
             restaurant.updated_at = datetime.utcnow()
             self.db.commit()
             
         return blob_path
     
-    def generate_chatbot_response(self, restaurant_id: int, user_input: str, session_id: str = None) -> Dict[str, Any]:
+    async def generate_chatbot_response(self, restaurant_id: int, user_input: str, session_id: str = None) -> Dict[str, Any]:
         """Generate a response from the chatbot using ChatGPT API and restaurant data"""
         # Create session ID if not provided
         if not session_id:
@@ -109,8 +113,9 @@ class ChatbotService:
         # If no data in blob storage or failed to download, get fresh data from database
         if not restaurant_data:
             restaurant_data = ChatbotDataService.get_restaurant_chatbot_data(self.db, restaurant_id)
-            # Upload fresh data to blob storage
-            self._upload_data_to_blob(restaurant_id, restaurant_data)
+            # Publish fresh data to blob storage without holding up the response
+            if restaurant_data:
+                self._publish_in_background(restaurant_id, restaurant_data, restaurant.blob_storage_path)
             
         # Prepare context for ChatGPT
         restaurant_context = json.dumps(restaurant_data, indent=2)
@@ -135,8 +140,8 @@ class ChatbotService:
         """
         
         try:
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
+            # Call OpenAI API without blocking the event loop
+            response = await self.client.chat.completions.create(
                 model="gpt-4",  # or the model of your choice
                 messages=[
                     {"role": "system", "content": system_message},
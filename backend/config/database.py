@@ -1,12 +1,20 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from typing import Any, Dict, Optional
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
 # Database URL configuration
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
@@ -14,14 +22,125 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "restaurant_chatbot")
 
-# Construct the PostgreSQL database URL
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Construct the PostgreSQL database URL (DATABASE_URL overrides the individual settings)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection pool settings. Each process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections, so workers x that total must stay below Postgres max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Seconds before a connection is replaced
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))  # 0 disables the timeout
+# PgBouncer in transaction pooling mode rejects startup options and doesn't keep
+# session state, so the statement timeout is set per transaction instead
+DB_PGBOUNCER = _env_bool("DB_PGBOUNCER", False)
+DB_ECHO = _env_bool("DB_ECHO", False)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection, and how often they give up"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            # Only pool exhaustion; connect errors are not a sign the pool is too small
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+class QueryCounter:
+    """Counts the statements an engine executes (load tests report queries per request from it)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            self.count += 1
+
+def create_db_engine(url: Optional[str] = None, **overrides: Any) -> Engine:
+    """
+    Create an engine configured from the DB_* environment settings.
+
+    Args:
+        url: Database URL (defaults to DATABASE_URL)
+        overrides: Extra keyword arguments for create_engine
+
+    Returns:
+        Engine: Pooled engine with gauges available through pool_stats()
+    """
+    url = make_url(url or DATABASE_URL)
+    options: Dict[str, Any] = {"echo": DB_ECHO}
+
+    if url.get_backend_name() == "postgresql":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+    options.update(overrides)
+    new_engine = create_engine(url, **options)
+    new_engine.query_counter = QueryCounter()
+    event.listen(new_engine, "after_cursor_execute", new_engine.query_counter)
+
+    if url.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS and DB_PGBOUNCER:
+        @event.listens_for(new_engine, "begin")
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+    return new_engine
+
+def pool_stats(db_engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """Current connection pool gauges for an engine (defaults to the app engine)"""
+    db_engine = db_engine or engine
+    pool = db_engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if hasattr(db_engine, "query_counter"):
+        stats["queries"] = db_engine.query_counter.count
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0)
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                wait_max_ms=round(pool.wait_max * 1000, 3),
+                timeouts=pool.timeouts
+            )
+    return stats
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,  # Set to False in production
-)
+engine = create_db_engine()
 
 # Create a sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -35,4 +154,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
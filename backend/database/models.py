@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Table, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -46,6 +46,9 @@ class Restaurant(Base):
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     is_active = Column(Boolean, default=True)
     blob_storage_path = Column(String(512))  # Path to restaurant assets in Azure blob storage
+    context_token_budget = Column(Integer)  # Max prompt tokens for restaurant context (defaults to PROMPT_CONTEXT_TOKEN_BUDGET)
+    faq_match_threshold = Column(Float)  # Min score (0-1) to answer directly from an FAQ (defaults to FAQ_MATCH_THRESHOLD)
+    timezone = Column(String(64))  # IANA name, e.g. "America/Chicago" (defaults to RESTAURANT_TIMEZONE)
     
     # Relationships
     users = relationship("User", secondary=user_restaurant_association, back_populates="restaurants")
@@ -73,6 +76,10 @@ class Location(Base):
     longitude = Column(Float)
     is_primary = Column(Boolean, default=False)
     
+    __table_args__ = (
+        Index('ix_locations_restaurant_id', 'restaurant_id'),
+    )
+    
     # Relationships
     restaurant = relationship("Restaurant", back_populates="locations")
 
@@ -86,6 +93,10 @@ class OperatingHours(Base):
     close_time = Column(String(8), nullable=False)  # Format: "HH:MM:SS"
     is_closed = Column(Boolean, default=False)  # For handling days when restaurant is closed
     
+    __table_args__ = (
+        Index('ix_operating_hours_restaurant_day', 'restaurant_id', 'day_of_week'),
+    )
+    
     # Relationships
     restaurant = relationship("Restaurant", back_populates="hours")
 
@@ -100,9 +111,16 @@ class Menu(Base):
     end_time = Column(String(8))    # When this menu ends, format: "HH:MM:SS"
     is_active = Column(Boolean, default=True)
     
+    # Partial indexes only cover active rows, which is all the chatbot reads
+    __table_args__ = (
+        Index('ix_menus_restaurant_active', 'restaurant_id',
+              postgresql_where=(is_active == True), sqlite_where=(is_active == True)),
+    )
+    
     # Relationships
     restaurant = relationship("Restaurant", back_populates="menus")
-    categories = relationship("MenuCategory", back_populates="menu", cascade="all, delete-orphan")
+    categories = relationship("MenuCategory", back_populates="menu", cascade="all, delete-orphan",
+                              order_by="(MenuCategory.display_order, MenuCategory.id)")
 
 class MenuCategory(Base):
     __tablename__ = 'menu_categories'
@@ -113,9 +131,14 @@ class MenuCategory(Base):
     description = Column(Text)
     display_order = Column(Integer, default=0)
     
+    __table_args__ = (
+        Index('ix_menu_categories_menu_order', 'menu_id', 'display_order', 'id'),
+    )
+    
     # Relationships
     menu = relationship("Menu", back_populates="categories")
-    items = relationship("MenuItem", back_populates="category", cascade="all, delete-orphan")
+    items = relationship("MenuItem", back_populates="category", cascade="all, delete-orphan",
+                         order_by="(MenuItem.display_order, MenuItem.id)")
 
 class MenuItem(Base):
     __tablename__ = 'menu_items'
@@ -138,6 +161,11 @@ class MenuItem(Base):
     display_order = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     
+    __table_args__ = (
+        Index('ix_menu_items_category_active_order', 'category_id', 'display_order', 'id',
+              postgresql_where=(is_active == True), sqlite_where=(is_active == True)),
+    )
+    
     # Relationships
     category = relationship("MenuCategory", back_populates="items")
     ingredients = relationship("MenuItemIngredient", back_populates="menu_item", cascade="all, delete-orphan")
@@ -150,6 +178,10 @@ class MenuItemIngredient(Base):
     name = Column(String(255), nullable=False)
     is_allergen = Column(Boolean, default=False)
     
+    __table_args__ = (
+        Index('ix_menu_item_ingredients_menu_item_id', 'menu_item_id'),
+    )
+    
     # Relationships
     menu_item = relationship("MenuItem", back_populates="ingredients")
 
@@ -164,6 +196,12 @@ class FAQ(Base):
     display_order = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     
+    # Matches get_faqs_by_restaurant's filter and sort order
+    __table_args__ = (
+        Index('ix_faqs_restaurant_active_category_order', 'restaurant_id', 'category', 'display_order',
+              postgresql_where=(is_active == True), sqlite_where=(is_active == True)),
+    )
+    
     # Relationships
     restaurant = relationship("Restaurant", back_populates="faqs")
 
@@ -178,6 +216,18 @@ class ChatbotLog(Base):
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     feedback_rating = Column(Integer)  # Optional user feedback (1-5)
     feedback_text = Column(Text)
+    response_source = Column(String(20), default='llm')  # llm, cache (answer cache hit or shared in-flight call), faq, intent, too_large (refused)
+    match_score = Column(Float)  # Similarity score for cache and faq answers
+    model = Column(String(50))  # Model that generated the response (LLM turns only)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    upstream_ms = Column(Float)  # Time spent waiting on the completion API
+    total_ms = Column(Float)  # Time to answer the turn end to end
+    
+    __table_args__ = (
+        Index('ix_chatbot_logs_restaurant_timestamp', 'restaurant_id', 'timestamp'),
+        Index('ix_chatbot_logs_session_timestamp', 'session_id', 'timestamp'),
+    )
     
     # Relationships
     restaurant = relationship("Restaurant", back_populates="chatbot_logs")
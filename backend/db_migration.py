@@ -6,8 +6,10 @@ from datetime import datetime, time
 
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from config.database import create_db_engine
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 # Add this at the top of your db_migration.py file
 import logging
@@ -35,6 +37,41 @@ DB_NAME = os.getenv("DB_NAME")
 # Import database models
 from database.models import Base  # Make sure this imports all your model classes
 
+def add_missing_columns(engine):
+    """
+    Add model columns that existing tables don't have yet.
+    
+    create_all skips tables that already exist, so a column added to a model
+    later is added here with ALTER TABLE ... ADD COLUMN. Only additive
+    changes are made; existing rows get NULL (or the server default).
+    
+    Returns:
+        list: "table.column" for every column added
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise ValueError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default")
+                
+                # Rendered like create_all would: name, type, server default and nullability
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"))
+                added.append(f"{table.name}.{column.name}")
+                logger.info(f"Added column {table.name}.{column.name}")
+    
+    return added
+
 def create_database():
     """Create database tables if they don't exist"""
     logger.info(f"Starting database migration for database '{DB_NAME}'")
@@ -54,7 +91,7 @@ def create_database():
     
     try:
         # Create engine and connect to the database
-        engine = create_engine(DATABASE_URL)
+        engine = create_db_engine(DATABASE_URL)
         logger.info("Successfully connected to database")
         
         # Create all tables based on the models
@@ -62,12 +99,20 @@ def create_database():
         Base.metadata.create_all(bind=engine)
         logger.info("All database tables created successfully")
         
+        # create_all skips tables that already exist, so add any columns and indexes they are missing
+        added = add_missing_columns(engine)
+        logger.info(f"Added {len(added)} missing columns")
+        
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        logger.info("All database indexes created successfully")
+        
         # Create a session for testing
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db = SessionLocal()
         
         # Test the database connection
-        from sqlalchemy import text
         result = db.execute(text("SELECT 1")).fetchone()
         if result and result[0] == 1:
             logger.info("Database connection test successful")
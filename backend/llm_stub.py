@@ -0,0 +1,325 @@
+"""
+Local OpenAI-compatible chat completions server for offline and load testing.
+
+Speaks the POST /v1/chat/completions wire protocol, including streaming
+(Server-Sent Events, ending with "data: [DONE]"), so the apps run their real
+HTTP, serialization, retry and error paths against it. Upstream behavior is
+injected per request: time to first token with a long-tailed jitter, a token
+rate, 429 rate limiting with Retry-After, 500s, and requests that hang until
+the client times out. Select it with LLM_BACKEND=stub (see
+services/llm_backend.py).
+
+Usage:
+    python llm_stub.py --port 8100 --latency-ms 400 --jitter-ms 150 --tokens-per-second 60
+    python llm_stub.py --rate-limit-rate 0.05 --timeout-rate 0.01 --hang-seconds 90
+    LLM_BACKEND=stub uvicorn test_api:app --port 8000
+
+Settings can also be changed while running: POST /stub/settings {"rate_limit_rate": 0.2}
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", 300))  # Time to first token
+LLM_STUB_JITTER_MS = float(os.getenv("LLM_STUB_JITTER_MS", 0))  # Mean of the extra, exponentially distributed delay
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", 50))  # 0 means instant
+LLM_STUB_COMPLETION_TOKENS = int(os.getenv("LLM_STUB_COMPLETION_TOKENS", 40))
+LLM_STUB_RATE_LIMIT_RATE = float(os.getenv("LLM_STUB_RATE_LIMIT_RATE", 0))  # Share of requests answered with 429
+LLM_STUB_RETRY_AFTER = float(os.getenv("LLM_STUB_RETRY_AFTER", 1))  # Seconds, sent in the Retry-After header
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", 0))  # Share of requests answered with 500
+LLM_STUB_TIMEOUT_RATE = float(os.getenv("LLM_STUB_TIMEOUT_RATE", 0))  # Share of requests that hang
+LLM_STUB_HANG_SECONDS = float(os.getenv("LLM_STUB_HANG_SECONDS", 120))  # How long a hanging request stalls
+
+REPLY_WORDS = (
+    "Thanks for asking! Our kitchen is happy to help with that. Most dishes can be adjusted "
+    "for dietary needs, and our staff can walk you through today's specials when you visit."
+).split()
+
+class ChatMessage(BaseModel):
+    role: str
+    content: Optional[str] = None
+
+class StreamOptions(BaseModel):
+    include_usage: bool = False
+
+class ChatCompletionRequest(BaseModel):
+    model: str = "gpt-3.5-turbo"
+    messages: List[ChatMessage]
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    stream: bool = False
+    stream_options: Optional[StreamOptions] = None
+
+class StubSettings:
+    """Upstream behavior of the stub (adjustable at runtime through /stub/settings)"""
+
+    FIELDS = {
+        "latency_ms": float, "jitter_ms": float, "tokens_per_second": float, "completion_tokens": int,
+        "rate_limit_rate": float, "retry_after": float, "error_rate": float,
+        "timeout_rate": float, "hang_seconds": float
+    }
+
+    def __init__(self):
+        self.latency_ms = LLM_STUB_LATENCY_MS
+        self.jitter_ms = LLM_STUB_JITTER_MS
+        self.tokens_per_second = LLM_STUB_TOKENS_PER_SECOND
+        self.completion_tokens = LLM_STUB_COMPLETION_TOKENS
+        self.rate_limit_rate = LLM_STUB_RATE_LIMIT_RATE
+        self.retry_after = LLM_STUB_RETRY_AFTER
+        self.error_rate = LLM_STUB_ERROR_RATE
+        self.timeout_rate = LLM_STUB_TIMEOUT_RATE
+        self.hang_seconds = LLM_STUB_HANG_SECONDS
+
+    def update(self, values: Dict[str, Any]):
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown stub setting {name!r}")
+            setattr(self, name, self.FIELDS[name](value))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+class StubStats:
+    """Counts requests, injected failures and tokens so load tests can report on them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.streamed = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.rate_limited = 0
+            self.server_errors = 0
+            self.timed_out = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def started(self, stream: bool):
+        with self._lock:
+            self.requests += 1
+            self.streamed += int(stream)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def failed(self, kind: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def finished(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            self.in_flight -= 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "rate_limited": self.rate_limited,
+                "server_errors": self.server_errors,
+                "timed_out": self.timed_out,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens
+            }
+
+settings = StubSettings()
+stats = StubStats()
+
+app = FastAPI(title="OpenAI-compatible LLM stub")
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def reply_tokens(completion_tokens: int) -> List[str]:
+    return [REPLY_WORDS[n % len(REPLY_WORDS)] for n in range(completion_tokens)]
+
+def first_token_delay() -> float:
+    """Seconds before the first token under the current settings"""
+    delay = settings.latency_ms / 1000
+    if settings.jitter_ms > 0:
+        # Exponential jitter gives the long tail real upstream latency has
+        delay += random.expovariate(1000 / settings.jitter_ms)
+    return delay
+
+def token_interval() -> float:
+    return 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+def error_response(status_code: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None):
+    # Same error body shape as the OpenAI API, so the SDK raises its usual exception types
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+        headers=headers
+    )
+
+def injected_failure():
+    """Pick a failure to inject for this request, if any (rate limit, server error or hang)"""
+    roll = random.random()
+    if roll < settings.rate_limit_rate:
+        return "rate_limited"
+    roll -= settings.rate_limit_rate
+    if roll < settings.error_rate:
+        return "server_errors"
+    roll -= settings.error_rate
+    if roll < settings.timeout_rate:
+        return "timed_out"
+    return None
+
+def chunk(completion_id: str, created: int, model: str, delta: Dict[str, Any],
+          finish_reason: Optional[str] = None, usage: Optional[Dict[str, int]] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+        "usage": usage
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def stream_completion(request: ChatCompletionRequest, completion_id: str, created: int,
+                            prompt_tokens: int, completion_tokens: int):
+    try:
+        await asyncio.sleep(first_token_delay())
+        yield chunk(completion_id, created, request.model, {"role": "assistant", "content": ""})
+        for n, token in enumerate(reply_tokens(completion_tokens)):
+            if n:
+                await asyncio.sleep(token_interval())
+            yield chunk(completion_id, created, request.model, {"content": token if n == 0 else " " + token})
+        yield chunk(completion_id, created, request.model, {}, finish_reason="stop")
+        if request.stream_options and request.stream_options.include_usage:
+            yield chunk(completion_id, created, request.model, {}, usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            })
+        yield "data: [DONE]\n\n"
+    finally:
+        stats.finished(prompt_tokens, completion_tokens)
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatCompletionRequest):
+    prompt_tokens = sum(count_tokens(message.content or "") for message in request.messages)
+    completion_tokens = min(settings.completion_tokens, request.max_tokens or settings.completion_tokens)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    stats.started(request.stream)
+
+    failure = injected_failure()
+    if failure:
+        stats.failed(failure)
+        try:
+            if failure == "rate_limited":
+                return error_response(
+                    429, "Rate limit reached for requests", "requests",
+                    headers={"Retry-After": str(settings.retry_after)}
+                )
+            if failure == "server_errors":
+                return error_response(500, "The server had an error while processing your request", "server_error")
+            # Hang past the client's timeout, then fail in case it is still waiting
+            await asyncio.sleep(settings.hang_seconds)
+            return error_response(504, "Upstream request timed out", "timeout")
+        finally:
+            stats.finished()
+
+    if request.stream:
+        return StreamingResponse(
+            stream_completion(request, completion_id, created, prompt_tokens, completion_tokens),
+            media_type="text/event-stream"
+        )
+
+    try:
+        await asyncio.sleep(first_token_delay() + token_interval() * completion_tokens)
+    finally:
+        stats.finished(prompt_tokens, completion_tokens)
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": request.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(reply_tokens(completion_tokens))},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [
+        {"id": model, "object": "model", "created": 0, "owned_by": "llm-stub"} for model in ("gpt-3.5-turbo", "gpt-4")
+    ]}
+
+@app.get("/stub/stats")
+async def get_stats():
+    return {"settings": settings.as_dict(), "stats": stats.as_dict()}
+
+@app.post("/stub/stats/reset")
+async def reset_stats():
+    stats.reset()
+    return stats.as_dict()
+
+@app.post("/stub/settings")
+async def update_settings(values: Dict[str, float]):
+    try:
+        settings.update(values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return settings.as_dict()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=LLM_STUB_LATENCY_MS, help="Time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=LLM_STUB_JITTER_MS,
+                        help="Mean extra delay before the first token (exponentially distributed)")
+    parser.add_argument("--tokens-per-second", type=float, default=LLM_STUB_TOKENS_PER_SECOND,
+                        help="Completion token rate (0 for instant completions)")
+    parser.add_argument("--completion-tokens", type=int, default=LLM_STUB_COMPLETION_TOKENS,
+                        help="Tokens in each completion")
+    parser.add_argument("--rate-limit-rate", type=float, default=LLM_STUB_RATE_LIMIT_RATE,
+                        help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=LLM_STUB_RETRY_AFTER,
+                        help="Retry-After seconds sent with 429s")
+    parser.add_argument("--error-rate", type=float, default=LLM_STUB_ERROR_RATE,
+                        help="Share of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=LLM_STUB_TIMEOUT_RATE,
+                        help="Share of requests that hang until the client times out")
+    parser.add_argument("--hang-seconds", type=float, default=LLM_STUB_HANG_SECONDS,
+                        help="How long hanging requests stall")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible jitter and failures")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    settings.update({name: getattr(args, name) for name in StubSettings.FIELDS})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
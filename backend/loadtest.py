@@ -0,0 +1,388 @@
+"""
+End-to-end load test for the chat endpoints.
+
+Drives /api/chat (Flask main.py) or /api/chatbot (FastAPI test_api.py) with a
+fixed number of concurrent virtual users sending a weighted mix of guest
+questions, then writes a JSON report with throughput, latency percentiles,
+error rates, DB queries per request and LLM calls per request. Reports carry
+the git commit and full run configuration so runs can be compared over time
+(--compare prints the deltas against an earlier report).
+
+Run the apps against the local LLM stub so results measure our code rather
+than the upstream API:
+    python llm_stub.py --port 8100 &
+    LLM_BACKEND=stub RATE_LIMIT_ENABLED=false uvicorn test_api:app --port 8000 &
+    python loadtest.py --target fastapi --url http://127.0.0.1:8000 --stub-url http://127.0.0.1:8100 \\
+        --restaurants 1-100 --concurrency 32 --duration 60 --output reports/fastapi.json
+
+The FastAPI target needs restaurants in its database (see seedtest.py --synthetic).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+REPORT_VERSION = 1
+
+# Question mix: category -> weight and questions (weights follow what guests ask most)
+DEFAULT_MIX = {
+    "hours": {"weight": 25, "questions": [
+        "What time do you close today?", "Are you open on Sunday?", "What are your hours?", "Are you open now?"
+    ]},
+    "location": {"weight": 10, "questions": [
+        "Where are you located?", "What's your address?", "What is your phone number?"
+    ]},
+    "reservations": {"weight": 10, "questions": [
+        "Do you take reservations?", "Can I book a table for 6 on Friday?"
+    ]},
+    "faq": {"weight": 20, "questions": [
+        "Do you have parking?", "Do you have vegan options?", "Is there outdoor seating?", "Do you offer takeout?"
+    ]},
+    "menu": {"weight": 20, "questions": [
+        "What desserts do you have?", "Which dishes are gluten free?", "Is the curry spicy?", "Do you have a kids menu?"
+    ]},
+    "open_ended": {"weight": 15, "questions": [
+        "What do you recommend for a first visit?", "We're celebrating an anniversary, any suggestions?",
+        "What goes well with the salmon?", "I'm allergic to nuts, what can I eat?"
+    ]}
+}
+
+TARGETS = {
+    # Flask main.py: history kept server-side per session_id, like the FastAPI app
+    "flask": {"path": "/api/chat", "default_restaurants": "restaurant123,restaurant456", "db_stats": None},
+    # FastAPI test_api.py: the server keeps the session
+    "fastapi": {"path": "/api/chatbot", "default_restaurants": "1-10", "db_stats": "/api/db/pool-stats"}
+}
+
+def parse_restaurants(spec: str) -> List[Any]:
+    """Parse "1-100", "1,5,9" or "restaurant123,restaurant456" into a list of ids"""
+    restaurants: List[Any] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part and all(p.strip().isdigit() for p in part.split("-", 1)):
+            first, last = (int(p) for p in part.split("-", 1))
+            restaurants.extend(range(first, last + 1))
+        elif part.isdigit():
+            restaurants.append(int(part))
+        elif part:
+            restaurants.append(part)
+    return restaurants
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    values = sorted(latencies_ms)
+    return {
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(values[-1], 2) if values else 0.0
+    }
+
+class LoadTestResults:
+    """Collects per-request outcomes during the measured window"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.by_category: Dict[str, List[float]] = defaultdict(list)
+        self.by_source: Dict[str, List[float]] = defaultdict(list)
+        self.status_codes: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def record(self, category: str, elapsed_ms: float, status: Any, source: Optional[str] = None,
+               error: Optional[str] = None):
+        self.status_codes[str(status)] += 1
+        if error:
+            self.errors[error] += 1
+            return
+        self.latencies.append(elapsed_ms)
+        self.by_category[category].append(elapsed_ms)
+        if source:
+            self.by_source[source].append(elapsed_ms)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.status_codes.values())
+
+    def summary(self, elapsed_seconds: float) -> Dict[str, Any]:
+        requests = self.requests
+        errors = sum(self.errors.values())
+        return {
+            "requests": requests,
+            "successful": len(self.latencies),
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(len(self.latencies) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+            "latency_ms": latency_summary(self.latencies),
+            "status_codes": dict(self.status_codes),
+            "error_types": dict(self.errors),
+            "by_category": {name: {"requests": len(values), **latency_summary(values)}
+                            for name, values in sorted(self.by_category.items())},
+            "by_source": {name: {"requests": len(values), **latency_summary(values)}
+                          for name, values in sorted(self.by_source.items())}
+        }
+
+class VirtualUser:
+    """One guest holding a conversation of a few turns with one restaurant"""
+
+    def __init__(self, target: str, rng: random.Random, restaurants: List[Any], max_turns: int):
+        self.target = target
+        self.rng = rng
+        self.restaurants = restaurants
+        self.max_turns = max_turns
+        self.new_conversation()
+
+    def new_conversation(self):
+        self.restaurant_id = self.rng.choice(self.restaurants)
+        self.session_id = None  # Issued by the server on the first turn
+        self.turns_left = self.rng.randint(1, self.max_turns)
+
+    def payload(self, question: str) -> Dict[str, Any]:
+        if self.target == "flask":
+            return {"message": question, "restaurantId": self.restaurant_id, "session_id": self.session_id}
+        return {"restaurant_id": self.restaurant_id, "user_input": question, "session_id": self.session_id}
+
+    def answered(self, question: str, body: Dict[str, Any]):
+        self.session_id = body.get("session_id") or self.session_id
+        self.turns_left -= 1
+        if self.turns_left <= 0:
+            self.new_conversation()
+
+def choose_question(rng: random.Random, mix: Dict[str, Dict[str, Any]], cum_weights: List[float]):
+    category = rng.choices(list(mix), cum_weights=cum_weights)[0]
+    return category, rng.choice(mix[category]["questions"])
+
+async def fetch_json(client: httpx.AsyncClient, url: Optional[str]) -> Optional[Dict[str, Any]]:
+    """GET a stats endpoint, returning None if it isn't available"""
+    if not url:
+        return None
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+async def run_user(user_index: int, args, client: httpx.AsyncClient, results_ref: Dict[str, LoadTestResults],
+                   mix, cum_weights, stop_at: float):
+    rng = random.Random(args.seed * 1000003 + user_index)
+    user = VirtualUser(args.target, rng, args.restaurant_ids, args.max_turns)
+    url = args.url.rstrip("/") + TARGETS[args.target]["path"]
+
+    while time.monotonic() < stop_at:
+        category, question = choose_question(rng, mix, cum_weights)
+        results = results_ref["current"]
+        started_at = time.perf_counter()
+        try:
+            response = await client.post(url, json=user.payload(question))
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            if response.status_code >= 400:
+                results.record(category, elapsed_ms, response.status_code, error=f"http_{response.status_code}")
+            elif body.get("error"):
+                # The FastAPI app reports upstream failures in a 200 body
+                results.record(category, elapsed_ms, response.status_code, error="app_error")
+            else:
+                results.record(category, elapsed_ms, response.status_code,
+                               source=body.get("source") or ("llm" if args.target == "flask" else None))
+            user.answered(question, body)
+        except httpx.TimeoutException:
+            results.record(category, (time.perf_counter() - started_at) * 1000, "timeout", error="timeout")
+        except (httpx.HTTPError, ValueError) as e:
+            results.record(category, (time.perf_counter() - started_at) * 1000, "exception", error=type(e).__name__)
+
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+async def run_load_test(args) -> Dict[str, Any]:
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix, encoding="utf-8") as f:
+            mix = json.load(f)
+    cum_weights = []
+    total = 0.0
+    for category in mix.values():
+        total += category["weight"]
+        cum_weights.append(total)
+
+    base_url = args.url.rstrip("/")
+    db_stats_path = TARGETS[args.target]["db_stats"]
+    db_stats_url = base_url + db_stats_path if db_stats_path else None
+    stub_stats_url = args.stub_url.rstrip("/") + "/stub/stats" if args.stub_url else None
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        # Warmup requests fill caches and connection pools; their results are discarded
+        results_ref = {"current": LoadTestResults()}
+        started_at = time.monotonic()
+        stop_at = started_at + args.warmup + args.duration
+        users = [
+            asyncio.create_task(run_user(n, args, client, results_ref, mix, cum_weights, stop_at))
+            for n in range(args.concurrency)
+        ]
+
+        await asyncio.sleep(args.warmup)
+        results_ref["current"] = LoadTestResults()
+        db_before = await fetch_json(client, db_stats_url)
+        stub_before = await fetch_json(client, stub_stats_url)
+        measured_from = time.monotonic()
+
+        await asyncio.gather(*users)
+        measured_seconds = time.monotonic() - measured_from
+        db_after = await fetch_json(client, db_stats_url)
+        stub_after = await fetch_json(client, stub_stats_url)
+
+    results = results_ref["current"].summary(measured_seconds)
+    requests = results["requests"]
+    results["measured_seconds"] = round(measured_seconds, 2)
+    results["db_queries_per_request"] = None
+    if db_before and db_after and "queries" in db_before and requests:
+        results["db_queries_per_request"] = round((db_after["queries"] - db_before["queries"]) / requests, 3)
+        results["db_pool"] = db_after
+    results["llm_calls_per_request"] = None
+    if stub_before and stub_after and requests:
+        calls = stub_after["stats"]["requests"] - stub_before["stats"]["requests"]
+        results["llm_calls_per_request"] = round(calls / requests, 3)
+        results["llm_max_in_flight"] = stub_after["stats"]["max_in_flight"]
+        results["llm_injected_failures"] = {
+            kind: stub_after["stats"].get(kind, 0) - stub_before["stats"].get(kind, 0)
+            for kind in ("rate_limited", "server_errors", "timed_out")
+        }
+        results["llm_settings"] = stub_after["settings"]
+    return results
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def build_report(args, results: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "version": REPORT_VERSION,
+        "label": args.label,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git": git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "target": args.target,
+            "url": args.url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "think_ms": args.think_ms,
+            "max_turns": args.max_turns,
+            "restaurants": args.restaurants,
+            "mix": args.mix or "default",
+            "seed": args.seed
+        },
+        "results": results
+    }
+
+COMPARED_METRICS = [
+    ("throughput_rps", ("throughput_rps",), True),
+    ("p50_ms", ("latency_ms", "p50"), False),
+    ("p95_ms", ("latency_ms", "p95"), False),
+    ("p99_ms", ("latency_ms", "p99"), False),
+    ("error_rate", ("error_rate",), False),
+    ("db_queries_per_request", ("db_queries_per_request",), False),
+    ("llm_calls_per_request", ("llm_calls_per_request",), False)
+]
+
+def compare_reports(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Lines describing how each headline metric moved since the previous report"""
+    lines = []
+    if previous.get("config") != current.get("config"):
+        lines.append("warning: run configurations differ, results may not be comparable")
+    for name, path, higher_is_better in COMPARED_METRICS:
+        old, new = previous["results"], current["results"]
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+            new = new.get(key) if isinstance(new, dict) else None
+        if old is None or new is None:
+            continue
+        if new == old:
+            change = "+0.0%"
+        else:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        better = new > old if higher_is_better else new < old
+        verdict = "" if new == old else (" (better)" if better else " (worse)")
+        lines.append(f"{name:<24} {old:>10} -> {new:<10} {change}{verdict}")
+    return lines
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the chat endpoints and write a JSON report")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="fastapi")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the app under test")
+    parser.add_argument("--stub-url", help="Base URL of llm_stub.py, to report LLM calls per request")
+    parser.add_argument("--restaurants", help="Restaurant ids, e.g. 1-100 or restaurant123,restaurant456")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured warmup")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a user's requests")
+    parser.add_argument("--max-turns", type=int, default=4, help="Longest conversation before a user starts over")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--mix", help="JSON file with the question mix (same shape as DEFAULT_MIX)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", help="Free-form label stored in the report")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--max-error-rate", type=float, help="Exit with status 1 above this error rate")
+    args = parser.parse_args(argv)
+    args.restaurants = args.restaurants or TARGETS[args.target]["default_restaurants"]
+    args.restaurant_ids = parse_restaurants(args.restaurants)
+    return args
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run_load_test(args))
+    report = build_report(args, results)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    latency = results["latency_ms"]
+    print(f"{results['requests']} requests, {results['throughput_rps']} req/s, "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, "
+          f"error rate {results['error_rate']}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        for line in compare_reports(previous, report):
+            print(line, file=sys.stderr)
+
+    if args.max_error_rate is not None and results["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
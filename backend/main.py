@@ -3,19 +3,33 @@
 
 # Dependencies
 import re
+import time
+import uuid
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, after_this_request
 from azure.storage.blob import BlobServiceClient, ContentSettings, generate_blob_sas, BlobSasPermissions
 from azure.core.exceptions import ResourceNotFoundError
+from azure.core.exceptions import ResourceNotFoundError as BlobNotFoundError  # ResourceNotFoundError is redefined below
 import os
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
-import openai
 from azure.storage.blob import BlobServiceClient
 import logging
 from datetime import datetime
-from services.azure_storage import AzureStorageService
+from services.azure_storage import (
+    AzureStorageService, BLOB_CLIENT_OPTIONS, FILE_LIST_PAGE_SIZE, iter_blob_chunks, list_blob_page,
+    parse_fields, sas_url_cache, select_blob_fields, stream_length, upload_stream
+)
+from services.batch_upload import BATCH_UPLOAD_MAX_FILES, UploadItem, batch_uploader
+from services.blob_cache import blob_cache
+from services.llm_backend import LLMBackend, get_llm_backend
+from services.rate_limiter import rate_limiter, client_ip_from
+from services.session_store import conversation_store
+from services.conversation_compactor import conversation_compactor
+from services.context_serializer import count_tokens
+from services.token_accounting import PromptTooLargeError, fit_prompt, usage_tracker
+from utils.utils import format_sse
 
 #For error handling
 from werkzeug.exceptions import HTTPException
@@ -167,21 +181,49 @@ def handle_api_error(error):
 
 # Configure OpenAI
 openai_api_key = os.getenv('OPENAI_API_KEY')
-openai.api_key = openai_api_key
 
-# Flag for using mock responses (set to True to avoid OpenAI API costs)
-USE_MOCK_RESPONSES = False  # Change to False when ready for production
+# Completion backend (LLM_BACKEND=stub sends requests to the local stand-in server instead of OpenAI)
+llm_backend = get_llm_backend()
 
 # ChatGPT Service Class - Embedded in main.py to avoid import issues
 class ChatGPTService:
-    def __init__(self, api_key: str = None):
-        """Initialize the ChatGPT service with API key."""
-        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        if not self.api_key:
+    def __init__(self, api_key: str = None, backend: LLMBackend = None):
+        """Initialize the ChatGPT service with API key (or an explicit completion backend)."""
+        if backend is None:
+            backend = LLMBackend(llm_backend.name, api_key) if api_key else llm_backend
+        self.backend = backend
+        self.api_key = backend.api_key
+        if not backend.configured:
             raise ValueError("OpenAI API key is required. Either pass it explicitly or set OPENAI_API_KEY environment variable.")
         
-        # Set the API key for the older openai library
-        openai.api_key = self.api_key
+        # Use the process-wide pooled clients
+        self.client = backend.client()
+        self.async_client = backend.async_client()
+        
+    @staticmethod
+    def _format_response(response):
+        """Convert an API response into the service's response dictionary."""
+        return {
+            "message": response.choices[0].message.content,
+            "finish_reason": response.choices[0].finish_reason,
+            "model": response.model,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
+        }
+    
+    @staticmethod
+    def _format_error(error):
+        """Log an API failure and build the failure response."""
+        logger.error(f"Error calling OpenAI API: {error}")
+        return {
+            "error": str(error),
+            "message": None,
+            "finish_reason": "error",
+            "usage": None
+        }
         
     def get_completion(self, 
                        messages, 
@@ -200,37 +242,89 @@ class ChatGPTService:
         Returns:
             The response from the API
         """
-        # Use mock response if flag is set
-        if USE_MOCK_RESPONSES:
-            return self.get_mock_completion(messages)
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
             
+            return self._format_response(response)
+        except Exception as e:
+            # Log the error and return a failure response
+            return self._format_error(e)
+    
+    async def get_completion_async(self, 
+                                   messages, 
+                                   model="gpt-3.5-turbo",
+                                   temperature=0.7,
+                                   max_tokens=1000):
+        """
+        Awaitable version of get_completion that doesn't block the event loop.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            model: The OpenAI model to use
+            temperature: Controls randomness (0-1)
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            The response from the API
+        """
         try:
-            # Using the older style API
-            response = openai.ChatCompletion.create(
+            response = await self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
             
-            return {
-                "message": response.choices[0].message.content,
-                "finish_reason": response.choices[0].finish_reason,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
+            return self._format_response(response)
         except Exception as e:
             # Log the error and return a failure response
-            logger.error(f"Error calling OpenAI API: {e}")
-            return {
-                "error": str(e),
-                "message": None,
-                "finish_reason": "error",
-                "usage": None
-            }
+            return self._format_error(e)
+    
+    def stream_completion(self,
+                          messages,
+                          model="gpt-3.5-turbo",
+                          temperature=0.7,
+                          max_tokens=1000,
+                          usage=None):
+        """
+        Stream a completion from the ChatGPT model as it is generated.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            model: The OpenAI model to use
+            temperature: Controls randomness (0-1)
+            max_tokens: Maximum number of tokens to generate
+            usage: Filled with the model and token counts once the stream ends
+            
+        Yields:
+            Text chunks of the response as they arrive from the API
+        """
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        for chunk in stream:
+            if chunk.usage and usage is not None:
+                usage.update(
+                    model=chunk.model,
+                    prompt_tokens=chunk.usage.prompt_tokens,
+                    completion_tokens=chunk.usage.completion_tokens
+                )
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
     
     def get_simple_completion(self, prompt, **kwargs):
         """
@@ -243,10 +337,6 @@ class ChatGPTService:
         Returns:
             Just the completion text string
         """
-        # Use mock response if flag is set
-        if USE_MOCK_RESPONSES:
-            return "This is a mock response for testing. The integration is working correctly!"
-            
         messages = [{"role": "user", "content": prompt}]
         response = self.get_completion(messages, **kwargs)
         
@@ -254,48 +344,11 @@ class ChatGPTService:
             raise Exception(f"Failed to get completion: {response['error']}")
             
         return response["message"]
-        
-    def get_mock_completion(self, messages):
-        """Return a mock response for testing without hitting the API"""
-        # Generate a contextual response based on the user's input
-        user_message = ""
-        for msg in messages:
-            if msg["role"] == "user":
-                user_message = msg["content"]
-                break
-                
-        # Simple keyword-based response generation
-        response_text = "I'm a mock AI assistant. "
-        
-        if "hello" in user_message.lower() or "hi" in user_message.lower():
-            response_text += "Hello! How can I help you today?"
-        elif "how are you" in user_message.lower():
-            response_text += "I'm just a mock response, but thanks for asking!"
-        elif "food" in user_message.lower() or "recipe" in user_message.lower() or "cook" in user_message.lower():
-            response_text += "I'd be happy to discuss food and recipes with you. What kind of cuisine are you interested in?"
-        elif "weather" in user_message.lower():
-            response_text += "I don't have access to real-time weather data in mock mode, but I can pretend it's a lovely day!"
-        elif "thank" in user_message.lower():
-            response_text += "You're welcome! Is there anything else I can help with?"
-        else:
-            response_text += "I understand you're asking about: '" + user_message[:30] + "...' This is a mock response for testing purposes."
-            
-        return {
-            "message": response_text,
-            "finish_reason": "stop",
-            "usage": {
-                "prompt_tokens": len(user_message.split()),
-                "completion_tokens": len(response_text.split()),
-                "total_tokens": len(user_message.split()) + len(response_text.split())
-            }
-        }
 
 # Initialize the ChatGPT service
 try:
     chatgpt_service = ChatGPTService(api_key=openai_api_key)
-    logger.info("ChatGPT service initialized successfully")
-    if USE_MOCK_RESPONSES:
-        logger.info("Using MOCK responses for ChatGPT API (to avoid API costs)")
+    logger.info(f"ChatGPT service initialized successfully ({llm_backend.name} backend)")
 except Exception as e:
     chatgpt_service = None
     logger.error(f"Failed to initialize ChatGPT service: {str(e)}")
@@ -318,7 +371,7 @@ def initialize_azure_storage():
     
     try:
         # Create the blob service client
-        blob_service_client = BlobServiceClient.from_connection_string(azure_connection_string)
+        blob_service_client = BlobServiceClient.from_connection_string(azure_connection_string, **BLOB_CLIENT_OPTIONS)
         
         # Check if container exists, create if it doesn't
         container_client = blob_service_client.get_container_client(azure_container_name)
@@ -360,29 +413,8 @@ def get_secure_file_url(blob_name, expiry_hours=1):
         return None
     
     try:
-        # Generate a SAS token with expiration
-        from datetime import datetime, timedelta
-        from azure.storage.blob import generate_blob_sas, BlobSasPermissions
-        
-        # Get account information from connection string
-        account_name = blob_service_client.account_name
-        account_key = blob_service_client.credential.account_key
-        
-        # Generate SAS token with read permission
-        sas_token = generate_blob_sas(
-            account_name=account_name,
-            container_name=azure_container_name,
-            blob_name=blob_name,
-            account_key=account_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=expiry_hours)
-        )
-        
-        # Construct the full URL with SAS token
-        blob_client = container_client.get_blob_client(blob_name)
-        sas_url = f"{blob_client.url}?{sas_token}"
-        
-        return sas_url
+        # Read-only SAS URL, reused until it is close to expiry
+        return sas_url_cache.url(blob_service_client, azure_container_name, blob_name, expiry_hours)
     except Exception as e:
         logger.error(f"Error generating secure URL for blob {blob_name}: {str(e)}")
         return None
@@ -410,15 +442,66 @@ def index():
         'message': 'Welcome to the ChatGPT API server',
         'endpoints': {
             'chat': '/api/chat',
+            'chat_stream': '/api/chat/stream',
             'test': '/api/chat/test',
+            'chat_session': '/api/chat/session/:sessionId',
+            'restaurant_usage': '/api/restaurant/:restaurantId/usage',
+            'cache_stats': '/api/cache-stats',
             'restaurant': '/api/restaurant/:restaurantId'
         },
-        'mock_mode': USE_MOCK_RESPONSES
+        'mock_mode': llm_backend.name == 'stub',
+        'llm_backend': llm_backend.describe()
     })
 
+def check_chat_rate_limit(data):
+    """
+    Count a chat request against the restaurant, session and client IP limits.
+    
+    Returns:
+        A 429 response when a limit is exceeded, otherwise None (the limit
+        headers are added to the eventual response)
+    """
+    result = rate_limiter.check(
+        restaurant_id=data.get('restaurantId'),
+        session_id=data.get('session_id'),
+        client_ip=client_ip_from(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    )
+    if not result.allowed:
+        response = jsonify({
+            'error': 'Rate limit exceeded',
+            'message': f'Too many chat requests ({result.scope} limit). Please try again in {result.retry_after} seconds.',
+            'retry_after': result.retry_after
+        })
+        response.status_code = 429
+        response.headers.update(result.headers())
+        return response
+    
+    @after_this_request
+    def add_rate_limit_headers(response):
+        response.headers.update(result.headers())
+        return response
+    return None
+
+def resolve_chat_history(data):
+    """
+    Get the session id and history for a chat request.
+    
+    Clients that still send chat_history have it used as-is; otherwise the
+    session's recent turns come from the server-side conversation store and
+    a new session id is issued when none was sent.
+    
+    Returns:
+        tuple: (session_id, chat history, whether the turn should be stored server-side)
+    """
+    session_id = data.get('session_id') or str(uuid.uuid4())
+    if data.get('chat_history'):
+        return session_id, data['chat_history'], False
+    return session_id, conversation_store.get_history(session_id, data.get('restaurantId')), True
+
 # New API endpoint for ChatGPT interaction
 @app.route('/api/chat', methods=['POST'])
 def chat():
+    started_at = time.perf_counter()
     try:
         # Validate request data
         if not request.is_json:
@@ -428,6 +511,10 @@ def chat():
         
         if 'message' not in data:
             return jsonify({'error': 'No message provided'}), 400
+        
+        rate_limited = check_chat_rate_limit(data)
+        if rate_limited:
+            return rate_limited
             
         # Check if ChatGPT service is available
         if chatgpt_service is None:
@@ -435,59 +522,34 @@ def chat():
         
         # Extract parameters
         message = data.get('message')
-        chat_history = data.get('chat_history', [])
+        session_id, chat_history, store_turn = resolve_chat_history(data)
         restaurant_id = data.get('restaurantId')  # Added restaurant ID parameter
         model = data.get('model', 'gpt-3.5-turbo')
         temperature = data.get('temperature', 0.7)
         max_tokens = data.get('max_tokens', 1000)
         
-        # If restaurant_id is provided, get restaurant info
-        restaurant_info = None
-        if restaurant_id:
-            restaurant_info = get_restaurant_info(restaurant_id)
-            
         # Format messages for ChatGPT API
-        messages = []
+        messages = build_chat_messages(message, chat_history, restaurant_id)
         
-        # Add restaurant context if available
-        if restaurant_info:
-            system_message = f"You are a helpful assistant for {restaurant_info.get('name', 'this restaurant')}. "
-            if 'description' in restaurant_info:
-                system_message += restaurant_info['description'] + " "
-            if 'hours' in restaurant_info:
-                system_message += f"Hours: {restaurant_info['hours']} "
-            if 'menu' in restaurant_info:
-                system_message += f"Menu: {restaurant_info['menu']} "
-                
-            messages.append({
-                "role": "system",
-                "content": system_message
-            })
-        
-        # Add chat history
-        for msg in chat_history:
-            role = "assistant" if msg.get('is_bot', False) else "user"
-            messages.append({
-                "role": role,
-                "content": msg.get('text', '')
-            })
-        
-        # Add the current message
-        messages.append({
-            "role": "user",
-            "content": message
-        })
+        # Counted locally, so an oversized prompt is trimmed or refused before it is paid for
+        try:
+            messages, prompt_tokens = fit_prompt(messages)
+        except PromptTooLargeError as e:
+            logger.warning(f"Refused chat request: {str(e)}")
+            return jsonify({'error': 'Message too long', 'details': str(e)}), 413
         
         # Get response from ChatGPT
-        logger.info(f"Sending chat request with {len(messages)} messages")
+        logger.info(f"Sending chat request with {len(messages)} messages ({prompt_tokens} prompt tokens)")
         
-        # Using mock or real API based on the flag
+        # Goes to OpenAI or the stand-in server, depending on LLM_BACKEND
+        upstream_started_at = time.perf_counter()
         response = chatgpt_service.get_completion(
             messages=messages,
             model=model,
             temperature=temperature,
             max_tokens=max_tokens
         )
+        upstream_ms = (time.perf_counter() - upstream_started_at) * 1000
         
         # Check for errors
         if "error" in response and response["error"]:
@@ -497,9 +559,21 @@ def chat():
                 'details': response['error']
             }), 500
         
+        if store_turn:
+            conversation_store.append(session_id, restaurant_id, message, response["message"])
+            conversation_compactor.schedule(session_id)
+        
+        usage = response["usage"] or {}
+        usage_tracker.record(
+            restaurant_id, response.get("model") or model,
+            usage.get("prompt_tokens", prompt_tokens), usage.get("completion_tokens"),
+            upstream_ms, (time.perf_counter() - started_at) * 1000
+        )
+        
         # Return response
         return jsonify({
             'message': response["message"],  # Changed from 'response' to 'message' to match frontend
+            'session_id': session_id,
             'usage': response["usage"],
             'finish_reason': response["finish_reason"]
         })
@@ -508,6 +582,96 @@ def chat():
         logger.error(f"Error in chat endpoint: {str(e)}")
         return jsonify({'error': 'An error occurred while processing chat request.'}), 500
 
+# Streaming variant of /api/chat using Server-Sent Events
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    # Validate request data
+    if not request.is_json:
+        return jsonify({'error': 'Request must be JSON'}), 400
+        
+    data = request.get_json()
+    
+    if 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    rate_limited = check_chat_rate_limit(data)
+    if rate_limited:
+        return rate_limited
+        
+    # Check if ChatGPT service is available
+    if chatgpt_service is None:
+        return jsonify({'error': 'ChatGPT service not available'}), 503
+    
+    started_at = time.perf_counter()
+    # Extract parameters
+    message = data.get('message')
+    session_id, chat_history, store_turn = resolve_chat_history(data)
+    restaurant_id = data.get('restaurantId')
+    model = data.get('model', 'gpt-3.5-turbo')
+    temperature = data.get('temperature', 0.7)
+    max_tokens = data.get('max_tokens', 1000)
+    
+    messages = build_chat_messages(message, chat_history, restaurant_id)
+    try:
+        messages, prompt_tokens = fit_prompt(messages)
+    except PromptTooLargeError as e:
+        logger.warning(f"Refused chat stream request: {str(e)}")
+        return jsonify({'error': 'Message too long', 'details': str(e)}), 413
+    
+    def generate():
+        first_token_ms = None
+        chunks = []
+        usage = {}
+        try:
+            logger.info(f"Streaming chat request with {len(messages)} messages ({prompt_tokens} prompt tokens)")
+            upstream_started_at = time.perf_counter()
+            for content in chatgpt_service.stream_completion(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                usage=usage
+            ):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started_at) * 1000
+                chunks.append(content)
+                yield format_sse('token', {'content': content})
+            
+            # From the API request to its last chunk (the usage chunk comes after the text)
+            upstream_ms = (time.perf_counter() - upstream_started_at) * 1000
+            total_ms = (time.perf_counter() - started_at) * 1000
+            logger.info(f"Streamed chat response: ttft={first_token_ms or 0:.0f}ms upstream={upstream_ms:.0f}ms total={total_ms:.0f}ms")
+            response_text = "".join(chunks).strip()
+            if store_turn:
+                conversation_store.append(session_id, restaurant_id, message, response_text)
+                conversation_compactor.schedule(session_id)
+            # Fall back to local counts if the server didn't report usage
+            usage.setdefault('prompt_tokens', prompt_tokens)
+            usage.setdefault('completion_tokens', count_tokens(response_text))
+            usage_tracker.record(
+                restaurant_id, usage.pop('model', None) or model,
+                usage['prompt_tokens'], usage['completion_tokens'], upstream_ms, total_ms
+            )
+            yield format_sse('done', {
+                'session_id': session_id,
+                'finish_reason': 'stop',
+                'usage': usage,
+                'time_to_first_token_ms': round(first_token_ms, 1) if first_token_ms is not None else None,
+                'total_time_ms': round(total_ms, 1)
+            })
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield format_sse('error', {'error': 'An error occurred while processing chat request.'})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so tokens flush immediately
+        }
+    )
+
 # Add a simple test endpoint for checking if ChatGPT is working
 @app.route('/api/chat/test', methods=['GET'])
 def test_chat():
@@ -516,16 +680,14 @@ def test_chat():
         if chatgpt_service is None:
             return jsonify({'error': 'ChatGPT service not available'}), 503
         
-        # Use mock response for test endpoint
-        test_response = "This is a test response. The integration is working correctly!"
-        if not USE_MOCK_RESPONSES:
-            test_response = chatgpt_service.get_simple_completion("Say 'Hello, I am working correctly!'")
+        test_response = chatgpt_service.get_simple_completion("Say 'Hello, I am working correctly!'")
         
         return jsonify({
             'status': 'success',
             'message': 'ChatGPT API test successful',
             'response': test_response,
-            'mock_mode': USE_MOCK_RESPONSES
+            'mock_mode': llm_backend.name == 'stub',
+            'llm_backend': llm_backend.describe()
         })
         
     except Exception as e:
@@ -536,6 +698,24 @@ def test_chat():
             'message': f'ChatGPT API test failed: {str(e)}'
         }), 500
 
+# Hit rates of the restaurant snapshot and SAS URL caches
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'blob_cache': blob_cache.stats(), 'sas_urls': sas_url_cache.stats()})
+
+# Token usage, estimated cost and latency of a restaurant's chat turns (since this process started)
+@app.route('/api/restaurant/<restaurant_id>/usage', methods=['GET'])
+def restaurant_usage(restaurant_id):
+    return jsonify({'restaurant_id': restaurant_id, **usage_tracker.stats(restaurant_id)})
+
+# History size and compaction stats of one chat session
+@app.route('/api/chat/session/<session_id>', methods=['GET'])
+def chat_session_stats(session_id):
+    stats = conversation_store.session_stats(session_id)
+    if stats is None:
+        return jsonify({'error': 'Session not found'}), 404
+    return jsonify({'session_id': session_id, **stats, 'compaction': conversation_compactor.stats()})
+
 # New endpoint for getting restaurant information
 @app.route('/api/restaurant/<restaurant_id>', methods=['GET'])
 def get_restaurant_endpoint(restaurant_id):
@@ -549,12 +729,56 @@ def get_restaurant_endpoint(restaurant_id):
         logger.error(f"Error getting restaurant info: {str(e)}")
         return jsonify({'error': 'An error occurred while fetching restaurant information.'}), 500
 
+# Helper function to build the message list sent to ChatGPT
+def build_chat_messages(message, chat_history=None, restaurant_id=None):
+    """Build the ChatGPT message list from the user message, history and restaurant context."""
+    # If restaurant_id is provided, get restaurant info
+    restaurant_info = None
+    if restaurant_id:
+        restaurant_info = get_restaurant_info(restaurant_id)
+        
+    messages = []
+    
+    # Add restaurant context if available
+    if restaurant_info:
+        system_message = f"You are a helpful assistant for {restaurant_info.get('name', 'this restaurant')}. "
+        if 'description' in restaurant_info:
+            system_message += restaurant_info['description'] + " "
+        if 'hours' in restaurant_info:
+            system_message += f"Hours: {restaurant_info['hours']} "
+        if 'menu' in restaurant_info:
+            system_message += f"Menu: {restaurant_info['menu']} "
+            
+        messages.append({
+            "role": "system",
+            "content": system_message
+        })
+    
+    # Add chat history (server-side turns are already chat messages; client history uses is_bot/text)
+    for msg in chat_history or []:
+        if 'role' in msg:
+            messages.append({"role": msg['role'], "content": msg.get('content', '')})
+            continue
+        role = "assistant" if msg.get('is_bot', False) else "user"
+        messages.append({
+            "role": role,
+            "content": msg.get('text', '')
+        })
+    
+    # Add the current message
+    messages.append({
+        "role": "user",
+        "content": message
+    })
+    
+    return messages
+
 # Helper function to get restaurant information
 def get_restaurant_info(restaurant_id):
     """Get restaurant information from storage or database."""
     try:
         # For testing, return mock data
-        if USE_MOCK_RESPONSES or not is_blob_storage_configured():
+        if not is_blob_storage_configured():
             # Mock restaurant data for testing
             mock_restaurants = {
                 "restaurant123": {
@@ -587,17 +811,14 @@ def get_restaurant_info(restaurant_id):
             
             return mock_restaurants.get(restaurant_id)
         
-        # In production, retrieve from Azure blob storage
-        # This is just a placeholder for the actual implementation
+        # In production, retrieve from Azure blob storage (cached in memory and on disk,
+        # revalidated by ETag, so most chat turns don't wait on storage)
         blob_name = f"restaurants/{restaurant_id}.json"
         try:
-            blob_client = container_client.get_blob_client(blob_name)
-            restaurant_data = blob_client.download_blob().readall()
-            import json
-            return json.loads(restaurant_data)
-        except ResourceNotFoundError:
-            logger.warning(f"Restaurant {restaurant_id} not found in blob storage")
-            return None
+            restaurant_data = blob_cache.get(container_client, blob_name)
+            if restaurant_data is None:
+                logger.warning(f"Restaurant {restaurant_id} not found in blob storage")
+            return restaurant_data
         except Exception as e:
             logger.error(f"Error getting restaurant from blob storage: {str(e)}")
             return None
@@ -608,58 +829,66 @@ def get_restaurant_info(restaurant_id):
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
+    """
+    Upload a file to blob storage, streaming it in blocks.
+    
+    Accepts a multipart form with a "file" field, or the raw file as the
+    request body with ?filename=... (which skips multipart parsing entirely).
+    """
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file part'}), 400
+        if request.mimetype != 'multipart/form-data' and request.args.get('filename'):
+            # Raw body: streamed straight from the socket into the blob
+            original_filename = request.args['filename']
+            file_stream = request.stream
+            content_type = request.mimetype or 'application/octet-stream'
+            length = request.content_length
+        else:
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file part'}), 400
+                
+            file = request.files['file']
             
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({'error': 'No selected file'}), 400
+            if file.filename == '':
+                return jsonify({'error': 'No selected file'}), 400
+            
+            # Werkzeug spools large form parts to a temporary file rather than memory
+            original_filename = file.filename
+            file_stream = file.stream
+            content_type = file.content_type or 'application/octet-stream'
+            length = stream_length(file.stream)
         
-        if not allowed_file(file.filename):
+        if not allowed_file(original_filename):
             return jsonify({'error': 'File type not allowed'}), 400
             
         if not is_blob_storage_configured():
             return jsonify({'error': 'Azure Blob Storage not available'}), 503
         
         # Sanitize and create unique filename
-        safe_filename = sanitize_filename(file.filename)
+        safe_filename = sanitize_filename(original_filename)
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         unique_filename = f"{timestamp}_{safe_filename}"
         
-        # Get content type or default to octet-stream
-        content_type = file.content_type or 'application/octet-stream'
-        
         # Create blob client and set content settings
         blob_client = container_client.get_blob_client(unique_filename)
         
-        # Read file data
-        file_contents = file.read()
-        
         # Set content settings including content type
-        from azure.storage.blob import ContentSettings
         content_settings = ContentSettings(
             content_type=content_type,
             cache_control="max-age=86400"  # Cache for 24 hours
         )
         
-        # Upload to Azure with proper content settings
-        blob_client.upload_blob(
-            file_contents, 
-            overwrite=True,
-            content_settings=content_settings
-        )
+        # Upload to Azure in blocks, never holding the whole file in memory
+        _, size = upload_stream(blob_client, file_stream, length=length, content_settings=content_settings)
         
         # Generate secure URL with expiration
         secure_url = get_secure_file_url(unique_filename)
         
-        logger.info(f"File uploaded successfully: {unique_filename} ({len(file_contents)} bytes)")
+        logger.info(f"File uploaded successfully: {unique_filename} ({size} bytes)")
         
         return jsonify({
             'message': 'File uploaded successfully',
             'filename': unique_filename,
-            'size': len(file_contents),
+            'size': size,
             'content_type': content_type,
             'url': blob_client.url,  # Base URL (requires storage permissions)
             'secure_url': secure_url,  # SAS URL with temporary access
@@ -670,36 +899,106 @@ def upload_file():
         logger.error(f"Error in upload endpoint: {str(e)}")
         return jsonify({'error': 'An error occurred while uploading the file.'}), 500
 
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    """
+    Upload several files at once, concurrently and in resumable blocks.
+    
+    Accepts a multipart form with any number of "file" fields and an optional
+    "upload_id". Files are stored as <upload_id>_<filename>; posting a batch
+    again with the upload_id from its response resumes failed files, sending
+    only the blocks that never reached storage.
+    """
+    try:
+        files = [file for file in request.files.getlist('file') if file.filename]
+        if not files:
+            return jsonify({'error': 'No files in the request'}), 400
+        if len(files) > BATCH_UPLOAD_MAX_FILES:
+            return jsonify({'error': f'At most {BATCH_UPLOAD_MAX_FILES} files per batch'}), 400
+        
+        upload_id = request.form.get('upload_id') or uuid.uuid4().hex
+        if not re.fullmatch(r'[A-Za-z0-9_-]{1,64}', upload_id):
+            return jsonify({'error': 'Invalid upload_id'}), 400
+            
+        if not is_blob_storage_configured():
+            return jsonify({'error': 'Azure Blob Storage not available'}), 503
+        
+        items, rejected, seen = [], [], set()
+        for file in files:
+            safe_filename = sanitize_filename(file.filename)
+            if not allowed_file(file.filename):
+                rejected.append({'filename': file.filename, 'status': 'rejected', 'error': 'File type not allowed'})
+            elif safe_filename in seen:
+                rejected.append({'filename': file.filename, 'status': 'rejected', 'error': 'Duplicate filename in batch'})
+            else:
+                seen.add(safe_filename)
+                items.append(UploadItem(
+                    filename=file.filename,
+                    blob_client=container_client.get_blob_client(f"{upload_id}_{safe_filename}"),
+                    stream=file.stream,
+                    content_settings=ContentSettings(
+                        content_type=file.content_type or 'application/octet-stream',
+                        cache_control="max-age=86400"
+                    )
+                ))
+        
+        result = batch_uploader.upload(items) if items else {'files': [], 'summary': {'files': 0, 'succeeded': 0, 'failed': 0}}
+        for file_result in result['files']:
+            if file_result['status'] != 'failed':
+                file_result['secure_url'] = get_secure_file_url(file_result['blob_name'])
+        result['files'].extend(rejected)
+        result['summary']['rejected'] = len(rejected)
+        result['upload_id'] = upload_id
+        
+        logger.info(f"Batch {upload_id}: {result['summary']}")
+        # 207 tells the client that some files need another attempt (or were refused)
+        status = 207 if result['summary']['failed'] or rejected else 200
+        return jsonify(result), status
+        
+    except Exception as e:
+        logger.error(f"Error in batch upload endpoint: {str(e)}")
+        return jsonify({'error': 'An error occurred while uploading the files.'}), 500
+
+# Fields each file in a listing can have; select them with ?fields=name,size
+FILE_LIST_FIELDS = {
+    'name': lambda blob: blob.name,
+    'url': lambda blob: get_secure_file_url(blob.name),  # Only secure URLs are returned
+    'size': lambda blob: blob.size,
+    'content_type': lambda blob: blob.content_settings.content_type if blob.content_settings else None,
+    'created': lambda blob: blob.creation_time.isoformat() if blob.creation_time else None,
+    'last_modified': lambda blob: blob.last_modified.isoformat() if blob.last_modified else None
+}
+
 @app.route('/api/files', methods=['GET'])
 def list_files():
+    """
+    List one page of files.
+    
+    Query parameters: prefix, page_size, continuation_token (from the previous
+    page's response) and fields (comma-separated, defaults to all fields).
+    """
     try:
         if not is_blob_storage_configured():
             return jsonify({'error': 'Azure Blob Storage not available'}), 503
         
         # Get optional prefix filter
         prefix = request.args.get('prefix', None)
+        try:
+            page_size = int(request.args.get('page_size', FILE_LIST_PAGE_SIZE))
+            fields = parse_fields(request.args.get('fields'), list(FILE_LIST_FIELDS))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
-        # List blobs with optional prefix filter
-        blobs = container_client.list_blobs(name_starts_with=prefix)
-        files = []
-        
-        for blob in blobs:
-            # Generate secure URL with expiration
-            secure_url = get_secure_file_url(blob.name)
-            
-            # Add file info to response
-            files.append({
-                'name': blob.name,
-                'url': secure_url,  # Only return secure URLs
-                'size': blob.size,
-                'content_type': blob.content_settings.content_type if blob.content_settings else None,
-                'created': blob.creation_time.isoformat() if blob.creation_time else None,
-                'last_modified': blob.last_modified.isoformat() if blob.last_modified else None
-            })
+        # List one page of blobs with optional prefix filter
+        blobs, continuation_token = list_blob_page(
+            container_client, prefix, page_size, request.args.get('continuation_token') or None
+        )
+        files = select_blob_fields(blobs, fields, FILE_LIST_FIELDS)
         
         return jsonify({
             'files': files,
-            'count': len(files)
+            'count': len(files),
+            'continuation_token': continuation_token
         })
         
     except Exception as e:
@@ -712,30 +1011,30 @@ def download_file(filename):
         if not is_blob_storage_configured():
             return jsonify({'error': 'Azure Blob Storage not available'}), 503
         
-        # Sanitize filename
+        # Blob names are flat; anything else would be sanitized into a different blob's name
         safe_filename = sanitize_filename(filename)
+        if safe_filename != filename:
+            return jsonify({'error': 'Invalid filename'}), 400
         
         try:
             # Get blob client
             blob_client = container_client.get_blob_client(safe_filename)
             
-            # Download the blob
-            download_stream = blob_client.download_blob()
-            
-            # Get content and content type
-            content = download_stream.readall()
+            # Start the download; chunks are fetched as the response is sent
+            download_stream = blob_client.download_blob(max_concurrency=1)
             content_type = download_stream.properties.content_settings.content_type
             
-            # Return file as response
+            # Stream the file back chunk by chunk instead of buffering it
             return Response(
-                content,
+                iter_blob_chunks(download_stream, safe_filename),
                 mimetype=content_type,
                 headers={
-                    "Content-Disposition": f"attachment; filename={os.path.basename(safe_filename)}"
+                    "Content-Disposition": f"attachment; filename={os.path.basename(safe_filename)}",
+                    "Content-Length": str(download_stream.size)
                 }
             )
             
-        except ResourceNotFoundError:
+        except BlobNotFoundError:
             return jsonify({'error': 'File not found'}), 404
         
     except Exception as e:
@@ -748,8 +1047,10 @@ def delete_file(filename):
         if not is_blob_storage_configured():
             return jsonify({'error': 'Azure Blob Storage not available'}), 503
         
-        # Sanitize filename
+        # Blob names are flat; anything else would be sanitized into a different blob's name
         safe_filename = sanitize_filename(filename)
+        if safe_filename != filename:
+            return jsonify({'error': 'Invalid filename'}), 400
         
         try:
             # Get blob client and delete the blob
@@ -763,7 +1064,7 @@ def delete_file(filename):
                 'filename': safe_filename
             })
             
-        except ResourceNotFoundError:
+        except BlobNotFoundError:
             return jsonify({'error': 'File not found'}), 404
         
     except Exception as e:
@@ -3,16 +3,26 @@ Seed script for adding test data to the restaurant chatbot database
 Run this script to populate your database with sample restaurant data for testing.
 
 Usage:
-    python seed_test_data.py
+    python seedtest.py
+    python seedtest.py --synthetic --restaurants 10000 --logs 50000000 --defer-indexes
 """
 
 import os
+import io
 import sys
+import csv
+import time
+import random
 import logging
-from datetime import datetime
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from config.database import create_db_engine
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from passlib.context import CryptContext
 
 # Set up logging
@@ -31,7 +41,7 @@ DB_NAME = os.getenv("DB_NAME")
 
 # Import database models
 from database.models import (
-    User, Restaurant, Location, OperatingHours, Menu, MenuCategory, 
+    Base, User, Restaurant, Location, OperatingHours, Menu, MenuCategory, 
     MenuItem, MenuItemIngredient, FAQ, ReservationSettings
 )
 
@@ -40,20 +50,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_db_session():
     """Create and return a database session"""
-    if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
-        logger.error("Missing required database environment variables")
-        logger.error(f"DB_USER: {'Set' if DB_USER else 'Missing'}")
-        logger.error(f"DB_PASSWORD: {'Set' if DB_PASSWORD else 'Missing'}")
-        logger.error(f"DB_HOST: {'Set' if DB_HOST else 'Missing'}")
-        logger.error(f"DB_NAME: {'Set' if DB_NAME else 'Missing'}")
-        raise ValueError("Missing required database environment variables")
-    
-    # Create database URL
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    DATABASE_URL = get_database_url()
     logger.info(f"Connecting to PostgreSQL at {DB_HOST}:{DB_PORT}")
     
     # Create engine and connect to the database
-    engine = create_engine(DATABASE_URL)
+    engine = create_db_engine(DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return SessionLocal()
 
@@ -658,6 +659,427 @@ def create_restaurant_faqs(db, restaurant_id):
     db.commit()
     logger.info(f"Created {len(faqs)} FAQs for the restaurant")
 
+# ---------------------------------------------------------------------------
+# Synthetic data generator for load and benchmark databases
+#
+# Builds N restaurants with realistic menu trees, FAQs, hours, locations and
+# users, plus millions of chatbot log rows. Rows are written with COPY on
+# PostgreSQL (plain multi-row inserts elsewhere) by a pool of worker
+# processes, each loading its own slice over its own connection. Every
+# restaurant gets a fixed-size block of ids per table, so workers never need
+# to coordinate; the id sequences are moved past the loaded rows at the end.
+# ---------------------------------------------------------------------------
+
+CUISINES = ["Italian", "Mexican", "Japanese", "Indian", "Thai", "American", "French", "Greek", "Chinese", "Korean"]
+NAME_PARTS = (
+    ["Golden", "Little", "Blue", "Old Town", "Corner", "Rustic", "Urban", "Harbor", "Olive", "Red Lantern"],
+    ["Kitchen", "Bistro", "Table", "House", "Grill", "Cantina", "Trattoria", "Diner", "Garden", "Eatery"]
+)
+CITIES = [
+    ("New York", "NY", "10001", "America/New_York"), ("Chicago", "IL", "60601", "America/Chicago"),
+    ("Austin", "TX", "73301", "America/Chicago"), ("Denver", "CO", "80202", "America/Denver"),
+    ("Seattle", "WA", "98101", "America/Los_Angeles"), ("San Diego", "CA", "92101", "America/Los_Angeles"),
+    ("Boston", "MA", "02108", "America/New_York"), ("Miami", "FL", "33101", "America/New_York")
+]
+STREETS = ["Main Street", "Oak Avenue", "Market Street", "2nd Avenue", "Elm Street", "Harbor Road", "Pine Street"]
+MENU_NAMES = ["Lunch", "Dinner", "Brunch", "Happy Hour", "Kids"]
+CATEGORY_NAMES = ["Appetizers", "Salads", "Soups", "Mains", "Pasta", "Pizza", "Sides", "Desserts", "Drinks", "Specials"]
+DISH_BASES = [
+    ("Chicken", ["chicken", "garlic", "olive oil"]), ("Salmon", ["salmon", "lemon", "dill"]),
+    ("Beef", ["beef", "black pepper", "onion"]), ("Tofu", ["tofu", "soy sauce", "ginger"]),
+    ("Mushroom", ["mushroom", "thyme", "butter"]), ("Shrimp", ["shrimp", "garlic", "chili"]),
+    ("Eggplant", ["eggplant", "tomato", "basil"]), ("Lamb", ["lamb", "rosemary", "mint"]),
+    ("Chickpea", ["chickpea", "cumin", "coriander"]), ("Pork", ["pork", "apple", "sage"])
+]
+DISH_STYLES = [
+    ("Grilled", "grilled over an open flame"), ("Crispy", "fried until golden"), ("Spicy", "tossed in a house chili sauce"),
+    ("Roasted", "slow roasted with herbs"), ("Braised", "braised for hours until tender"), ("Stuffed", "stuffed and baked"),
+    ("Smoked", "smoked in house"), ("Glazed", "finished with a sweet glaze")
+]
+DISH_FORMS = ["Bowl", "Skewers", "Tacos", "Curry", "Salad", "Sandwich", "Platter", "Stew", "Risotto", "Wrap"]
+FAQ_TEMPLATES = [
+    ("Do you have parking?", "Yes, there is free parking behind the building.", "Location"),
+    ("Is there outdoor seating?", "Yes, our patio is open when the weather allows.", "General"),
+    ("Do you offer takeout?", "Yes, all menu items are available for takeout.", "Services"),
+    ("Do you deliver?", "We deliver through the major delivery apps.", "Services"),
+    ("Do you cater events?", "Yes, please contact us at least 48 hours in advance.", "Services"),
+    ("Do you have vegan options?", "Yes, vegan dishes are marked on the menu.", "Menu"),
+    ("Do you have gluten-free options?", "Several dishes can be made gluten-free on request.", "Menu"),
+    ("Do you have a kids menu?", "Yes, we have smaller portions for kids.", "Menu"),
+    ("Are pets allowed?", "Dogs are welcome on the patio.", "General"),
+    ("Do you have wifi?", "Yes, free wifi is available for guests.", "General"),
+    ("Can I bring my own wine?", "Corkage is $15 per bottle.", "Drinks"),
+    ("Do you take walk-ins?", "Yes, walk-ins are seated as tables become available.", "Reservations"),
+    ("Do you have gift cards?", "Gift cards are available at the host stand and online.", "General"),
+    ("Is the restaurant wheelchair accessible?", "Yes, the entrance and restrooms are accessible.", "General"),
+    ("Do you host private parties?", "Our private room seats up to 30 guests.", "Reservations"),
+    ("Do you have a happy hour?", "Happy hour runs weekdays from 4 to 6 PM.", "Drinks")
+]
+CHAT_TURNS = [
+    ("What time do you close today?", "We're open until 10 PM tonight.", "intent"),
+    ("Where are you located?", "We're located on Main Street.", "intent"),
+    ("Do you have vegan options?", "Yes, vegan dishes are marked on the menu.", "faq"),
+    ("What do you recommend?", "Our grilled salmon bowl is a guest favorite.", "llm"),
+    ("Is the curry spicy?", "It's medium spicy, but we can make it milder.", "llm"),
+    ("Can I book a table for 6 on Friday?", "Please call us to book a table for 6 on Friday.", "llm"),
+    ("Do you have parking?", "Yes, there is free parking behind the building.", "faq"),
+    ("What desserts do you have?", "We have tiramisu, cheesecake and seasonal sorbet.", "cache"),
+    ("Are you open on Sunday?", "On Sunday we're open from 12 PM to 9 PM.", "intent"),
+    ("Which dishes are gluten free?", "The grilled chicken and the salads are gluten free.", "llm")
+]
+
+# Upper bounds per restaurant, used to give each restaurant its own id block
+MAX_MENUS = 3
+MAX_CATEGORIES_PER_MENU = 6
+MAX_ITEMS_PER_CATEGORY = 12
+MAX_INGREDIENTS_PER_ITEM = 5
+MAX_FAQS = len(FAQ_TEMPLATES)
+
+# Load order for a restaurant's tables (parents before children)
+RESTAURANT_TABLES = [
+    "restaurants", "locations", "operating_hours", "reservation_settings",
+    "menus", "menu_categories", "menu_items", "menu_item_ingredients", "faqs"
+]
+ID_TABLES = RESTAURANT_TABLES + ["users", "chatbot_logs"]
+
+_worker_engines = {}
+
+def get_database_url():
+    """Build the PostgreSQL URL from the DB_* environment variables"""
+    if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
+        logger.error("Missing required database environment variables")
+        logger.error(f"DB_USER: {'Set' if DB_USER else 'Missing'}")
+        logger.error(f"DB_PASSWORD: {'Set' if DB_PASSWORD else 'Missing'}")
+        logger.error(f"DB_HOST: {'Set' if DB_HOST else 'Missing'}")
+        logger.error(f"DB_NAME: {'Set' if DB_NAME else 'Missing'}")
+        raise ValueError("Missing required database environment variables")
+    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+def _worker_engine(database_url):
+    # One engine per worker process, without a pool (each task holds one connection)
+    if database_url not in _worker_engines:
+        _worker_engines[database_url] = create_db_engine(database_url, poolclass=NullPool)
+    return _worker_engines[database_url]
+
+def _copy_rows(cursor, table, columns, rows, batch_size):
+    """Stream rows into a table with COPY, batch_size rows per COPY statement"""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+def _load_tables(engine, tables, batch_size):
+    """
+    Load generated rows in one transaction.
+
+    Args:
+        tables: List of (table name, columns, row iterable) in dependency order
+
+    Returns:
+        dict: Rows loaded per table
+    """
+    counts = {}
+    if engine.dialect.name == "postgresql":
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for table, columns, rows in tables:
+                counter = _Counter(rows)
+                _copy_rows(cursor, table, columns, counter, batch_size)
+                counts[table] = counter.count
+            raw.commit()
+        finally:
+            raw.close()
+        return counts
+
+    with engine.begin() as connection:
+        for table, columns, rows in tables:
+            statement = Base.metadata.tables[table].insert()
+            counts[table] = 0
+            batch = []
+            for row in rows:
+                batch.append(dict(zip(columns, row)))
+                if len(batch) >= batch_size:
+                    connection.execute(statement, batch)
+                    counts[table] += len(batch)
+                    batch = []
+            if batch:
+                connection.execute(statement, batch)
+                counts[table] += len(batch)
+    return counts
+
+class _Counter:
+    """Iterator wrapper that counts the rows passing through it"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows)
+        self.count += 1
+        return row
+
+def _generate_restaurants(rng, first_index, last_index, start_ids, locations_per_restaurant, now):
+    """Build row lists for a range of restaurants (by index, 0-based)"""
+    rows = {table: [] for table in RESTAURANT_TABLES}
+    for index in range(first_index, last_index):
+        restaurant_id = start_ids["restaurants"] + index
+        cuisine = rng.choice(CUISINES)
+        name = f"{rng.choice(NAME_PARTS[0])} {rng.choice(NAME_PARTS[1])} {index + 1}"
+        city, state, postal_code, timezone = rng.choice(CITIES)
+        created_at = now - timedelta(days=rng.randint(30, 1500))
+        rows["restaurants"].append((
+            restaurant_id, name, f"A neighborhood {cuisine.lower()} restaurant.", f"https://r{restaurant_id}.example.com",
+            f"Welcome to {name}! How can I help you today?", cuisine, rng.choice(["$", "$$", "$$$", "$$$$"]),
+            created_at, created_at, True, timezone
+        ))
+
+        for n in range(locations_per_restaurant):
+            rows["locations"].append((
+                start_ids["locations"] + index * locations_per_restaurant + n, restaurant_id,
+                f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", city, state, postal_code, "USA",
+                f"(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}", f"info{n}@r{restaurant_id}.example.com", n == 0
+            ))
+
+        opens, closes = rng.choice([("11:00:00", "22:00:00"), ("07:00:00", "15:00:00"), ("17:00:00", "23:30:00"), ("12:00:00", "02:00:00")])
+        closed_day = rng.choice([None, 0, 1, 6])
+        for day in range(7):
+            rows["operating_hours"].append((start_ids["operating_hours"] + index * 7 + day, restaurant_id, day, opens, closes, day == closed_day))
+
+        rows["reservation_settings"].append((
+            start_ids["reservation_settings"] + index, restaurant_id, rng.random() < 0.8, 1, rng.choice([6, 8, 10, 12, 20]),
+            30, rng.choice([14, 30, 60]), rng.choice([None, "For larger parties, please call us directly."])
+        ))
+
+        menu_names = rng.sample(MENU_NAMES, rng.randint(1, MAX_MENUS))
+        for m, menu_name in enumerate(menu_names):
+            menu_id = start_ids["menus"] + index * MAX_MENUS + m
+            rows["menus"].append((menu_id, restaurant_id, menu_name, f"Our {menu_name.lower()} menu", True))
+            for c, category_name in enumerate(rng.sample(CATEGORY_NAMES, rng.randint(3, MAX_CATEGORIES_PER_MENU))):
+                category_slot = (index * MAX_MENUS + m) * MAX_CATEGORIES_PER_MENU + c
+                category_id = start_ids["menu_categories"] + category_slot
+                rows["menu_categories"].append((category_id, menu_id, category_name, c))
+                for i in range(rng.randint(4, MAX_ITEMS_PER_CATEGORY)):
+                    item_slot = category_slot * MAX_ITEMS_PER_CATEGORY + i
+                    item_id = start_ids["menu_items"] + item_slot
+                    (style, style_text), (base, ingredients), form = rng.choice(DISH_STYLES), rng.choice(DISH_BASES), rng.choice(DISH_FORMS)
+                    vegetarian = base in ("Tofu", "Mushroom", "Eggplant", "Chickpea")
+                    rows["menu_items"].append((
+                        item_id, category_id, f"{style} {base} {form}", f"{base} {form.lower()} {style_text}.",
+                        round(rng.uniform(5, 45), 2), vegetarian, vegetarian and rng.random() < 0.5, rng.random() < 0.25,
+                        rng.choice([0, 0, 0, 1, 2, 3, 4, 5]), rng.random() < 0.1, rng.random() < 0.3, False,
+                        rng.random() < 0.1, rng.random() < 0.05, i, rng.random() < 0.97
+                    ))
+                    for g, ingredient in enumerate((ingredients + ["salt", "pepper"])[:MAX_INGREDIENTS_PER_ITEM]):
+                        rows["menu_item_ingredients"].append((
+                            start_ids["menu_item_ingredients"] + item_slot * MAX_INGREDIENTS_PER_ITEM + g,
+                            item_id, ingredient, ingredient in ("shrimp", "butter")
+                        ))
+
+        for f, (question, answer, category) in enumerate(rng.sample(FAQ_TEMPLATES, rng.randint(6, MAX_FAQS))):
+            rows["faqs"].append((start_ids["faqs"] + index * MAX_FAQS + f, restaurant_id, question, answer, category, f, True))
+    return rows
+
+RESTAURANT_COLUMNS = {
+    "restaurants": ["id", "name", "description", "website", "chatbot_greeting", "cuisine_type", "price_range",
+                    "created_at", "updated_at", "is_active", "timezone"],
+    "locations": ["id", "restaurant_id", "address_line1", "city", "state", "postal_code", "country", "phone", "email", "is_primary"],
+    "operating_hours": ["id", "restaurant_id", "day_of_week", "open_time", "close_time", "is_closed"],
+    "reservation_settings": ["id", "restaurant_id", "accepts_reservations", "min_party_size", "max_party_size",
+                             "reservation_interval", "advance_reservation_days", "special_instructions"],
+    "menus": ["id", "restaurant_id", "name", "description", "is_active"],
+    "menu_categories": ["id", "menu_id", "name", "display_order"],
+    "menu_items": ["id", "category_id", "name", "description", "price", "is_vegetarian", "is_vegan", "is_gluten_free",
+                   "spice_level", "contains_nuts", "contains_dairy", "contains_alcohol", "popular", "chef_special",
+                   "display_order", "is_active"],
+    "menu_item_ingredients": ["id", "menu_item_id", "name", "is_allergen"],
+    "faqs": ["id", "restaurant_id", "question", "answer", "category", "display_order", "is_active"],
+}
+LOG_COLUMNS = ["id", "restaurant_id", "session_id", "user_input", "chatbot_response", "timestamp",
+               "feedback_rating", "response_source", "model", "prompt_tokens", "completion_tokens",
+               "upstream_ms", "total_ms"]
+
+def _load_restaurant_chunk(task):
+    """Worker: generate and load one range of restaurants"""
+    database_url, seed, chunk_index, first_index, last_index, start_ids, locations, batch_size, now = task
+    rng = random.Random(seed * 1000003 + chunk_index)
+    rows = _generate_restaurants(rng, first_index, last_index, start_ids, locations, now)
+    return _load_tables(
+        _worker_engine(database_url),
+        [(table, RESTAURANT_COLUMNS[table], rows[table]) for table in RESTAURANT_TABLES],
+        batch_size
+    )
+
+def _generate_logs(rng, first_id, count, restaurant_ids, cum_weights, now, days):
+    """Yield chat log rows in sessions of a few turns, skewed towards popular restaurants"""
+    log_id, end_id = first_id, first_id + count
+    span_seconds = days * 24 * 60 * 60
+    while log_id < end_id:
+        restaurant_id = rng.choices(restaurant_ids, cum_weights=cum_weights)[0]
+        session_id = f"{rng.getrandbits(64):016x}"
+        timestamp = now - timedelta(seconds=rng.randrange(span_seconds))
+        for _ in range(min(rng.randint(1, 8), end_id - log_id)):
+            user_input, response, source = rng.choice(CHAT_TURNS)
+            rating = rng.randint(1, 5) if rng.random() < 0.05 else None
+            if source == "llm":
+                upstream_ms = round(rng.lognormvariate(7, 0.4), 1)  # ~1.1s median
+                usage = ("gpt-4", rng.randint(600, 1600), rng.randint(20, 160), upstream_ms,
+                         round(upstream_ms + rng.uniform(20, 80), 1))
+            else:
+                usage = (None, None, None, None, round(rng.uniform(2, 40), 1))
+            yield (log_id, restaurant_id, session_id, user_input, response, timestamp, rating, source) + usage
+            log_id += 1
+            timestamp += timedelta(seconds=rng.randint(5, 90))
+
+def _load_log_chunk(task):
+    """Worker: generate and load one range of chatbot log ids"""
+    database_url, seed, chunk_index, first_id, count, first_restaurant_id, restaurants, days, batch_size, now = task
+    rng = random.Random(seed * 7919 + chunk_index)
+    restaurant_ids = list(range(first_restaurant_id, first_restaurant_id + restaurants))
+    # Zipf-like popularity: a few restaurants get most of the traffic
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(restaurants)))
+    rows = _generate_logs(rng, first_id, count, restaurant_ids, cum_weights, now, days)
+    return _load_tables(_worker_engine(database_url), [("chatbot_logs", LOG_COLUMNS, rows)], batch_size)
+
+def _hash_password(args):
+    password, rounds = args
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds).hash(password)
+
+def _run_tasks(function, tasks, workers):
+    """Run tasks in a process pool (or inline for a single worker) and sum their row counts"""
+    totals = {}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(function, tasks)
+            for counts in results:
+                for table, count in counts.items():
+                    totals[table] = totals.get(table, 0) + count
+    else:
+        for task in tasks:
+            for table, count in function(task).items():
+                totals[table] = totals.get(table, 0) + count
+    return totals
+
+def generate_synthetic_data(args):
+    """Build a synthetic dataset of the requested size; returns rows loaded per table"""
+    started_at = time.perf_counter()
+    database_url = args.database_url or get_database_url()
+    engine = create_db_engine(database_url)
+    is_postgres = engine.dialect.name == "postgresql"
+    workers = args.workers if is_postgres else 1  # SQLite allows one writer at a time
+    now = datetime.utcnow()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        start_ids = {
+            table: (connection.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0) + 1
+            for table in ID_TABLES
+        }
+
+    deferred = []
+    if args.defer_indexes:
+        # Building indexes once after the load is much faster than maintaining them row by row
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(bind=engine, checkfirst=True)
+                deferred.append(index)
+        logger.info(f"Dropped {len(deferred)} indexes for the load")
+
+    tasks = [
+        (database_url, args.seed, n, first, min(first + args.chunk_restaurants, args.restaurants),
+         start_ids, args.locations, args.batch_size, now)
+        for n, first in enumerate(range(0, args.restaurants, args.chunk_restaurants))
+    ]
+    totals = _run_tasks(_load_restaurant_chunk, tasks, workers)
+    logger.info(f"Loaded {args.restaurants} restaurants in {time.perf_counter() - started_at:.1f}s: {totals}")
+
+    # Managers for every restaurant, hashed in parallel since bcrypt is deliberately slow
+    if args.users:
+        hashing_started = time.perf_counter()
+        passwords = [(f"password{start_ids['users'] + n}", args.bcrypt_rounds) for n in range(args.users)]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            hashes = list(pool.map(_hash_password, passwords, chunksize=max(1, args.users // (args.workers * 4))))
+        logger.info(f"Hashed {args.users} passwords in {time.perf_counter() - hashing_started:.1f}s")
+        user_rows = [
+            (start_ids["users"] + n, f"user{start_ids['users'] + n}@example.com", password_hash,
+             "Test", f"User {start_ids['users'] + n}", "restaurant_manager", True, now)
+            for n, password_hash in enumerate(hashes)
+        ]
+        association_rows = [
+            (start_ids["users"] + n % args.users, start_ids["restaurants"] + n) for n in range(args.restaurants)
+        ]
+        totals.update(_load_tables(engine, [
+            ("users", ["id", "email", "password_hash", "first_name", "last_name", "role", "is_active", "created_at"], user_rows),
+            ("user_restaurant_association", ["user_id", "restaurant_id"], association_rows),
+        ], args.batch_size))
+
+    if args.logs and args.restaurants:
+        logs_started = time.perf_counter()
+        tasks = [
+            (database_url, args.seed, n, start_ids["chatbot_logs"] + first, min(args.chunk_logs, args.logs - first),
+             start_ids["restaurants"], args.restaurants, args.days, args.batch_size, now)
+            for n, first in enumerate(range(0, args.logs, args.chunk_logs))
+        ]
+        totals.update(_run_tasks(_load_log_chunk, tasks, workers))
+        logger.info(f"Loaded {args.logs} chatbot logs in {time.perf_counter() - logs_started:.1f}s")
+
+    for index in deferred:
+        index.create(bind=engine, checkfirst=True)
+    if deferred:
+        logger.info(f"Rebuilt {len(deferred)} indexes")
+
+    if is_postgres:
+        with engine.begin() as connection:
+            # Move each id sequence past the explicitly assigned ids
+            for table in ID_TABLES:
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                ))
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE"))
+
+    engine.dispose()
+    logger.info(f"Synthetic data generated in {time.perf_counter() - started_at:.1f}s: {totals}")
+    return totals
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the restaurant chatbot database with sample or synthetic data")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Generate a synthetic dataset instead of the single sample restaurant")
+    parser.add_argument("--database-url", help="Database URL (defaults to the DB_* environment variables)")
+    parser.add_argument("--restaurants", type=int, default=100, help="Number of restaurants")
+    parser.add_argument("--locations", type=int, default=1, help="Locations per restaurant")
+    parser.add_argument("--users", type=int, default=None, help="Number of users (defaults to one per restaurant)")
+    parser.add_argument("--logs", type=int, default=100000, help="Number of chatbot log rows")
+    parser.add_argument("--days", type=int, default=90, help="Spread chatbot logs over this many days")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-restaurants", type=int, default=250, help="Restaurants per worker task")
+    parser.add_argument("--chunk-logs", type=int, default=1000000, help="Chatbot logs per worker task")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per COPY or insert batch")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="bcrypt cost for generated passwords")
+    parser.add_argument("--defer-indexes", action="store_true", help="Drop indexes during the load and rebuild them after")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    args = parser.parse_args(argv)
+    if args.users is None:
+        args.users = args.restaurants
+    return args
+
 def seed_data():
     """Main function to seed the database with test data"""
     try:
@@ -682,6 +1104,12 @@ def seed_data():
         db.close()
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.synthetic:
+        generate_synthetic_data(args)
+        print("✅ Synthetic data generated successfully!")
+        sys.exit(0)
+    
     success = seed_data()
     if success:
         print("✅ Database seeded successfully with test data!")
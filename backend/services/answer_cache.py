@@ -0,0 +1,239 @@
+# backend/services/answer_cache.py
+# Per-restaurant cache of chatbot answers for repeat questions
+
+import os
+import math
+import time
+import zlib
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.retrieval import QUESTION_WORDS, STOPWORDS, tokenize
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.87))
+ANSWER_CACHE_MAX_ENTRIES_PER_RESTAURANT = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES_PER_RESTAURANT", 200))
+ANSWER_CACHE_MAX_RESTAURANTS = int(os.getenv("ANSWER_CACHE_MAX_RESTAURANTS", 2000))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 6 * 60 * 60))
+EMBEDDING_DIMENSIONS = 1024
+
+# Unlike retrieval, matching keeps question words: "how is the salmon cooked?"
+# and "what is the salmon cooked in?" need different answers
+_QUESTION_STOPWORDS = STOPWORDS - QUESTION_WORDS
+
+def _question_tokens(text: str) -> List[str]:
+    return tokenize(text, _QUESTION_STOPWORDS)
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for exact matching ("When are you open Sunday?" -> "when open sunday").
+
+    Returns an empty string when only question words are left ("how are you?"),
+    as there is nothing to match on.
+    """
+    tokens = _question_tokens(text)
+    if all(token in QUESTION_WORDS for token in tokens):
+        return ""
+    return " ".join(tokens)
+
+def embed(text: str) -> Dict[int, float]:
+    """
+    Compute a local sparse embedding for a short question.
+
+    Hashes word unigrams, word bigrams and character trigrams into a fixed
+    number of dimensions and L2-normalizes the result, so cosine similarity
+    is a dot product. Cheap enough to run on every request without a model.
+    """
+    words = _question_tokens(text)
+    # Whole words and word pairs count more than character trigrams
+    features = [(word, 2.0) for word in words]
+    features.extend((f"{a} {b}", 2.0) for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.extend((padded[i:i + 3], 1.0) for i in range(len(padded) - 2))
+
+    vector: Dict[int, float] = {}
+    for feature, weight in features:
+        index = zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + weight
+
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if not norm:
+        return {}
+    return {index: value / norm for index, value in vector.items()}
+
+def cosine_similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+class AnswerCache:
+    """
+    Cache of chatbot answers keyed by restaurant and data version.
+
+    Lookups first try the normalized question text, then fall back to the
+    most similar cached question by local embedding, accepted only above
+    the similarity threshold. Entries for a restaurant are discarded as soon
+    as a lookup or store arrives with a newer data version, so menu or FAQ
+    edits invalidate old answers. Identical questions arriving concurrently
+    share a single upstream call.
+    """
+
+    def __init__(self, similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 max_entries_per_restaurant: int = ANSWER_CACHE_MAX_ENTRIES_PER_RESTAURANT,
+                 max_restaurants: int = ANSWER_CACHE_MAX_RESTAURANTS,
+                 ttl: float = ANSWER_CACHE_TTL):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_restaurant = max_entries_per_restaurant
+        self.max_restaurants = max_restaurants
+        self.ttl = ttl
+
+        # restaurant_id -> (version, OrderedDict[normalized question -> (embedding, answer, stored_at)])
+        self._buckets: "OrderedDict[int, Tuple[str, OrderedDict]]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.shared_calls = 0
+        self.invalidations = 0
+
+    def _bucket(self, restaurant_id: int, version: str, create: bool = False) -> Optional[OrderedDict]:
+        # Caller must hold the lock
+        bucket = self._buckets.get(restaurant_id)
+        if bucket is not None and bucket[0] != version:
+            del self._buckets[restaurant_id]
+            self.invalidations += 1
+            bucket = None
+        if bucket is None:
+            if not create:
+                return None
+            bucket = (version, OrderedDict())
+            self._buckets[restaurant_id] = bucket
+            while len(self._buckets) > self.max_restaurants:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(restaurant_id)
+        return bucket[1]
+
+    def lookup(self, restaurant_id: int, version: str, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question.
+
+        Returns:
+            dict: answer, match ("exact" or "similar") and similarity, or None on a miss
+        """
+        key = normalize_question(question)
+        if not key:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._bucket(restaurant_id, version)
+            if entries is None:
+                self.misses += 1
+                return None
+
+            entry = entries.get(key)
+            if entry is not None and now - entry[2] <= self.ttl:
+                entries.move_to_end(key)
+                self.exact_hits += 1
+                return {"answer": entry[1], "match": "exact", "similarity": 1.0}
+
+            vector = embed(question)
+            best_key, best_score = None, 0.0
+            for cached_key, (cached_vector, _, stored_at) in entries.items():
+                if now - stored_at > self.ttl:
+                    continue
+                score = cosine_similarity(vector, cached_vector)
+                if score > best_score:
+                    best_key, best_score = cached_key, score
+
+            if best_key is not None and best_score >= self.similarity_threshold:
+                entries.move_to_end(best_key)
+                self.similar_hits += 1
+                return {"answer": entries[best_key][1], "match": "similar", "similarity": round(best_score, 4)}
+
+            self.misses += 1
+            return None
+
+    def store(self, restaurant_id: int, version: str, question: str, answer: str):
+        """Cache an answer for a question under the given data version"""
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+        with self._lock:
+            entries = self._bucket(restaurant_id, version, create=True)
+            entries[key] = (embed(question), answer, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries_per_restaurant:
+                entries.popitem(last=False)
+
+    async def get_or_compute(self, restaurant_id: int, version: str, question: str,
+                             compute: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """
+        Compute an answer, sharing the call with identical in-flight questions.
+
+        Args:
+            compute: Coroutine factory that produces the answer (e.g. the LLM call)
+
+        Returns:
+            tuple: (answer, shared) where shared is True if another request's call was reused
+        """
+        key = normalize_question(question)
+        if not key:
+            # Nothing meaningful to match on ("hi", "how are you?"), so don't share or cache
+            return await compute(), False
+
+        inflight_key = (restaurant_id, version, key)
+        future = self._inflight.get(inflight_key)
+        if future is not None:
+            self.shared_calls += 1
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            answer = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(answer)
+            self.store(restaurant_id, version, question, answer)
+            return answer, False
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+    def invalidate(self, restaurant_id: int):
+        with self._lock:
+            if self._buckets.pop(restaurant_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "shared_calls": self.shared_calls,
+                "invalidations": self.invalidations,
+                "restaurants": len(self._buckets),
+                "entries": sum(len(entries) for _, entries in self._buckets.values()),
+                "inflight": len(self._inflight)
+            }
+
+# Shared cache for the process
+answer_cache = AnswerCache()
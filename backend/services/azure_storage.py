@@ -1,13 +1,219 @@
 # backend/services/azure_storage.py
 
+import io
 import os
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from urllib.parse import quote
 import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
 from azure.core.exceptions import ResourceNotFoundError
 
 logger = logging.getLogger(__name__)
 
+# Transfers move in blocks of this size, so a worker's memory per transfer stays
+# bounded whatever the file size
+BLOB_TRANSFER_CHUNK_SIZE = int(os.getenv("BLOB_TRANSFER_CHUNK_SIZE", 4 * 1024 * 1024))
+BLOB_UPLOAD_MAX_CONCURRENCY = int(os.getenv("BLOB_UPLOAD_MAX_CONCURRENCY", 2))  # Blocks in flight per upload
+
+# Client settings that stop the SDK from buffering whole files (its defaults
+# allow 64 MB single-request uploads and a 32 MB first download request)
+BLOB_CLIENT_OPTIONS = {
+    "max_single_put_size": BLOB_TRANSFER_CHUNK_SIZE,
+    "max_block_size": BLOB_TRANSFER_CHUNK_SIZE,
+    "max_single_get_size": BLOB_TRANSFER_CHUNK_SIZE,
+    "max_chunk_get_size": BLOB_TRANSFER_CHUNK_SIZE,
+}
+
+class _CountingReader:
+    """Read-only file wrapper that counts the bytes read through it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+def stream_length(stream) -> Optional[int]:
+    """Remaining length of a seekable stream, or None if it can't be known without reading it"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def upload_stream(blob_client, stream, length: Optional[int] = None, content_settings=None,
+                  overwrite: bool = True) -> Tuple[Dict[str, Any], int]:
+    """
+    Upload a file-like object as a block blob without reading it all into memory.
+
+    Up to BLOB_UPLOAD_MAX_CONCURRENCY blocks of BLOB_TRANSFER_CHUNK_SIZE bytes
+    are held at a time (when the client was created with BLOB_CLIENT_OPTIONS).
+
+    Args:
+        blob_client: BlobClient to upload to
+        stream: Object with a read(size) method, such as a request body
+        length: Bytes to upload, if known (lets small files go in one request)
+
+    Returns:
+        tuple: (upload result with etag and last_modified, bytes uploaded)
+    """
+    reader = _CountingReader(stream)
+    result = blob_client.upload_blob(
+        reader,
+        length=length,
+        overwrite=overwrite,
+        content_settings=content_settings,
+        max_concurrency=BLOB_UPLOAD_MAX_CONCURRENCY
+    )
+    return result, reader.bytes_read
+
+def iter_blob_chunks(downloader, blob_name: str) -> Iterator[bytes]:
+    """Yield a download's chunks as they arrive, logging failures part way through"""
+    sent = 0
+    try:
+        for chunk in downloader.chunks():
+            sent += len(chunk)
+            yield chunk
+    except Exception as e:
+        logger.error(f"Download of {blob_name} failed after {sent} bytes: {str(e)}")
+        raise
+
+SAS_EXPIRY_HOURS = int(os.getenv("SAS_EXPIRY_HOURS", 1))
+SAS_REFRESH_MARGIN_SECONDS = int(os.getenv("SAS_REFRESH_MARGIN_SECONDS", 600))  # Reissued when less validity than this is left
+SAS_CACHE_MAX_ENTRIES = int(os.getenv("SAS_CACHE_MAX_ENTRIES", 50000))
+FILE_LIST_PAGE_SIZE = int(os.getenv("FILE_LIST_PAGE_SIZE", 100))  # Default files per listing page
+FILE_LIST_MAX_PAGE_SIZE = int(os.getenv("FILE_LIST_MAX_PAGE_SIZE", 1000))
+
+class SasUrlCache:
+    """
+    Read-only SAS URLs per blob, reused until they are close to expiry.
+
+    Signing is an HMAC over the token fields, which adds up when a listing
+    signs thousands of blobs; cached URLs are reissued once less than
+    SAS_REFRESH_MARGIN_SECONDS of their validity is left, so a URL handed
+    out always stays usable for at least that long. Tokens stay scoped to
+    a single blob.
+    """
+
+    def __init__(self, expiry_hours: int = SAS_EXPIRY_HOURS, refresh_margin_seconds: int = SAS_REFRESH_MARGIN_SECONDS,
+                 max_entries: int = SAS_CACHE_MAX_ENTRIES):
+        self.expiry_hours = expiry_hours
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.max_entries = max_entries
+        self._urls: "OrderedDict[Tuple[str, str, str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def url(self, blob_service_client, container_name: str, blob_name: str, expiry_hours: Optional[int] = None) -> str:
+        """
+        Get a read-only SAS URL for a blob.
+
+        Args:
+            blob_service_client: Client created with the account key
+            container_name: Container holding the blob
+            blob_name: Name of the blob
+            expiry_hours: Validity of newly issued tokens (defaults to SAS_EXPIRY_HOURS)
+
+        Returns:
+            str: The blob URL with a SAS token
+        """
+        expiry_hours = expiry_hours or self.expiry_hours
+        key = (blob_service_client.account_name, container_name, blob_name, expiry_hours)
+        now = time.time()
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached is not None and cached[1] - now > self.refresh_margin_seconds:
+                self._urls.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        expiry = datetime.utcnow() + timedelta(hours=expiry_hours)
+        sas_token = generate_blob_sas(
+            account_name=blob_service_client.account_name,
+            container_name=container_name,
+            blob_name=blob_name,
+            account_key=blob_service_client.credential.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry
+        )
+        # Built directly rather than through get_blob_client, which parses and copies client state
+        sas_url = f"{blob_service_client.url.rstrip('/')}/{container_name}/{quote(blob_name)}?{sas_token}"
+        with self._lock:
+            self._urls[key] = (sas_url, now + expiry_hours * 3600)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+        return sas_url
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._urls),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Shared SAS URL cache for the process
+sas_url_cache = SasUrlCache()
+
+def parse_fields(requested: Optional[str], available: Sequence[str]) -> List[str]:
+    """
+    Parse a comma-separated fields parameter.
+
+    Returns:
+        list: The requested fields in order, or all available fields if none were requested
+
+    Raises:
+        ValueError: If a requested field isn't available
+    """
+    if not requested:
+        return list(available)
+    fields = [field.strip() for field in requested.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(available)})")
+    return fields
+
+def list_blob_page(container_client, prefix: Optional[str] = None, page_size: int = FILE_LIST_PAGE_SIZE,
+                   continuation_token: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    List one page of blobs.
+
+    Args:
+        container_client: ContainerClient to list
+        prefix: Only blobs whose names start with this
+        page_size: Blobs per page (capped at FILE_LIST_MAX_PAGE_SIZE)
+        continuation_token: Token from the previous page, to continue after it
+
+    Returns:
+        tuple: (blob properties, continuation token for the next page or None after the last)
+    """
+    page_size = max(1, min(page_size, FILE_LIST_MAX_PAGE_SIZE))
+    pages = container_client.list_blobs(name_starts_with=prefix, results_per_page=page_size).by_page(
+        continuation_token=continuation_token
+    )
+    page = next(pages, None)
+    blobs = list(page) if page is not None else []
+    return blobs, pages.continuation_token or None
+
+def select_blob_fields(blobs: Sequence[Any], fields: Sequence[str], getters: Dict[str, Callable[[Any], Any]]) -> List[Dict[str, Any]]:
+    """Build one dict per blob holding only the requested fields (unrequested ones are never computed)"""
+    selected = [(field, getters[field]) for field in fields]
+    return [{field: getter(blob) for field, getter in selected} for blob in blobs]
+
 class AzureStorageService:
     def __init__(self):
         self.connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
@@ -17,7 +223,9 @@ class AzureStorageService:
         
         if self.connection_string and self.container_name:
             try:
-                self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+                self.blob_service_client = BlobServiceClient.from_connection_string(
+                    self.connection_string, **BLOB_CLIENT_OPTIONS
+                )
                 self.container_client = self.blob_service_client.get_container_client(self.container_name)
                 logger.info(f"Successfully connected to Azure Blob Storage container: {self.container_name}")
             except Exception as e:
@@ -29,14 +237,16 @@ class AzureStorageService:
         """Check if the service is properly connected to Azure"""
         return self.blob_service_client is not None and self.container_client is not None
     
-    def upload_file(self, file_data, filename=None, content_type=None):
+    def upload_file(self, file_data, filename=None, content_type=None, length=None):
         """
         Upload a file to Azure Blob Storage
         
         Args:
-            file_data: The file data to upload
+            file_data: The file data to upload, as bytes or a file-like object
+                (streamed in blocks rather than read into memory)
             filename: The name to save the file as (optional)
             content_type: The content type of the file (optional)
+            length: Size of a file-like object, if known (optional)
             
         Returns:
             dict: Information about the uploaded file
@@ -59,19 +269,15 @@ class AzureStorageService:
                 from azure.storage.blob import ContentSettings
                 content_settings = ContentSettings(content_type=content_type)
                 
-            blob_client.upload_blob(file_data, overwrite=True, content_settings=content_settings)
-            
-            # Generate a SAS URL that expires in 1 hour
-            sas_token = generate_blob_sas(
-                account_name=self.blob_service_client.account_name,
-                container_name=self.container_name,
-                blob_name=filename,
-                account_key=self.blob_service_client.credential.account_key,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.utcnow() + timedelta(hours=1)
+            if isinstance(file_data, (bytes, bytearray)):
+                file_data, length = io.BytesIO(file_data), len(file_data)
+            _, size = upload_stream(
+                blob_client, file_data, length=length if length is not None else stream_length(file_data),
+                content_settings=content_settings
             )
             
-            sas_url = f"{blob_client.url}?{sas_token}"
+            # SAS URL that expires in SAS_EXPIRY_HOURS
+            sas_url = sas_url_cache.url(self.blob_service_client, self.container_name, filename)
             
             logger.info(f"File uploaded successfully: {filename}")
             
@@ -79,7 +285,7 @@ class AzureStorageService:
                 "filename": filename,
                 "url": blob_client.url,
                 "sas_url": sas_url,
-                "size": len(file_data),
+                "size": size,
                 "uploaded_at": datetime.now().isoformat()
             }
             
@@ -87,15 +293,17 @@ class AzureStorageService:
             logger.error(f"Error uploading file to Azure Blob Storage: {str(e)}")
             return None
     
-    def get_file(self, filename):
+    def get_file(self, filename, stream=False):
         """
         Get a file from Azure Blob Storage
         
         Args:
             filename: The name of the file to get
+            stream: Return an iterator over the file's chunks instead of
+                reading the whole file into memory
             
         Returns:
-            bytes: The file data
+            bytes: The file data (an iterator of bytes chunks when streaming)
         """
         if not self.is_connected():
             logger.error("Azure Blob Storage is not configured")
@@ -103,7 +311,9 @@ class AzureStorageService:
             
         try:
             blob_client = self.container_client.get_blob_client(filename)
-            download_stream = blob_client.download_blob()
+            download_stream = blob_client.download_blob(max_concurrency=1)
+            if stream:
+                return iter_blob_chunks(download_stream, filename)
             file_data = download_stream.readall()
             
             logger.info(f"File downloaded successfully: {filename}")
@@ -116,12 +326,47 @@ class AzureStorageService:
             logger.error(f"Error downloading file from Azure Blob Storage: {str(e)}")
             return None
     
-    def list_files(self, prefix=None):
+    def _file_getters(self):
+        return {
+            "name": lambda blob: blob.name,
+            "url": lambda blob: f"{self.container_client.url}/{quote(blob.name)}",
+            "sas_url": lambda blob: sas_url_cache.url(self.blob_service_client, self.container_name, blob.name),
+            "size": lambda blob: blob.size,
+            "content_type": lambda blob: blob.content_settings.content_type if blob.content_settings else None,
+            "created_on": lambda blob: blob.creation_time.isoformat() if blob.creation_time else None,
+            "last_modified": lambda blob: blob.last_modified.isoformat() if blob.last_modified else None
+        }
+    
+    def list_files_page(self, prefix=None, page_size=FILE_LIST_PAGE_SIZE, continuation_token=None, fields=None):
+        """
+        List one page of files in the Azure Blob Storage container
+        
+        Args:
+            prefix: Optional prefix to filter files
+            page_size: Files per page
+            continuation_token: Token returned with the previous page (optional)
+            fields: Comma-separated fields to return (optional, defaults to all)
+            
+        Returns:
+            tuple: (list of file information, continuation token for the next page or None)
+        """
+        if not self.is_connected():
+            logger.error("Azure Blob Storage is not configured")
+            return [], None
+        
+        getters = self._file_getters()
+        blobs, next_token = list_blob_page(self.container_client, prefix, page_size, continuation_token)
+        return select_blob_fields(blobs, parse_fields(fields, list(getters)), getters), next_token
+    
+    def list_files(self, prefix=None, fields=None):
         """
         List files in the Azure Blob Storage container
         
+        Pages through the container; prefer list_files_page for large containers.
+        
         Args:
             prefix: Optional prefix to filter files
+            fields: Comma-separated fields to return (optional, defaults to all)
             
         Returns:
             list: List of file information
@@ -131,33 +376,10 @@ class AzureStorageService:
             return []
             
         try:
-            files = []
-            blobs = self.container_client.list_blobs(name_starts_with=prefix)
-            
-            for blob in blobs:
-                blob_client = self.container_client.get_blob_client(blob.name)
-                
-                # Generate a SAS URL that expires in 1 hour
-                sas_token = generate_blob_sas(
-                    account_name=self.blob_service_client.account_name,
-                    container_name=self.container_name,
-                    blob_name=blob.name,
-                    account_key=self.blob_service_client.credential.account_key,
-                    permission=BlobSasPermissions(read=True),
-                    expiry=datetime.utcnow() + timedelta(hours=1)
-                )
-                
-                sas_url = f"{blob_client.url}?{sas_token}"
-                
-                files.append({
-                    "name": blob.name,
-                    "url": blob_client.url,
-                    "sas_url": sas_url,
-                    "size": blob.size,
-                    "created_on": blob.creation_time.isoformat() if blob.creation_time else None,
-                    "last_modified": blob.last_modified.isoformat() if blob.last_modified else None
-                })
-            
+            files, token = self.list_files_page(prefix, FILE_LIST_MAX_PAGE_SIZE, fields=fields)
+            while token:
+                page, token = self.list_files_page(prefix, FILE_LIST_MAX_PAGE_SIZE, token, fields)
+                files.extend(page)
             return files
             
         except Exception as e:
@@ -0,0 +1,182 @@
+# backend/services/batch_upload.py
+# Parallel, resumable block uploads for batches of files
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobBlock
+
+from services.azure_storage import BLOB_TRANSFER_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+BATCH_UPLOAD_WORKERS = int(os.getenv("BATCH_UPLOAD_WORKERS", 4))  # Files uploaded at the same time, across all batches
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", 50))
+BATCH_UPLOAD_BLOCK_SIZE = int(os.getenv("BATCH_UPLOAD_BLOCK_SIZE", BLOB_TRANSFER_CHUNK_SIZE))
+BATCH_UPLOAD_BLOCK_RETRIES = int(os.getenv("BATCH_UPLOAD_BLOCK_RETRIES", 3))  # Extra attempts per block
+BATCH_UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("BATCH_UPLOAD_RETRY_BACKOFF_SECONDS", 0.5))
+
+def block_id(index: int, chunk: bytes) -> str:
+    """
+    Id of one block: its position plus a hash of its content.
+
+    Every id has the same length, as Azure requires within a blob, and a
+    retried upload of the same file produces the same ids, which is how
+    blocks staged or committed by an earlier attempt are recognised.
+    """
+    return f"{index:06d}-{hashlib.sha256(chunk).hexdigest()[:32]}"
+
+@dataclass
+class UploadItem:
+    """One file of a batch"""
+    filename: str
+    blob_client: Any
+    stream: Any
+    content_settings: Any = None
+
+@dataclass
+class UploadResult:
+    filename: str
+    blob_name: str
+    status: str = "uploaded"  # uploaded, resumed (reused blocks from an earlier attempt), unchanged or failed
+    size: int = 0
+    blocks: int = 0
+    blocks_staged: int = 0
+    blocks_reused: int = 0
+    bytes_staged: int = 0
+    retries: int = 0
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {key: value for key, value in self.__dict__.items() if key != "error" or value}
+        result["elapsed_ms"] = round(self.elapsed_ms, 1)
+        return result
+
+class BatchUploader:
+    """
+    Uploads many files concurrently as block blobs.
+
+    Files from every batch share one pool of BATCH_UPLOAD_WORKERS threads
+    (concurrent batches queue behind each other), and each file is read and
+    staged one block at a time, so memory stays around workers x block size
+    however many batches are in flight. A block that fails is retried with
+    backoff, and a file whose upload still fails keeps its staged blocks:
+    sending the batch again with the same upload id skips every block
+    already in storage and only stages the rest before committing.
+    """
+
+    def __init__(self, workers: int = BATCH_UPLOAD_WORKERS, block_size: int = BATCH_UPLOAD_BLOCK_SIZE,
+                 block_retries: int = BATCH_UPLOAD_BLOCK_RETRIES, backoff_seconds: float = BATCH_UPLOAD_RETRY_BACKOFF_SECONDS):
+        self.workers = workers
+        self.block_size = block_size
+        self.block_retries = block_retries
+        self.backoff_seconds = backoff_seconds
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-upload")
+            return self._executor
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _existing_blocks(blob_client) -> Tuple[List[str], set]:
+        """Committed block ids in order, and every block id already in storage"""
+        try:
+            committed, uncommitted = blob_client.get_block_list("all")
+        except ResourceNotFoundError:
+            return [], set()
+        committed_ids = [block.id for block in committed]
+        return committed_ids, set(committed_ids) | {block.id for block in uncommitted}
+
+    def _stage_block(self, blob_client, block: str, chunk: bytes, result: UploadResult):
+        for attempt in range(self.block_retries + 1):
+            try:
+                blob_client.stage_block(block, chunk, length=len(chunk))
+                return
+            except Exception as e:
+                if attempt == self.block_retries:
+                    raise
+                result.retries += 1
+                logger.warning(f"Retrying block {block} of {result.blob_name} after error: {str(e)}")
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    def upload_file(self, item: UploadItem) -> UploadResult:
+        """Upload one file block by block, reusing blocks an earlier attempt left in storage"""
+        started_at = time.perf_counter()
+        result = UploadResult(filename=item.filename, blob_name=item.blob_client.blob_name)
+        try:
+            committed_ids, existing = self._existing_blocks(item.blob_client)
+            block_ids = []
+            while True:
+                chunk = item.stream.read(self.block_size)
+                if not chunk:
+                    break
+                block = block_id(len(block_ids), chunk)
+                block_ids.append(block)
+                result.size += len(chunk)
+                if block in existing:
+                    result.blocks_reused += 1
+                    continue
+                self._stage_block(item.blob_client, block, chunk, result)
+                result.blocks_staged += 1
+                result.bytes_staged += len(chunk)
+            result.blocks = len(block_ids)
+
+            if block_ids and block_ids == committed_ids:
+                result.status = "unchanged"
+            else:
+                item.blob_client.commit_block_list(
+                    [BlobBlock(block_id=block) for block in block_ids], content_settings=item.content_settings
+                )
+                result.status = "resumed" if result.blocks_reused else "uploaded"
+        except Exception as e:
+            result.status = "failed"
+            result.error = str(e)
+            logger.error(f"Upload of {result.blob_name} failed after {result.blocks_staged} staged blocks: {str(e)}")
+        result.elapsed_ms = (time.perf_counter() - started_at) * 1000
+        return result
+
+    def upload(self, items: List[UploadItem]) -> Dict[str, Any]:
+        """
+        Upload a batch of files concurrently.
+
+        Returns:
+            dict: Per-file results (in request order) and batch totals with throughput
+        """
+        started_at = time.perf_counter()
+        results = list(self._get_executor().map(self.upload_file, items))
+        elapsed = time.perf_counter() - started_at
+
+        failed = sum(1 for result in results if result.status == "failed")
+        total_bytes = sum(result.size for result in results if result.status != "failed")
+        staged_bytes = sum(result.bytes_staged for result in results)
+        return {
+            "files": [result.as_dict() for result in results],
+            "summary": {
+                "files": len(results),
+                "succeeded": len(results) - failed,
+                "failed": failed,
+                "bytes": total_bytes,
+                "elapsed_ms": round(elapsed * 1000, 1),
+                "throughput_mb_per_s": round(staged_bytes / elapsed / 1024 / 1024, 2) if elapsed else 0.0
+            }
+        }
+
+# Shared uploader for the upload endpoints
+batch_uploader = BatchUploader()
@@ -0,0 +1,282 @@
+# backend/services/blob_cache.py
+# Two-tier cache (memory and local disk) for restaurant snapshots stored in Azure Blob Storage
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError, ResourceNotModifiedError
+
+logger = logging.getLogger(__name__)
+
+BLOB_CACHE_ENABLED = os.getenv("BLOB_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+BLOB_CACHE_TTL_SECONDS = float(os.getenv("BLOB_CACHE_TTL_SECONDS", 60))  # Served without asking the blob until this old
+# Older entries are still served while a background request revalidates them, up to this age
+BLOB_CACHE_MAX_STALE_SECONDS = float(os.getenv("BLOB_CACHE_MAX_STALE_SECONDS", 3600))
+BLOB_CACHE_MAX_ENTRIES = int(os.getenv("BLOB_CACHE_MAX_ENTRIES", 1000))  # Parsed snapshots kept in memory
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "restaurant-blob-cache"))
+BLOB_CACHE_WORKERS = int(os.getenv("BLOB_CACHE_WORKERS", 2))
+
+class _Entry:
+    __slots__ = ("value", "etag", "validated_at")
+
+    def __init__(self, value: Any, etag: Optional[str], validated_at: float):
+        self.value = value  # Parsed blob, or None if the blob doesn't exist
+        self.etag = etag
+        self.validated_at = validated_at  # time.time() of the last fetch or revalidation
+
+class BlobSnapshotCache:
+    """
+    Parsed blobs in memory, raw bytes on local disk, revalidated by ETag.
+
+    An entry younger than BLOB_CACHE_TTL_SECONDS is served without touching
+    the network. Older entries are served as they are while one background
+    conditional request (If-None-Match) checks the blob, so a chat turn only
+    waits on storage when nothing usable is cached. An unchanged blob costs
+    a 304 with no body. The disk tier keeps snapshots across restarts and
+    between worker processes, so a cold worker revalidates instead of
+    downloading. Cached objects are shared and must be treated as read-only.
+    """
+
+    def __init__(self, enabled: bool = BLOB_CACHE_ENABLED, ttl_seconds: float = BLOB_CACHE_TTL_SECONDS,
+                 max_stale_seconds: float = BLOB_CACHE_MAX_STALE_SECONDS, max_entries: int = BLOB_CACHE_MAX_ENTRIES,
+                 cache_dir: Optional[str] = BLOB_CACHE_DIR, workers: int = BLOB_CACHE_WORKERS):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._revalidating = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "stale_served": 0, "misses": 0, "downloads": 0,
+            "not_modified": 0, "revalidations": 0, "errors": 0
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _key(container_client, blob_name: str) -> str:
+        return f"{getattr(container_client, 'container_name', '')}/{blob_name}"
+
+    def get(self, container_client, blob_name: str, parse: Callable[[bytes], Any] = json.loads) -> Any:
+        """
+        Get a blob's parsed contents, from cache when possible.
+
+        Args:
+            container_client: Azure ContainerClient holding the blob
+            blob_name: Name of the blob
+            parse: Turns the blob's bytes into the cached object
+
+        Returns:
+            The parsed blob, or None if it doesn't exist
+
+        Raises:
+            Exception: Storage errors, when there is no cached copy to fall back on
+        """
+        if not self.enabled:
+            try:
+                return parse(container_client.get_blob_client(blob_name).download_blob().readall())
+            except ResourceNotFoundError:
+                return None
+
+        key = self._key(container_client, blob_name)
+        entry, tier = self._lookup(key, parse)
+        if entry is not None:
+            age = time.time() - entry.validated_at
+            if age < self.ttl_seconds:
+                self._count(tier)
+                return entry.value
+            if age < self.max_stale_seconds:
+                self._count("stale_served")
+                self._revalidate_in_background(key, container_client, blob_name, parse)
+                return entry.value
+
+        self._count("misses")
+        with self._fetch_lock(key):
+            # Another request may have fetched it while this one waited
+            current = self._memory_entry(key)
+            if current is not None and time.time() - current.validated_at < self.ttl_seconds:
+                return current.value
+            return self._fetch(key, container_client, blob_name, parse, current or entry).value
+
+    def put(self, container_client, blob_name: str, raw: bytes, etag: Optional[str], parse: Callable[[bytes], Any] = json.loads):
+        """Cache a blob that was just uploaded, so the next read doesn't download it again"""
+        if self.enabled:
+            self._store(self._key(container_client, blob_name), raw, etag, parse(raw))
+
+    def invalidate(self, container_client, blob_name: str):
+        key = self._key(container_client, blob_name)
+        with self._lock:
+            self._entries.pop(key, None)
+        if not self.cache_dir:
+            return
+        for path in self._disk_paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _memory_entry(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _lookup(self, key: str, parse) -> Tuple[Optional[_Entry], str]:
+        entry = self._memory_entry(key)
+        if entry is not None:
+            return entry, "memory_hits"
+        entry = self._read_disk(key, parse)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry, "disk_hits"
+
+    def _fetch_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._fetch_locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, key: str, container_client, blob_name: str, parse, cached: Optional[_Entry]) -> _Entry:
+        """Download the blob, or confirm the cached copy with a conditional request"""
+        try:
+            blob_client = container_client.get_blob_client(blob_name)
+            if cached is not None and cached.etag:
+                downloader = blob_client.download_blob(etag=cached.etag, match_condition=MatchConditions.IfModified)
+            else:
+                downloader = blob_client.download_blob()
+            raw = downloader.readall()
+        except ResourceNotModifiedError:
+            self._count("not_modified")
+            cached.validated_at = time.time()
+            self._remember(key, cached)
+            self._write_disk_meta(key, cached.etag, cached.validated_at)
+            return cached
+        except ResourceNotFoundError:
+            # Remembered as missing until the next revalidation
+            self.invalidate(container_client, blob_name)
+            entry = _Entry(None, None, time.time())
+            self._remember(key, entry)
+            return entry
+        except Exception as e:
+            self._count("errors")
+            if cached is None:
+                raise
+            logger.warning(f"Serving cached {blob_name} after a storage error: {str(e)}")
+            return cached
+        self._count("downloads")
+        return self._store(key, raw, downloader.properties.etag, parse(raw))
+
+    def _revalidate_in_background(self, key: str, container_client, blob_name: str, parse):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="blob-cache")
+            self.counters["revalidations"] += 1
+        self._executor.submit(self._revalidate, key, container_client, blob_name, parse)
+
+    def _revalidate(self, key: str, container_client, blob_name: str, parse):
+        try:
+            with self._fetch_lock(key):
+                self._fetch(key, container_client, blob_name, parse, self._memory_entry(key))
+        except Exception as e:
+            logger.warning(f"Could not revalidate {blob_name}: {str(e)}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def _remember(self, key: str, entry: _Entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store(self, key: str, raw: bytes, etag: Optional[str], value: Any) -> _Entry:
+        entry = _Entry(value, etag, time.time())
+        self._remember(key, entry)
+        self._write_disk(key, raw, etag, entry.validated_at)
+        return entry
+
+    def _disk_paths(self, key: str) -> Tuple[str, str]:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.blob"), os.path.join(self.cache_dir, f"{name}.meta")
+
+    def _write_disk(self, key: str, raw: bytes, etag: Optional[str], validated_at: float):
+        if not self.cache_dir:
+            return
+        data_path, _ = self._disk_paths(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._write_atomic(data_path, raw)
+            self._write_disk_meta(key, etag, validated_at)
+        except OSError as e:
+            logger.warning(f"Could not write blob cache file for {key}: {str(e)}")
+
+    def _write_disk_meta(self, key: str, etag: Optional[str], validated_at: float):
+        if not self.cache_dir:
+            return
+        _, meta_path = self._disk_paths(key)
+        try:
+            self._write_atomic(meta_path, json.dumps({"key": key, "etag": etag, "validated_at": validated_at}).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Could not write blob cache metadata for {key}: {str(e)}")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        # Readers in other workers never see a partly written file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _read_disk(self, key: str, parse) -> Optional[_Entry]:
+        if not self.cache_dir:
+            return None
+        data_path, meta_path = self._disk_paths(key)
+        try:
+            with open(meta_path, "rb") as f:
+                meta = json.loads(f.read())
+            with open(data_path, "rb") as f:
+                raw = f.read()
+            if meta.get("key") != key:
+                return None
+            return _Entry(parse(raw), meta.get("etag"), float(meta.get("validated_at", 0)))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable blob cache file for {key}: {str(e)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+        hits = counters["memory_hits"] + counters["disk_hits"] + counters["stale_served"]
+        lookups = hits + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "ttl_seconds": self.ttl_seconds,
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+# Shared cache for the process
+blob_cache = BlobSnapshotCache()
@@ -1,119 +1,306 @@
-import json
 import os
+import time
+import logging
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
-import openai
 from services.database_services import ChatbotDataService, ChatbotLogService
+from services.llm_backend import get_llm_backend
+from services.prompt_cache import prompt_cache
+from services.restaurant_snapshot import RestaurantSnapshot
+from services.answer_cache import answer_cache
+from services.response_metrics import response_metrics
+from services.log_writer import log_writer
+from services.session_store import conversation_store, is_follow_up
+from services.conversation_compactor import conversation_compactor
+from services.context_serializer import count_tokens
+from services.token_accounting import PromptTooLargeError, fit_prompt
 import uuid
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
+CHATBOT_MODEL = os.getenv("CHATBOT_MODEL", "gpt-4")
+
 class ChatbotService:
     """Service to integrate ChatGPT API with restaurant data"""
     
     def __init__(self, db: Session):
         self.db = db
         
-        # OpenAI API setup with error handling
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
-            print("OpenAI API key configured")
+        # Completion backend (the OpenAI API, or the stand-in server when LLM_BACKEND=stub)
+        self.llm_backend = get_llm_backend()
+        self.client = None
+        if self.llm_backend.configured:
+            self.client = self.llm_backend.async_client()
         else:
             print("Warning: OpenAI API key not found. Chatbot responses will be limited.")
     
-    def generate_chatbot_response(self, restaurant_id: int, user_input: str, session_id: str = None) -> Dict[str, Any]:
-        """Generate a response from the chatbot using ChatGPT API and restaurant data"""
-        # Create session ID if not provided
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            
+    def _load_snapshot(self, restaurant_id: int, session_id: str) -> Tuple[Optional[RestaurantSnapshot], Optional[Dict[str, Any]]]:
+        """Get the restaurant's compiled snapshot, or an error response if that isn't possible"""
         # Check if OpenAI API key is configured
-        if not self.openai_api_key:
-            return {
+        if not self.llm_backend.configured:
+            return None, {
                 "session_id": session_id,
                 "response": "I'm not fully configured yet. Please set up the OpenAI API integration.",
                 "error": "Missing OpenAI API key"
             }
             
+        # Unknown restaurant ids are remembered briefly to skip the lookup
+        if prompt_cache.is_known_missing(restaurant_id):
+            return None, self._restaurant_not_found(session_id)
+        
+        # A snapshot whose version was checked moments ago is served without a query
+        snapshot = prompt_cache.get_recent(restaurant_id)
+        if snapshot is not None:
+            return snapshot, None
+            
         # Get restaurant data directly from database
         from database.models import Restaurant
         restaurant = self.db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
         
         if not restaurant:
-            return {
-                "session_id": session_id,
-                "response": "Sorry, I couldn't find information about this restaurant.",
-                "error": "Restaurant not found"
-            }
+            prompt_cache.mark_missing(restaurant_id)
+            return None, self._restaurant_not_found(session_id)
+        
+        # The compiled snapshot is cached per data version; updated_at is bumped
+        # whenever the restaurant's menus, FAQs, hours or locations change
+        version = restaurant.updated_at.isoformat() if restaurant.updated_at else None
+        snapshot = prompt_cache.get(restaurant_id, version) if version else None
+        
+        if snapshot is None:
+            # Get restaurant data from database
+            restaurant_data = ChatbotDataService.get_restaurant_chatbot_data(self.db, restaurant_id)
+            
+            if not restaurant_data:
+                return None, {
+                    "session_id": session_id,
+                    "response": "Sorry, I couldn't load information about this restaurant.",
+                    "error": "Failed to load restaurant data"
+                }
+            
+            snapshot = RestaurantSnapshot(restaurant, restaurant_data, version)
+            logger.info(
+                f"Compiled snapshot for restaurant {restaurant_id}: "
+                f"{snapshot.full_context['token_count']}/{snapshot.full_context['token_budget']} context tokens"
+                f"{', retrieval enabled' if snapshot.use_retrieval else ''}"
+            )
+            if version:
+                prompt_cache.put(restaurant_id, version, snapshot)
+        
+        return snapshot, None
+    
+    def _load_history(self, restaurant_id: int, session_id: str) -> List[Dict[str, str]]:
+        """Recent turns of the session, reloaded from the chatbot logs if this worker doesn't have them"""
+        return conversation_store.get_history(
+            session_id, restaurant_id,
+            loader=lambda sid, max_messages: ChatbotLogService.get_recent_turns(self.db, restaurant_id, sid, max_messages)
+        )
+    
+    @staticmethod
+    def _build_messages(snapshot: RestaurantSnapshot, user_input: str,
+                        history: Optional[List[Dict[str, str]]] = None, follow_up: bool = False) -> List[Dict[str, str]]:
+        """Build the ChatGPT messages for a chat turn, after the session's recent turns"""
+        history = history or []
+        # A follow-up ("is it spicy?") retrieves context for the question it refers back to as well
+        query = user_input
+        if follow_up:
+            previous = [m["content"] for m in history if m["role"] == "user"]
+            query = f"{previous[-1]} {user_input}" if previous else user_input
+        return [
+            {"role": "system", "content": snapshot.build_system_message(query)},
+            *history,
+            {"role": "user", "content": user_input}
+        ]
+    
+    async def _complete(self, messages: List[Dict[str, str]], usage: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Call the OpenAI API without blocking the event loop and return the response text.
+        
+        Args:
+            messages: Chat messages to send
+            usage: Filled with the model, token counts and upstream latency of the call
+        """
+        upstream_started_at = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=CHATBOT_MODEL,
+            messages=messages,
+            max_tokens=500,
+            temperature=0.7
+        )
+        content = response.choices[0].message.content.strip()
+        if usage is not None:
+            usage.update(
+                model=response.model or CHATBOT_MODEL,
+                prompt_tokens=response.usage.prompt_tokens if response.usage else None,
+                completion_tokens=response.usage.completion_tokens if response.usage else count_tokens(content),
+                upstream_ms=(time.perf_counter() - upstream_started_at) * 1000
+            )
+        return content
+    
+    @staticmethod
+    def _direct_answer(snapshot: RestaurantSnapshot, user_input: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Answer a message without the LLM when possible.
+        
+        Tries the restaurant's curated FAQs first, then templated answers for
+        hours, location, contact and reservation questions, then the answer
+        cache. Time-dependent questions ("are you open now?") are answered by
+        the intent router before they can reach the cache. Follow-up questions
+        skip the cache, since their answer depends on the conversation.
+        
+        Returns:
+            dict: answer, source ("faq", "intent" or "cache"), match score and intent,
+                  or None if the LLM is needed
+        """
+        restaurant_id = snapshot.restaurant_id
+        
+        faq = snapshot.match_faq(user_input)
+        if faq:
+            logger.info(f"FAQ {faq['id']} matched for restaurant {restaurant_id} (score {faq['score']}): {faq['question']!r}")
+            return {"answer": faq["answer"], "source": "faq", "score": faq["score"], "intent": None}
+        
+        routed = snapshot.answer_intent(user_input)
+        if routed:
+            logger.info(f"Intent {routed['intent']} answered for restaurant {restaurant_id}")
+            return {"answer": routed["answer"], "source": "intent", "score": None, "intent": routed["intent"]}
+        
+        cached = answer_cache.lookup(restaurant_id, snapshot.version, user_input) if use_cache and snapshot.version else None
+        if cached:
+            logger.info(f"Answer cache {cached['match']} hit for restaurant {restaurant_id} (similarity {cached['similarity']})")
+            return {"answer": cached["answer"], "source": "cache", "score": cached["similarity"], "intent": None}
+        
+        return None
+    
+    def _prompt_too_large(self, restaurant_id: int, session_id: str, user_input: str,
+                          error: PromptTooLargeError, started_at: float) -> Dict[str, Any]:
+        """Log and describe a turn refused because its prompt can't fit the token budget"""
+        logger.warning(f"Refused chat turn for restaurant {restaurant_id}: {str(error)}")
+        total_ms = (time.perf_counter() - started_at) * 1000
+        self._log_turn(restaurant_id, session_id, user_input, "Message too long",
+                       response_source="too_large", total_ms=total_ms)
+        return {
+            "session_id": session_id,
+            "response": "Sorry, that message is too long for me to answer. Could you shorten it?",
+            "source": "too_large",
+            "error": f"Message too long: {str(error)}"
+        }
+    
+    @staticmethod
+    def _restaurant_not_found(session_id: str) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
+            "response": "Sorry, I couldn't find information about this restaurant.",
+            "error": "Restaurant not found"
+        }
+    
+    def _log_turn(self, restaurant_id: int, session_id: str, user_input: str, chatbot_response: str,
+                  feedback_text: str = None, response_source: str = "llm", match_score: float = None,
+                  total_ms: float = None, model: str = None, prompt_tokens: int = None,
+                  completion_tokens: int = None, upstream_ms: float = None):
+        """
+        Log a chat turn, returning the log id (None if logging fails).
+        
+        Turns go through the background log writer when it is running, so the
+        request doesn't wait on a commit; otherwise the row is written directly.
+        Model, token counts and upstream latency are only set for turns that
+        called the LLM.
+        """
+        log_data = {
+            "restaurant_id": restaurant_id,
+            "session_id": session_id,
+            "user_input": user_input,
+            "chatbot_response": chatbot_response,
+            "response_source": response_source,
+            "match_score": match_score,
+            "feedback_text": feedback_text,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "upstream_ms": round(upstream_ms, 1) if upstream_ms is not None else None,
+            "total_ms": round(total_ms, 1) if total_ms is not None else None,
+            "timestamp": datetime.utcnow()
+        }
+            
+        try:
+            if log_writer.running:
+                return log_writer.submit(log_data)
+            return ChatbotLogService.log_conversation(self.db, log_data).id
+        except Exception as log_error:
+            print(f"Error logging conversation: {str(log_error)}")
+            return None
+    
+    async def generate_chatbot_response(self, restaurant_id: int, user_input: str, session_id: str = None) -> Dict[str, Any]:
+        """Generate a response from the chatbot using ChatGPT API and restaurant data"""
+        # Create session ID if not provided
+        new_session = not session_id
+        if new_session:
+            session_id = str(uuid.uuid4())
+        
+        started_at = time.perf_counter()
             
-        # Get restaurant data from database
-        restaurant_data = ChatbotDataService.get_restaurant_chatbot_data(self.db, restaurant_id)
+        snapshot, error_response = self._load_snapshot(restaurant_id, session_id)
+        if error_response:
+            return error_response
         
-        if not restaurant_data:
+        history = [] if new_session else self._load_history(restaurant_id, session_id)
+        follow_up = bool(history) and is_follow_up(user_input)
+        
+        # Serve FAQ matches, structured questions and repeat questions without calling the LLM
+        direct = self._direct_answer(snapshot, user_input, use_cache=not follow_up)
+        if direct:
+            total_ms = (time.perf_counter() - started_at) * 1000
+            response_metrics.record(direct["source"], total_ms, direct["intent"])
+            conversation_store.append(session_id, restaurant_id, user_input, direct["answer"])
+            conversation_compactor.schedule(session_id)
+            log_id = self._log_turn(
+                restaurant_id, session_id, user_input, direct["answer"],
+                response_source=direct["source"], match_score=direct["score"], total_ms=total_ms
+            )
             return {
                 "session_id": session_id,
-                "response": "Sorry, I couldn't load information about this restaurant.",
-                "error": "Failed to load restaurant data"
+                "response": direct["answer"],
+                "log_id": log_id,
+                "cached": True,
+                "source": direct["source"]
             }
-            
-        # Prepare context for ChatGPT
-        restaurant_context = json.dumps(restaurant_data, indent=2)
-        
-        # Prepare system message with restaurant-specific information
-        system_message = f"""
-        You are a helpful waiter assistant for {restaurant.name}. 
-        Your name is "{restaurant.name} Assistant".
-        
-        Use the following restaurant information to answer customer questions:
-        {restaurant_context}
-        
-        - Be polite, friendly, and helpful like a waiter would be.
-        - If asked about menu items, provide details about ingredients, pricing, and dietary information.
-        - If asked about hours, provide the correct operating hours for the requested day.
-        - If asked about location, provide the address and contact information.
-        - If asked about reservations, provide the reservation policy and how to make a reservation.
-        - If asked a question you don't have information for, apologize and offer to connect them with the restaurant directly.
-        - Keep responses concise and conversational, like a helpful waiter would.
-        - Do not mention that you're an AI or that you're using provided information.
-        - If greeting the user, use the custom greeting if available: "{restaurant.chatbot_greeting or 'Welcome to ' + restaurant.name + '! How can I help you today?'}"
-        """
         
+        messages = self._build_messages(snapshot, user_input, history, follow_up)
+        usage = {}
+        
+        # Counted locally, so an oversized prompt is trimmed or refused before it is paid for
         try:
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-4",  # or the model of your choice
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_input}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            # Extract response text
-            chatbot_response = response.choices[0].message.content.strip()
+            messages, prompt_tokens = fit_prompt(messages)
+        except PromptTooLargeError as e:
+            return self._prompt_too_large(restaurant_id, session_id, user_input, e, started_at)
+        
+        try:
+            if snapshot.version and not follow_up:
+                # Identical questions in flight at the same time share one upstream call
+                chatbot_response, shared = await answer_cache.get_or_compute(
+                    restaurant_id, snapshot.version, user_input, lambda: self._complete(messages, usage)
+                )
+            else:
+                chatbot_response, shared = await self._complete(messages, usage), False
+            if usage and usage["prompt_tokens"] is None:
+                usage["prompt_tokens"] = prompt_tokens
+            total_ms = (time.perf_counter() - started_at) * 1000
+            response_metrics.record("cache" if shared else "llm", total_ms)
+            conversation_store.append(session_id, restaurant_id, user_input, chatbot_response)
+            conversation_compactor.schedule(session_id)
             
             # Log the conversation
-            log_entry = None
-            try:
-                log_entry = ChatbotLogService.log_conversation(
-                    self.db,
-                    {
-                        "restaurant_id": restaurant_id,
-                        "session_id": session_id,
-                        "user_input": user_input,
-                        "chatbot_response": chatbot_response,
-                        "timestamp": datetime.utcnow()
-                    }
-                )
-            except Exception as log_error:
-                print(f"Error logging conversation: {str(log_error)}")
+            log_id = self._log_turn(
+                restaurant_id, session_id, user_input, chatbot_response,
+                response_source="cache" if shared else "llm", total_ms=total_ms, **usage
+            )
             
             return {
                 "session_id": session_id,
                 "response": chatbot_response,
-                "log_id": log_entry.id if log_entry else None
+                "log_id": log_id,
+                "cached": shared,
+                "source": "cache" if shared else "llm"
             }
             
         except Exception as e:
@@ -121,23 +308,133 @@ class ChatbotService:
             print(error_message)
             
             # Try to log the error
-            try:
-                ChatbotLogService.log_conversation(
-                    self.db,
-                    {
-                        "restaurant_id": restaurant_id,
-                        "session_id": session_id,
-                        "user_input": user_input,
-                        "chatbot_response": "Error occurred",
-                        "timestamp": datetime.utcnow(),
-                        "feedback_text": error_message
-                    }
-                )
-            except Exception:
-                pass  # Silent fail if logging also fails
+            self._log_turn(restaurant_id, session_id, user_input, "Error occurred", feedback_text=error_message)
             
             return {
                 "session_id": session_id,
                 "response": "I'm sorry, but I'm having trouble connecting to my knowledge base right now. Please try again in a moment.",
                 "error": error_message
-            }
\ No newline at end of file
+            }
+    
+    async def stream_chatbot_response(self, restaurant_id: int, user_input: str, session_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chatbot response token by token.
+        
+        Yields event dictionaries with an "event" key: one "token" event per chunk
+        of text, followed by a single "done" event (carrying the log id and
+        time-to-first-token) or an "error" event. The conversation is logged once
+        the stream has finished.
+        """
+        # Create session ID if not provided
+        new_session = not session_id
+        if new_session:
+            session_id = str(uuid.uuid4())
+            
+        snapshot, error_response = self._load_snapshot(restaurant_id, session_id)
+        if error_response:
+            yield {"event": "error", **error_response}
+            return
+        
+        started_at = time.perf_counter()
+        history = [] if new_session else self._load_history(restaurant_id, session_id)
+        follow_up = bool(history) and is_follow_up(user_input)
+        
+        # Serve FAQ matches, structured questions and repeat questions as a single chunk
+        direct = self._direct_answer(snapshot, user_input, use_cache=not follow_up)
+        if direct:
+            total_ms = (time.perf_counter() - started_at) * 1000
+            response_metrics.record(direct["source"], total_ms, direct["intent"])
+            conversation_store.append(session_id, restaurant_id, user_input, direct["answer"])
+            conversation_compactor.schedule(session_id)
+            yield {"event": "token", "content": direct["answer"]}
+            log_id = self._log_turn(
+                restaurant_id, session_id, user_input, direct["answer"],
+                response_source=direct["source"], match_score=direct["score"], total_ms=total_ms
+            )
+            elapsed_ms = round((time.perf_counter() - started_at) * 1000, 1)
+            yield {
+                "event": "done",
+                "session_id": session_id,
+                "log_id": log_id,
+                "cached": True,
+                "source": direct["source"],
+                "time_to_first_token_ms": elapsed_ms,
+                "total_time_ms": elapsed_ms
+            }
+            return
+        
+        messages = self._build_messages(snapshot, user_input, history, follow_up)
+        first_token_ms = None
+        chunks = []
+        usage = None
+        
+        try:
+            messages, prompt_tokens = fit_prompt(messages)
+        except PromptTooLargeError as e:
+            yield {"event": "error", **self._prompt_too_large(restaurant_id, session_id, user_input, e, started_at)}
+            return
+        
+        try:
+            upstream_started_at = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model=CHATBOT_MODEL,
+                messages=messages,
+                max_tokens=500,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started_at) * 1000
+                chunks.append(content)
+                yield {"event": "token", "content": content}
+                
+        except Exception as e:
+            error_message = f"Error generating chatbot response: {str(e)}"
+            print(error_message)
+            
+            self._log_turn(restaurant_id, session_id, user_input, "Error occurred", feedback_text=error_message)
+            
+            yield {
+                "event": "error",
+                "session_id": session_id,
+                "response": "I'm sorry, but I'm having trouble connecting to my knowledge base right now. Please try again in a moment.",
+                "error": error_message
+            }
+            return
+        
+        chatbot_response = "".join(chunks).strip()
+        total_ms = (time.perf_counter() - started_at) * 1000
+        upstream_ms = (time.perf_counter() - upstream_started_at) * 1000
+        response_metrics.record("llm", total_ms)
+        conversation_store.append(session_id, restaurant_id, user_input, chatbot_response)
+        conversation_compactor.schedule(session_id)
+        
+        # Log the conversation once the full response is known
+        log_id = self._log_turn(
+            restaurant_id, session_id, user_input, chatbot_response, total_ms=total_ms, model=CHATBOT_MODEL,
+            prompt_tokens=usage.prompt_tokens if usage else prompt_tokens,
+            completion_tokens=usage.completion_tokens if usage else count_tokens(chatbot_response),
+            upstream_ms=upstream_ms
+        )
+        if snapshot.version and not follow_up:
+            answer_cache.store(restaurant_id, snapshot.version, user_input, chatbot_response)
+        
+        yield {
+            "event": "done",
+            "session_id": session_id,
+            "log_id": log_id,
+            "cached": False,
+            "source": "llm",
+            "time_to_first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "total_time_ms": round(total_ms, 1)
+        }
@@ -1,17 +1,47 @@
 # OpenAI API service integration
-import os
-import openai
 from typing import Dict, List, Optional, Any
+from services.llm_backend import LLMBackend, get_llm_backend
 
 class ChatGPTService:
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the ChatGPT service with API key."""
-        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        if not self.api_key:
+    def __init__(self, api_key: Optional[str] = None, backend: Optional[LLMBackend] = None):
+        """Initialize the ChatGPT service with API key (or an explicit completion backend)."""
+        if backend is None:
+            backend = get_llm_backend()
+            if api_key:
+                backend = LLMBackend(backend.name, api_key)
+        self.backend = backend
+        self.api_key = backend.api_key
+        if not backend.configured:
             raise ValueError("OpenAI API key is required. Either pass it explicitly or set OPENAI_API_KEY environment variable.")
         
-        # Initialize the OpenAI client
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Use the process-wide pooled clients
+        self.client = backend.client()
+        self.async_client = backend.async_client()
+    
+    @staticmethod
+    def _format_response(response) -> Dict[str, Any]:
+        """Convert an API response into the service's response dictionary."""
+        return {
+            "message": response.choices[0].message.content,
+            "finish_reason": response.choices[0].finish_reason,
+            "model": response.model,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
+        }
+    
+    @staticmethod
+    def _format_error(error: Exception) -> Dict[str, Any]:
+        """Build the failure response returned when the API call fails."""
+        print(f"Error calling OpenAI API: {error}")
+        return {
+            "error": str(error),
+            "message": None,
+            "finish_reason": "error",
+            "usage": None
+        }
         
     def get_completion(self, 
                        messages: List[Dict[str, str]], 
@@ -38,24 +68,40 @@ class ChatGPTService:
                 max_tokens=max_tokens
             )
             
-            return {
-                "message": response.choices[0].message.content,
-                "finish_reason": response.choices[0].finish_reason,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
+            return self._format_response(response)
         except Exception as e:
             # Log the error and return a failure response
-            print(f"Error calling OpenAI API: {e}")
-            return {
-                "error": str(e),
-                "message": None,
-                "finish_reason": "error",
-                "usage": None
-            }
+            return self._format_error(e)
+    
+    async def get_completion_async(self, 
+                                   messages: List[Dict[str, str]], 
+                                   model: str = "gpt-3.5-turbo",
+                                   temperature: float = 0.7,
+                                   max_tokens: int = 1000) -> Dict[str, Any]:
+        """
+        Awaitable version of get_completion that doesn't block the event loop.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            model: The OpenAI model to use
+            temperature: Controls randomness (0-1)
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            The response from the API
+        """
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            
+            return self._format_response(response)
+        except Exception as e:
+            # Log the error and return a failure response
+            return self._format_error(e)
     
     def get_simple_completion(self, prompt: str, **kwargs) -> str:
         """
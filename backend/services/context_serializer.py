@@ -0,0 +1,243 @@
+# backend/services/context_serializer.py
+# Compact, token-budgeted serialization of restaurant data for chatbot prompts
+
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", 3000))
+
+# tiktoken gives exact counts when installed; otherwise fall back to the
+# usual ~4 characters per token estimate for English text
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+DIETARY_FLAGS = [
+    ("vegetarian", "V"),
+    ("vegan", "VG"),
+    ("gluten_free", "GF"),
+    ("contains_nuts", "N"),
+    ("contains_dairy", "D"),
+    ("contains_alcohol", "A"),
+]
+
+MENU_LEGEND = "Tags: V=vegetarian VG=vegan GF=gluten-free N=contains nuts D=contains dairy A=contains alcohol S1-S5=spice level, *=popular, !=chef special"
+
+DAY_ABBREVIATIONS = {
+    "Monday": "Mon", "Tuesday": "Tue", "Wednesday": "Wed", "Thursday": "Thu",
+    "Friday": "Fri", "Saturday": "Sat", "Sunday": "Sun"
+}
+
+# Line priorities: lower numbers are dropped first when over budget
+ESSENTIAL = 3
+IMPORTANT = 2
+OPTIONAL = 1
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate) the number of prompt tokens in text"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def _short_time(value: Optional[str]) -> str:
+    # "11:00:00" -> "11:00"
+    if not value:
+        return ""
+    return value[:5] if value.endswith(":00") and len(value) == 8 else value
+
+def _format_hours(hours: List[Dict[str, Any]]) -> str:
+    parts = []
+    for entry in hours:
+        day = DAY_ABBREVIATIONS.get(entry.get("day"), entry.get("day"))
+        if entry.get("is_closed") or not entry.get("hours"):
+            parts.append(f"{day} closed")
+            continue
+        open_time, _, close_time = entry["hours"].partition(" - ")
+        parts.append(f"{day} {_short_time(open_time)}-{_short_time(close_time)}")
+    return "; ".join(parts)
+
+def _format_item(item: Dict[str, Any], detail: int) -> str:
+    tags = [tag for key, tag in DIETARY_FLAGS if item.get("dietary_info", {}).get(key)]
+    spice_level = item.get("dietary_info", {}).get("spice_level")
+    if spice_level:
+        tags.append(f"S{spice_level}")
+
+    line = f"- {item['name']} ${item['price']:.2f}"
+    if tags:
+        line += f" [{','.join(tags)}]"
+    if item.get("popular"):
+        line += "*"
+    if item.get("chef_special"):
+        line += "!"
+    if detail >= 1 and item.get("description"):
+        line += f": {item['description']}"
+    if detail >= 2 and item.get("ingredients"):
+        line += f" ({', '.join(item['ingredients'])})"
+    return line
+
+def _build_lines(data: Dict[str, Any], detail: int) -> List[Tuple[int, str]]:
+    """Render the restaurant data as (priority, line) pairs at a detail level"""
+    lines: List[Tuple[int, str]] = []
+
+    info = data.get("restaurant_info", {})
+    summary = [f"Name: {info.get('name')}"]
+    if info.get("cuisine_type"):
+        summary.append(f"Cuisine: {info['cuisine_type']}")
+    if info.get("price_range"):
+        summary.append(f"Price: {info['price_range']}")
+    if info.get("website"):
+        summary.append(f"Web: {info['website']}")
+    lines.append((ESSENTIAL, "# Restaurant"))
+    lines.append((ESSENTIAL, " | ".join(summary)))
+    if info.get("description"):
+        lines.append((IMPORTANT, info["description"]))
+
+    if data.get("locations"):
+        lines.append((ESSENTIAL, "# Locations"))
+        for loc in data["locations"]:
+            parts = [loc.get("address")]
+            if loc.get("phone"):
+                parts.append(f"tel {loc['phone']}")
+            if loc.get("email"):
+                parts.append(loc["email"])
+            line = "- " + " | ".join(p for p in parts if p)
+            if loc.get("is_primary") and len(data["locations"]) > 1:
+                line += " (primary)"
+            lines.append((ESSENTIAL, line))
+
+    if data.get("hours"):
+        lines.append((ESSENTIAL, "# Hours"))
+        lines.append((ESSENTIAL, _format_hours(data["hours"])))
+
+    reservations = data.get("reservations")
+    if reservations:
+        lines.append((ESSENTIAL, "# Reservations"))
+        if reservations.get("accepts_reservations"):
+            line = (f"Accepted; party size {reservations.get('min_party_size')}-{reservations.get('max_party_size')}; "
+                    f"book up to {reservations.get('advance_reservation_days')} days ahead")
+            if reservations.get("special_instructions"):
+                line += f"; {reservations['special_instructions']}"
+        else:
+            line = "Not accepted"
+        lines.append((ESSENTIAL, line))
+
+    if data.get("menus"):
+        lines.append((IMPORTANT, "# Menu"))
+        lines.append((IMPORTANT, MENU_LEGEND))
+        for menu in data["menus"]:
+            header = f"## {menu['name']}"
+            if menu.get("start_time") and menu.get("end_time"):
+                header += f" ({_short_time(menu['start_time'])}-{_short_time(menu['end_time'])})"
+            lines.append((IMPORTANT, header))
+            for category in menu.get("categories", []):
+                header = f"### {category['name']}"
+                if detail >= 1 and category.get("description"):
+                    header += f": {category['description']}"
+                lines.append((IMPORTANT, header))
+                for item in category.get("items", []):
+                    priority = IMPORTANT if item.get("popular") or item.get("chef_special") else OPTIONAL
+                    lines.append((priority, _format_item(item, detail)))
+
+    if data.get("faqs"):
+        lines.append((IMPORTANT, "# FAQs"))
+        for category, faqs in data["faqs"].items():
+            if category:
+                lines.append((IMPORTANT, f"## {category}"))
+            for faq in faqs:
+                lines.append((OPTIONAL, f"Q: {faq['question']} A: {faq['answer']}"))
+
+    return lines
+
+def _header_level(line: str) -> int:
+    if not line.startswith("#"):
+        return 0
+    return len(line) - len(line.lstrip("#"))
+
+def _drop_empty_headers(lines: List[str]) -> List[str]:
+    """Remove section headers left without any content after truncation"""
+    result = []
+    # Walk backwards so a header is judged against the lines actually kept after it
+    for line in reversed(lines):
+        level = _header_level(line)
+        if level:
+            next_level = _header_level(result[-1]) if result else 1
+            if next_level and next_level <= level:
+                continue
+        result.append(line)
+    return result[::-1]
+
+def _omitted_note(dropped: int) -> str:
+    return f"(Some menu items and FAQs omitted for length; {dropped} entries not shown.)"
+
+def serialize_restaurant_context(data: Dict[str, Any], token_budget: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Serialize chatbot restaurant data into a dense prompt section.
+
+    Null and false flags are dropped and repeated structure is abbreviated
+    (dietary flags become short tags explained once in a legend). If the
+    result exceeds the token budget, detail is removed gracefully: first
+    ingredient lists, then descriptions, then individual FAQ entries and
+    regular menu items from the end. Restaurant details, locations, hours
+    and reservation policy are never dropped.
+
+    Args:
+        data: Restaurant data from ChatbotDataService.get_restaurant_chatbot_data
+        token_budget: Maximum tokens for the context (defaults to PROMPT_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        dict: text, token_count, token_budget, truncated and dropped_lines
+    """
+    token_budget = token_budget or DEFAULT_CONTEXT_TOKEN_BUDGET
+
+    # Try full detail, then progressively leaner renderings
+    for detail in (2, 1, 0):
+        lines = _build_lines(data, detail)
+        text = "\n".join(line for _, line in lines)
+        token_count = count_tokens(text)
+        if token_count <= token_budget:
+            return {
+                "text": text,
+                "token_count": token_count,
+                "token_budget": token_budget,
+                "truncated": detail < 2,
+                "dropped_lines": 0
+            }
+
+    # Still over budget: drop the lowest priority lines, last ones first,
+    # leaving room for the note saying how many were omitted
+    line_tokens = [count_tokens(line) + 1 for _, line in lines]
+    total = sum(line_tokens)
+    target = token_budget - count_tokens(_omitted_note(len(lines))) - 1
+    keep = [True] * len(lines)
+    dropped = 0
+    for priority in (OPTIONAL, IMPORTANT):
+        for index in range(len(lines) - 1, -1, -1):
+            if total <= target:
+                break
+            if keep[index] and lines[index][0] == priority:
+                keep[index] = False
+                total -= line_tokens[index]
+                dropped += 1
+
+    kept_lines = _drop_empty_headers([line for (_, line), kept in zip(lines, keep) if kept])
+    if dropped:
+        kept_lines.append(_omitted_note(dropped))
+    text = "\n".join(kept_lines)
+    token_count = count_tokens(text)
+    if token_count > token_budget:
+        logger.warning(f"Essential restaurant context ({token_count} tokens) exceeds budget of {token_budget}")
+
+    return {
+        "text": text,
+        "token_count": token_count,
+        "token_budget": token_budget,
+        "truncated": True,
+        "dropped_lines": dropped
+    }
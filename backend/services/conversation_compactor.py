@@ -0,0 +1,159 @@
+# backend/services/conversation_compactor.py
+# Folds older turns of long chat sessions into a running summary
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from services.context_serializer import count_tokens
+from services.session_store import ConversationStore, conversation_store
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+COMPACTION_TOKEN_THRESHOLD = int(os.getenv("COMPACTION_TOKEN_THRESHOLD", 600))  # Verbatim history tokens before compacting
+COMPACTION_KEEP_TURNS = int(os.getenv("COMPACTION_KEEP_TURNS", 2))  # Latest exchanges always kept verbatim
+COMPACTION_SUMMARY_MAX_TOKENS = int(os.getenv("COMPACTION_SUMMARY_MAX_TOKENS", 200))
+COMPACTION_MODEL = os.getenv("COMPACTION_MODEL", "gpt-3.5-turbo")
+COMPACTION_WORKERS = int(os.getenv("COMPACTION_WORKERS", 2))
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a guest's chat with a restaurant assistant. "
+    "Merge the earlier summary (if any) with the new turns into one short paragraph. "
+    "Keep what the guest asked for and decided: dishes they liked or ruled out, dietary "
+    "needs and allergies, party size, dates and times, and any question still open. "
+    "Leave out greetings and details the assistant can look up again. "
+    f"Stay under {COMPACTION_SUMMARY_MAX_TOKENS} tokens."
+)
+
+def _history_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) for m in messages)
+
+class ConversationCompactor:
+    """
+    Keeps the chat prompt near-constant in size however long a session runs.
+
+    After each exchange, a session whose verbatim turns exceed
+    COMPACTION_TOKEN_THRESHOLD tokens (or are about to overflow the store's
+    turn limit) has all but its latest COMPACTION_KEEP_TURNS exchanges folded
+    into a running summary. The summary is requested from the LLM on a
+    background thread once the response has been sent, so no chat request
+    waits on it; until it is ready the session keeps its full turns.
+    """
+
+    def __init__(self, store: ConversationStore = conversation_store, enabled: bool = COMPACTION_ENABLED,
+                 token_threshold: int = COMPACTION_TOKEN_THRESHOLD, keep_turns: int = COMPACTION_KEEP_TURNS,
+                 summarizer: Optional[Callable[[Optional[str], List[Dict[str, str]]], str]] = None,
+                 workers: int = COMPACTION_WORKERS):
+        self.store = store
+        self.enabled = enabled
+        self.token_threshold = token_threshold
+        self.keep_turns = keep_turns
+        self.summarizer = summarizer or self._summarize
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+        self.tokens_saved = 0
+        self.total_ms = 0.0
+
+    def _fold_count(self, turns: List[Dict[str, str]]) -> int:
+        """How many of the oldest messages to fold (0 while the history is small enough)"""
+        keep = self.keep_turns * 2
+        if len(turns) <= keep:
+            return 0
+        full = len(turns) >= self.store.max_turns * 2
+        if not full and _history_tokens(turns) <= self.token_threshold:
+            return 0
+        return len(turns) - keep
+
+    def schedule(self, session_id: Optional[str]) -> bool:
+        """
+        Compact a session in the background if its history has grown too long.
+
+        Args:
+            session_id: Chat session that just recorded an exchange
+
+        Returns:
+            bool: Whether a compaction was started
+        """
+        if not self.enabled or not session_id:
+            return False
+        job = self.store.start_compaction(session_id, self._fold_count)
+        if job is None:
+            return False
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compactor")
+            self.scheduled += 1
+        self._executor.submit(self.compact, session_id, job)
+        return True
+
+    def compact(self, session_id: str, job: Dict[str, Any]):
+        """Summarize a claimed job's turns and store the summary (runs on a worker thread)"""
+        started_at = time.perf_counter()
+        folded = job["turns"]
+        summary = None
+        try:
+            summary = self.summarizer(job["summary"], folded)
+        except Exception as e:
+            logger.warning(f"Could not compact conversation {session_id}: {str(e)}")
+        tokens_before = _history_tokens(folded) + count_tokens(job["summary"] or "")
+        tokens_after = count_tokens(summary or "")
+        self.store.finish_compaction(session_id, folded, summary, tokens_before, tokens_after)
+        with self._lock:
+            if summary:
+                self.completed += 1
+                self.tokens_saved += max(0, tokens_before - tokens_after)
+                self.total_ms += (time.perf_counter() - started_at) * 1000
+            else:
+                self.failed += 1
+
+    @staticmethod
+    def _summarize(previous_summary: Optional[str], turns: List[Dict[str, str]]) -> str:
+        """Ask the configured LLM backend to merge the turns into the running summary"""
+        # Imported here so the store and tests don't need an LLM client
+        from services.llm_backend import get_llm_backend
+        backend = get_llm_backend()
+        if not backend.configured:
+            raise RuntimeError("no LLM backend configured")
+        transcript = "\n".join(
+            f"{'Guest' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in turns
+        )
+        response = backend.client().chat.completions.create(
+            model=COMPACTION_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": f"Earlier summary: {previous_summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=COMPACTION_SUMMARY_MAX_TOKENS,
+            temperature=0
+        )
+        return (response.choices[0].message.content or "").strip()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "token_threshold": self.token_threshold,
+                "keep_turns": self.keep_turns,
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "failed": self.failed,
+                "tokens_saved": self.tokens_saved,
+                "avg_ms": round(self.total_ms / self.completed, 2) if self.completed else 0.0
+            }
+
+# Shared compactor for the process
+conversation_compactor = ConversationCompactor()
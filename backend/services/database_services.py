@@ -1,8 +1,8 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 import json
 from typing import List, Dict, Any, Optional
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 
 # Import your models
 from database.models import (
@@ -10,6 +10,9 @@ from database.models import (
     MenuItem, MenuItemIngredient, FAQ, User, ChatbotLog,
     ReservationSettings
 )
+from services.log_writer import log_writer
+from services.prompt_cache import prompt_cache
+from services.token_accounting import summarize_usage
 
 class RestaurantService:
     """Service for restaurant-related database operations"""
@@ -40,6 +43,15 @@ class RestaurantService:
             db.refresh(restaurant)
         return restaurant
     
+    @staticmethod
+    def touch_restaurant(db: Session, restaurant_id: int) -> None:
+        """Bump a restaurant's updated_at so cached chatbot data is rebuilt (caller commits)"""
+        db.query(Restaurant).filter(Restaurant.id == restaurant_id).update(
+            {Restaurant.updated_at: datetime.utcnow()}, synchronize_session=False
+        )
+        # Other workers notice the new version within PROMPT_CACHE_VERSION_TTL
+        prompt_cache.invalidate(restaurant_id)
+    
     @staticmethod
     def get_all_restaurants(db: Session, skip: int = 0, limit: int = 100) -> List[Restaurant]:
         """Get all restaurants with pagination"""
@@ -61,6 +73,7 @@ class LocationService:
         """Create a new location for a restaurant"""
         location = Location(**location_data)
         db.add(location)
+        RestaurantService.touch_restaurant(db, location.restaurant_id)
         db.commit()
         db.refresh(location)
         return location
@@ -77,6 +90,7 @@ class LocationService:
         if location:
             for key, value in location_data.items():
                 setattr(location, key, value)
+            RestaurantService.touch_restaurant(db, location.restaurant_id)
             db.commit()
             db.refresh(location)
         return location
@@ -89,6 +103,7 @@ class OperatingHoursService:
         """Create operating hours for a restaurant"""
         hours = OperatingHours(**hours_data)
         db.add(hours)
+        RestaurantService.touch_restaurant(db, hours.restaurant_id)
         db.commit()
         db.refresh(hours)
         return hours
@@ -125,6 +140,7 @@ class MenuService:
         """Create a new menu for a restaurant"""
         menu = Menu(**menu_data)
         db.add(menu)
+        RestaurantService.touch_restaurant(db, menu.restaurant_id)
         db.commit()
         db.refresh(menu)
         return menu
@@ -142,6 +158,9 @@ class MenuService:
         """Create a new menu category"""
         category = MenuCategory(**category_data)
         db.add(category)
+        RestaurantService.touch_restaurant(
+            db, db.query(Menu.restaurant_id).filter(Menu.id == category.menu_id).scalar()
+        )
         db.commit()
         db.refresh(category)
         return category
@@ -159,17 +178,29 @@ class MenuService:
             for ing_data in ingredients:
                 ingredient = MenuItemIngredient(menu_item_id=menu_item.id, **ing_data)
                 db.add(ingredient)
-            db.commit()
+        
+        # Bump the restaurant version once the item and its ingredients are in place
+        restaurant_id = db.query(Menu.restaurant_id).join(
+            MenuCategory, MenuCategory.menu_id == Menu.id
+        ).filter(MenuCategory.id == menu_item.category_id).scalar()
+        RestaurantService.touch_restaurant(db, restaurant_id)
+        db.commit()
         
         return menu_item
     
     @staticmethod
     def get_full_menu_by_restaurant(db: Session, restaurant_id: int) -> Dict[str, Any]:
         """Get the full menu structure for a restaurant"""
-        menus = db.query(Menu).filter(
+        # Load the whole tree up front: one query per level (menus, categories,
+        # active items, ingredients) no matter how large the menu is
+        menus = db.query(Menu).options(
+            selectinload(Menu.categories)
+            .selectinload(MenuCategory.items.and_(MenuItem.is_active == True))
+            .selectinload(MenuItem.ingredients)
+        ).filter(
             Menu.restaurant_id == restaurant_id,
             Menu.is_active == True
-        ).all()
+        ).order_by(Menu.id).all()
         
         result = []
         for menu in menus:
@@ -228,6 +259,7 @@ class FAQService:
         """Create a new FAQ for a restaurant"""
         faq = FAQ(**faq_data)
         db.add(faq)
+        RestaurantService.touch_restaurant(db, faq.restaurant_id)
         db.commit()
         db.refresh(faq)
         return faq
@@ -247,6 +279,7 @@ class FAQService:
         if faq:
             for key, value in faq_data.items():
                 setattr(faq, key, value)
+            RestaurantService.touch_restaurant(db, faq.restaurant_id)
             db.commit()
             db.refresh(faq)
         return faq
@@ -277,10 +310,50 @@ class ChatbotLogService:
             ChatbotLog.session_id == session_id
         ).order_by(ChatbotLog.timestamp).all()
     
+    @staticmethod
+    def get_recent_turns(db: Session, restaurant_id: int, session_id: str, max_messages: int) -> List[Dict[str, str]]:
+        """Get a session's most recent exchanges as chat messages, oldest first"""
+        logs = db.query(ChatbotLog.user_input, ChatbotLog.chatbot_response).filter(
+            ChatbotLog.session_id == session_id,
+            ChatbotLog.restaurant_id == restaurant_id,
+            ChatbotLog.feedback_text.is_(None) | ~ChatbotLog.feedback_text.like("Error generating%")
+        ).order_by(ChatbotLog.timestamp.desc()).limit((max_messages + 1) // 2).all()
+        
+        messages = []
+        for user_input, chatbot_response in reversed(logs):
+            messages.append({"role": "user", "content": user_input})
+            messages.append({"role": "assistant", "content": chatbot_response})
+        return messages[-max_messages:]
+    
+    @staticmethod
+    def get_usage_aggregates(db: Session, restaurant_id: int, days: int = 30) -> Dict[str, Any]:
+        """Get a restaurant's token usage, estimated cost and latency over the last few days"""
+        since = datetime.utcnow() - timedelta(days=days)
+        rows = db.query(
+            ChatbotLog.model,
+            func.count(ChatbotLog.id).label("turns"),
+            func.count(ChatbotLog.upstream_ms).label("llm_turns"),
+            func.sum(ChatbotLog.prompt_tokens).label("prompt_tokens"),
+            func.sum(ChatbotLog.completion_tokens).label("completion_tokens"),
+            func.sum(ChatbotLog.upstream_ms).label("upstream_ms"),
+            func.sum(ChatbotLog.total_ms).label("total_ms")
+        ).filter(
+            ChatbotLog.restaurant_id == restaurant_id,
+            ChatbotLog.timestamp >= since
+        ).group_by(ChatbotLog.model).all()
+        
+        usage = summarize_usage(row._asdict() for row in rows)
+        usage["days"] = days
+        return usage
+    
     @staticmethod
     def add_feedback(db: Session, log_id: int, rating: int, feedback_text: str = None) -> Optional[ChatbotLog]:
         """Add user feedback to a conversation log"""
         log = db.query(ChatbotLog).filter(ChatbotLog.id == log_id).first()
+        if not log and log_writer.running:
+            # The turn may still be queued in the background log writer
+            log_writer.wait_for(log_id)
+            log = db.query(ChatbotLog).filter(ChatbotLog.id == log_id).first()
         if log:
             log.feedback_rating = rating
             log.feedback_text = feedback_text
@@ -320,6 +393,7 @@ class ChatbotDataService:
             if faq.category not in formatted_faqs:
                 formatted_faqs[faq.category] = []
             formatted_faqs[faq.category].append({
+                "id": faq.id,
                 "question": faq.question,
                 "answer": faq.answer
             })
@@ -335,7 +409,9 @@ class ChatbotDataService:
             },
             "locations": [
                 {
-                    "address": f"{loc.address_line1}, {loc.address_line2 or ''}, {loc.city}, {loc.state}, {loc.postal_code}",
+                    "address": ", ".join(
+                        part for part in [loc.address_line1, loc.address_line2, loc.city, loc.state, loc.postal_code] if part
+                    ),
                     "phone": loc.phone,
                     "email": loc.email,
                     "is_primary": loc.is_primary
@@ -0,0 +1,90 @@
+# backend/services/faq_matcher.py
+# Direct answers for questions that closely match a restaurant's curated FAQs
+
+import os
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from services.retrieval import tokenize
+
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", 0.8))
+# Words this similar ("resevation" / "reservation") count as the same token
+FUZZY_TOKEN_RATIO = 0.8
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+def _token_similarity(word: str, candidates: List[str]) -> float:
+    """Best similarity of a word against a list of words (1.0 for an exact match)"""
+    if word in candidates:
+        return 1.0
+    best = 0.0
+    for candidate in candidates:
+        matcher = SequenceMatcher(None, word, candidate)
+        if matcher.real_quick_ratio() < FUZZY_TOKEN_RATIO or matcher.quick_ratio() < FUZZY_TOKEN_RATIO:
+            continue
+        best = max(best, matcher.ratio())
+    return best if best >= FUZZY_TOKEN_RATIO else 0.0
+
+class FAQMatcher:
+    """
+    Index of a restaurant's active FAQs for matching user questions.
+
+    A question's score combines token overlap (an F1 over content words,
+    tolerant of small typos) with a fuzzy match of the whole normalized
+    question, so both reordered and slightly misspelled phrasings of a
+    stored question score highly while questions with extra detail the FAQ
+    doesn't cover do not.
+    """
+
+    def __init__(self, faqs: List[Dict[str, Any]]):
+        self.entries = []
+        for faq in faqs:
+            tokens = tokenize(faq["question"])
+            if tokens:
+                self.entries.append((faq, tokens, _normalize(faq["question"])))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, user_input: str, threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find the FAQ that best matches a user question.
+
+        Args:
+            user_input: The user's message
+            threshold: Minimum score to accept (defaults to FAQ_MATCH_THRESHOLD)
+
+        Returns:
+            dict: id, question, answer and score of the best FAQ, or None if no FAQ scores above the threshold
+        """
+        threshold = FAQ_MATCH_THRESHOLD if threshold is None else threshold
+        query_tokens = tokenize(user_input)
+        if not query_tokens or not self.entries:
+            return None
+        query_text = _normalize(user_input)
+
+        best_faq, best_score = None, 0.0
+        for faq, tokens, text in self.entries:
+            # Soft precision and recall of content words in both directions
+            recall = sum(_token_similarity(token, query_tokens) for token in tokens) / len(tokens)
+            if not recall:
+                continue
+            precision = sum(_token_similarity(token, tokens) for token in query_tokens) / len(query_tokens)
+            overlap = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            fuzzy = SequenceMatcher(None, query_text, text).ratio()
+            score = 0.6 * overlap + 0.4 * fuzzy
+            if score > best_score:
+                best_faq, best_score = faq, score
+
+        if best_faq is None or best_score < threshold:
+            return None
+        return {
+            "id": best_faq.get("id"),
+            "question": best_faq["question"],
+            "answer": best_faq["answer"],
+            "score": round(best_score, 4)
+        }
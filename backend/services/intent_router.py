@@ -0,0 +1,265 @@
+# backend/services/intent_router.py
+# Deterministic answers for hours, location, contact and reservation questions
+
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from services.retrieval import STOPWORDS, stem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESTAURANT_TIMEZONE = os.getenv("RESTAURANT_TIMEZONE", "UTC")
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_WORDS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+NOW_WORDS = {"now", "still", "currently", "right", "yet", "moment"}
+
+# Question words matter for intent, so keep them out of the stopword list
+_QUESTION_WORDS = {"where", "when", "what", "how"}
+# Words that carry no meaning for routing ("s" and "t" come from "what's", "don't")
+_FILLER = (STOPWORDS - _QUESTION_WORDS) | {
+    "s", "t", "guy", "restaurant", "place", "tell", "know", "like", "want", "need",
+    "thank", "thanks", "ok", "okay", "hey", "exactly", "usually", "normally", "time",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Each intent is matched only when the message contains one of its trigger
+# words and nothing outside its vocabulary, so anything unexpected ("are you
+# open on Christmas?", "can I book for 7pm Friday?") falls through to the LLM
+INTENTS = [
+    {
+        "name": "hours",
+        "triggers": {"open", "close", "closing", "opening", "hour", "when"},
+        "vocabulary": {"what", "how", "late", "early", "until", "till", "til", "today", "tonight",
+                       "tomorrow", "day", "week", "weekend", "operating", "business"} | NOW_WORDS | set(DAY_WORDS),
+    },
+    {
+        "name": "location",
+        "triggers": {"where", "located", "location", "address", "direction", "situated"},
+        "vocabulary": {"what", "how", "find", "street", "exact"},
+    },
+    {
+        "name": "contact",
+        "triggers": {"phone", "call", "contact", "email", "reach"},
+        "vocabulary": {"what", "how", "number", "address", "telephone"},
+    },
+    {
+        "name": "reservations",
+        "triggers": {"reservation", "reserve", "book", "booking", "party", "group"},
+        "vocabulary": {"what", "how", "take", "accept", "make", "table", "max", "maximum", "min", "minimum",
+                       "size", "large", "larger", "largest", "big", "bigger", "biggest", "many", "people",
+                       "person", "guest", "far", "advance", "ahead", "day", "policy", "require", "required",
+                       "necessary", "allow", "much"},
+    },
+]
+
+def _routing_tokens(text: str) -> List[str]:
+    return [stem(word) for word in _TOKEN_PATTERN.findall(text.lower()) if word not in _FILLER]
+
+def classify_intent(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a message into a structured intent.
+
+    Returns:
+        dict: name plus the requested day (0=Monday) and whether the question is about
+              right now, or None if the message isn't a plain structured question
+    """
+    if not text or len(text) > 200:
+        return None
+    tokens = set(_routing_tokens(text))
+    if not tokens:
+        return None
+
+    for intent in INTENTS:
+        if not tokens & intent["triggers"]:
+            continue
+        if not tokens <= intent["triggers"] | intent["vocabulary"]:
+            continue
+        # "When" alone doesn't make an hours question ("when" + "open" / "close" does)
+        if intent["name"] == "hours" and tokens & intent["triggers"] == {"when"}:
+            continue
+
+        days = {DAY_WORDS[token] for token in tokens if token in DAY_WORDS}
+        if len(days) > 1:
+            return None
+        return {
+            "name": intent["name"],
+            "day": days.pop() if days else None,
+            "today": bool(tokens & {"today", "tonight"}),
+            "tomorrow": "tomorrow" in tokens,
+            # A bare "are you open?" asks about right now
+            "now": bool(tokens & NOW_WORDS) or tokens == {"open"},
+            "general": bool(tokens & {"hour", "week", "weekend", "operating", "business"}),
+        }
+    return None
+
+def restaurant_timezone(name: Optional[str]) -> ZoneInfo:
+    """Get a restaurant's timezone, falling back to RESTAURANT_TIMEZONE for unknown names"""
+    try:
+        return ZoneInfo(name or DEFAULT_RESTAURANT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r}, using {DEFAULT_RESTAURANT_TIMEZONE}")
+        return ZoneInfo(DEFAULT_RESTAURANT_TIMEZONE)
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+def _format_time(minutes: int) -> str:
+    # 690 -> "11:30 AM", 1320 -> "10 PM"
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    suffix = "AM" if hours < 12 else "PM"
+    hours = hours % 12 or 12
+    return f"{hours}:{minutes:02d} {suffix}" if minutes else f"{hours} {suffix}"
+
+def _weekly_schedule(hours: List[Dict[str, Any]]) -> Dict[int, Optional[tuple]]:
+    """Map day index to (open, close) minutes, or None when closed"""
+    schedule = {}
+    for entry in hours:
+        day = DAYS.index(entry["day"]) if entry.get("day") in DAYS else None
+        if day is None:
+            continue
+        if entry.get("is_closed") or not entry.get("hours"):
+            schedule[day] = None
+            continue
+        open_time, _, close_time = entry["hours"].partition(" - ")
+        open_minutes, close_minutes = _minutes(open_time), _minutes(close_time)
+        if close_minutes <= open_minutes:
+            close_minutes += 24 * 60  # Open past midnight
+        schedule[day] = (open_minutes, close_minutes)
+    return schedule
+
+def _describe_day(schedule, day: int, label: str) -> Optional[str]:
+    if day not in schedule:
+        return None
+    if schedule[day] is None:
+        return f"We're closed {label}."
+    open_minutes, close_minutes = schedule[day]
+    return f"{label[0].upper()}{label[1:]} we're open from {_format_time(open_minutes)} to {_format_time(close_minutes)}."
+
+def _answer_hours(intent: Dict[str, Any], data: Dict[str, Any], now: datetime) -> Optional[str]:
+    schedule = _weekly_schedule(data.get("hours") or [])
+    if not schedule:
+        return None
+    today = now.weekday()
+
+    if intent["day"] is not None:
+        day = intent["day"]
+        return _describe_day(schedule, day, f"on {DAYS[day]}")
+
+    if intent["tomorrow"]:
+        return _describe_day(schedule, (today + 1) % 7, f"tomorrow ({DAYS[(today + 1) % 7]})")
+
+    if intent["now"] and not intent["today"]:
+        return _answer_open_now(schedule, now)
+
+    if intent["today"] or not intent["general"]:
+        return _describe_day(schedule, today, f"today ({DAYS[today]})")
+
+    lines = []
+    for day in range(7):
+        if day not in schedule:
+            continue
+        if schedule[day] is None:
+            lines.append(f"{DAYS[day]}: closed")
+        else:
+            lines.append(f"{DAYS[day]}: {_format_time(schedule[day][0])} - {_format_time(schedule[day][1])}")
+    return "Our hours are:\n" + "\n".join(lines)
+
+def _answer_open_now(schedule, now: datetime) -> str:
+    today = now.weekday()
+    minute = now.hour * 60 + now.minute
+
+    # Still open from last night's late hours
+    yesterday = schedule.get((today - 1) % 7)
+    if yesterday and yesterday[1] > 24 * 60 and minute < yesterday[1] - 24 * 60:
+        return f"Yes, we're open right now until {_format_time(yesterday[1])}."
+
+    hours_today = schedule.get(today)
+    if hours_today and hours_today[0] <= minute < hours_today[1]:
+        return f"Yes, we're open right now until {_format_time(hours_today[1])}."
+    if hours_today and minute < hours_today[0]:
+        return f"We're closed right now. We open today at {_format_time(hours_today[0])}."
+
+    for offset in range(1, 8):
+        day = (today + offset) % 7
+        if schedule.get(day):
+            when = "tomorrow" if offset == 1 else f"on {DAYS[day]}"
+            return f"We're closed right now. We open again {when} at {_format_time(schedule[day][0])}."
+    return "We're closed right now."
+
+def _answer_location(data: Dict[str, Any]) -> Optional[str]:
+    locations = [loc for loc in data.get("locations") or [] if loc.get("address")]
+    if not locations:
+        return None
+    if len(locations) == 1:
+        answer = f"We're located at {locations[0]['address']}."
+        if locations[0].get("phone"):
+            answer += f" You can reach us at {locations[0]['phone']}."
+        return answer
+    lines = [f"- {loc['address']}" + (f" (tel {loc['phone']})" if loc.get("phone") else "") for loc in locations]
+    return "We have these locations:\n" + "\n".join(lines)
+
+def _answer_contact(data: Dict[str, Any]) -> Optional[str]:
+    locations = data.get("locations") or []
+    location = next((loc for loc in locations if loc.get("is_primary")), locations[0] if locations else None)
+    if not location or not (location.get("phone") or location.get("email")):
+        return None
+    parts = []
+    if location.get("phone"):
+        parts.append(f"call us at {location['phone']}")
+    if location.get("email"):
+        parts.append(f"email us at {location['email']}")
+    return f"You can {' or '.join(parts)}."
+
+def _answer_reservations(data: Dict[str, Any]) -> Optional[str]:
+    reservations = data.get("reservations")
+    if not reservations:
+        return None
+    if not reservations.get("accepts_reservations"):
+        return "We don't take reservations; seating is first come, first served."
+    answer = (f"Yes, we take reservations for parties of {reservations.get('min_party_size')} "
+              f"to {reservations.get('max_party_size')} people, up to "
+              f"{reservations.get('advance_reservation_days')} days in advance.")
+    instructions = (reservations.get("special_instructions") or "").strip()
+    if instructions:
+        answer += f" {instructions}" if instructions[-1] in ".!?" else f" {instructions}."
+    return answer
+
+def answer_intent(intent: Dict[str, Any], data: Dict[str, Any], timezone: ZoneInfo,
+                  now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Build a templated answer for a classified intent from restaurant data.
+
+    Args:
+        intent: Result of classify_intent
+        data: Restaurant data from ChatbotDataService.get_restaurant_chatbot_data
+        timezone: The restaurant's timezone, used for "today" and "open now"
+        now: Current time (defaults to the current time); an aware time is converted
+             to the restaurant's timezone, a naive one is taken as restaurant local time
+
+    Returns:
+        str: The answer, or None if the restaurant data doesn't cover the question
+    """
+    now = now or datetime.now(timezone)
+    if now.tzinfo is not None:
+        now = now.astimezone(timezone)
+    name = intent["name"]
+    if name == "hours":
+        return _answer_hours(intent, data, now)
+    if name == "location":
+        return _answer_location(data)
+    if name == "contact":
+        return _answer_contact(data)
+    if name == "reservations":
+        return _answer_reservations(data)
+    return None
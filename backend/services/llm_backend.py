@@ -0,0 +1,65 @@
+# backend/services/llm_backend.py
+# Selects where chat completions are sent: the OpenAI API or a local stand-in server
+
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import openai
+
+from services.openai_client import OPENAI_BASE_URL, get_openai_client, get_async_openai_client
+
+logger = logging.getLogger(__name__)
+
+# "openai" sends completions to the OpenAI API (or OPENAI_BASE_URL); "stub" sends
+# them to the OpenAI-compatible stand-in server (llm_stub.py) for offline work
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").strip().lower()
+LLM_STUB_URL = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8100/v1")
+
+LLM_BACKENDS = ("openai", "stub")
+
+class LLMBackend:
+    """
+    Chat completion backend for ChatGPTService and ChatbotService.
+
+    Both backends go through the same OpenAI SDK clients, so requests take the
+    real HTTP, serialization, retry and error paths whichever is selected;
+    only the server they are sent to differs. The stub needs no API key.
+    """
+
+    def __init__(self, name: str = LLM_BACKEND, api_key: Optional[str] = None):
+        if name not in LLM_BACKENDS:
+            raise ValueError(f"Unknown LLM_BACKEND {name!r} (expected one of {', '.join(LLM_BACKENDS)})")
+        self.name = name
+        if name == "stub":
+            self.base_url = LLM_STUB_URL
+            self.api_key = api_key or os.getenv("OPENAI_API_KEY") or "stub"
+        else:
+            self.base_url = OPENAI_BASE_URL
+            self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+
+    @property
+    def configured(self) -> bool:
+        """Whether completions can be requested (the OpenAI API needs a key)"""
+        return bool(self.api_key)
+
+    def client(self) -> openai.OpenAI:
+        """Shared synchronous client for this backend"""
+        return get_openai_client(self.api_key, self.base_url)
+
+    def async_client(self) -> openai.AsyncOpenAI:
+        """Shared async client for this backend"""
+        return get_async_openai_client(self.api_key, self.base_url)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "base_url": self.base_url or "https://api.openai.com/v1"}
+
+_backend: Optional[LLMBackend] = None
+
+def get_llm_backend() -> LLMBackend:
+    """Get the backend selected by LLM_BACKEND for this process"""
+    global _backend
+    if _backend is None:
+        _backend = LLMBackend()
+        logger.info(f"Using the {_backend.name} LLM backend ({_backend.describe()['base_url']})")
+    return _backend
@@ -0,0 +1,430 @@
+# backend/services/log_writer.py
+# Background, batched writer for chatbot conversation logs
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import exc, func, insert, text
+from sqlalchemy.orm import Session
+
+from database.models import ChatbotLog
+
+logger = logging.getLogger(__name__)
+
+LOG_WRITER_BATCH_SIZE = int(os.getenv("LOG_WRITER_BATCH_SIZE", 100))
+LOG_WRITER_FLUSH_INTERVAL_MS = int(os.getenv("LOG_WRITER_FLUSH_INTERVAL_MS", 250))
+LOG_WRITER_MAX_QUEUE = int(os.getenv("LOG_WRITER_MAX_QUEUE", 10000))
+LOG_ID_BLOCK_SIZE = int(os.getenv("LOG_ID_BLOCK_SIZE", 100))
+LOG_ID_RESERVE_BACKOFF_SECONDS = float(os.getenv("LOG_ID_RESERVE_BACKOFF_SECONDS", 1))  # Doubles after each failed reservation
+LOG_ID_RESERVE_MAX_BACKOFF_SECONDS = float(os.getenv("LOG_ID_RESERVE_MAX_BACKOFF_SECONDS", 60))
+LOG_WRITER_SPILL_PATH = os.getenv(
+    "LOG_WRITER_SPILL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "chatbot_log_spill.jsonl")
+)
+# Records the database rejects (constraint violations, bad values) go here and are never retried
+LOG_WRITER_QUARANTINE_PATH = os.getenv(
+    "LOG_WRITER_QUARANTINE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "chatbot_log_quarantine.jsonl")
+)
+
+class _FlushRequest:
+    """Queue marker asking the writer to flush everything queued before it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+_STOP = object()
+
+# Errors meaning the database can't be reached right now, as opposed to rejecting a record
+_OUTAGE_ERRORS = (exc.OperationalError, exc.InterfaceError, exc.DisconnectionError, exc.TimeoutError)
+
+class LogIdAllocator:
+    """
+    Hands out ChatbotLog ids without inserting a row first.
+
+    On PostgreSQL ids are reserved in blocks from the table's own sequence
+    (one round trip per LOG_ID_BLOCK_SIZE turns), so queued records keep
+    their ids when they are written and never collide with other processes.
+    Other databases (SQLite in development and tests) fall back to counting
+    up from the current maximum id, which is only safe for a single process.
+
+    Blocks are reserved ahead of time by the writer thread, so allocate never
+    waits on the database: with no ids on hand it returns None and the record
+    is written without a known id. A failed reservation is retried after a
+    growing backoff rather than on every chat turn.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], block_size: int = LOG_ID_BLOCK_SIZE):
+        self.session_factory = session_factory
+        self.block_size = block_size
+        self._ids: "deque[int]" = deque()
+        self._next_local_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.failed_reservations = 0
+
+    @property
+    def available(self) -> int:
+        return len(self._ids)
+
+    def allocate(self) -> Optional[int]:
+        """Take the next reserved id, or None if none are on hand"""
+        with self._lock:
+            return self._ids.popleft() if self._ids else None
+
+    def needs_refill(self) -> bool:
+        """Whether fewer than half a block is left and no failed reservation is backing off"""
+        with self._lock:
+            return len(self._ids) <= self.block_size // 2 and time.monotonic() >= self._retry_at
+
+    def refill(self):
+        """Reserve another block of ids (called from the writer thread)"""
+        try:
+            block = self._reserve_block()
+        except Exception as e:
+            with self._lock:
+                self._backoff = min(max(self._backoff * 2, LOG_ID_RESERVE_BACKOFF_SECONDS), LOG_ID_RESERVE_MAX_BACKOFF_SECONDS)
+                self._retry_at = time.monotonic() + self._backoff
+                self.failed_reservations += 1
+                backoff = self._backoff
+            logger.warning(f"Could not reserve chatbot log ids, retrying in {backoff:.0f}s: {str(e)}")
+            return
+        with self._lock:
+            self._ids.extend(block)
+            self._backoff = 0.0
+            self._retry_at = 0.0
+
+    def _reserve_block(self) -> List[int]:
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                rows = db.execute(
+                    text("SELECT nextval(pg_get_serial_sequence('chatbot_logs', 'id')) FROM generate_series(1, :n)"),
+                    {"n": self.block_size}
+                ).scalars().all()
+                return sorted(rows)
+
+            if self._next_local_id is None:
+                self._next_local_id = (db.query(func.max(ChatbotLog.id)).scalar() or 0) + 1
+            start = self._next_local_id
+            self._next_local_id += self.block_size
+            return list(range(start, start + self.block_size))
+        finally:
+            db.close()
+
+class ChatbotLogWriter:
+    """
+    Queues chatbot log records and writes them in the background.
+
+    Records are flushed with a single multi-row insert every
+    LOG_WRITER_BATCH_SIZE records or LOG_WRITER_FLUSH_INTERVAL_MS
+    milliseconds, whichever comes first, so chat turns never wait on a
+    commit. If the database is unavailable the batch is appended to a local
+    JSONL spill file and replayed once writes succeed again. A batch the
+    database rejects is retried row by row, and rows that still fail are
+    moved to a quarantine file so one bad record never holds back the rest.
+    Pending records are drained on shutdown.
+    """
+
+    def __init__(self, batch_size: int = LOG_WRITER_BATCH_SIZE,
+                 flush_interval_ms: int = LOG_WRITER_FLUSH_INTERVAL_MS,
+                 spill_path: str = LOG_WRITER_SPILL_PATH,
+                 quarantine_path: str = LOG_WRITER_QUARANTINE_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.spill_path = spill_path
+        self.quarantine_path = quarantine_path
+
+        self.session_factory: Optional[Callable[[], Session]] = None
+        self.id_allocator: Optional[LogIdAllocator] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=LOG_WRITER_MAX_QUEUE)
+        self._thread: Optional[threading.Thread] = None
+        self._spill_lock = threading.Lock()
+        # Ids of submitted records not yet written, spilled or quarantined
+        self._pending_ids = set()
+        self._settled = threading.Condition()
+
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.quarantined = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory: Callable[[], Session]):
+        """Start the background writer using sessions from session_factory"""
+        if self.running:
+            return
+        self.session_factory = session_factory
+        self.id_allocator = LogIdAllocator(session_factory)
+        # At startup rather than on the first chat turn; later blocks are reserved by the writer thread
+        self.id_allocator.refill()
+        self._thread = threading.Thread(target=self._run, name="chatbot-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Chatbot log writer started")
+
+    def stop(self, timeout: float = 10.0):
+        """Drain queued records and stop the writer"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Chatbot log writer did not drain before timeout")
+        else:
+            logger.info(f"Chatbot log writer stopped ({self.written} records written)")
+
+    def submit(self, log_data: Dict[str, Any]) -> Optional[int]:
+        """
+        Queue a log record for writing.
+
+        Args:
+            log_data: ChatbotLog column values
+
+        Returns:
+            int: The id the record will be written with, or None if no reserved id was on hand
+        """
+        record = dict(log_data)
+        record.setdefault("timestamp", datetime.utcnow())
+        # Never waits on the database; without a reserved id the record is still written, just without a known id
+        record.pop("id", None)
+        log_id = self.id_allocator.allocate()
+        if log_id is not None:
+            record["id"] = log_id
+
+        try:
+            if record.get("id") is not None:
+                with self._settled:
+                    self._pending_ids.add(record["id"])
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("Chatbot log queue is full; spilling record to disk")
+            self._spill([record])
+            self._settle([record])
+        return record.get("id")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until every record queued so far has been written (or spilled)"""
+        if not self.running:
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def wait_for(self, log_id: int, timeout: float = 5.0) -> bool:
+        """
+        Block until one queued record has been dealt with, without waiting on the rest of the queue.
+
+        Returns:
+            bool: False if the record was still pending when the timeout expired
+        """
+        with self._settled:
+            if log_id not in self._pending_ids:
+                return True
+        if self.running:
+            try:
+                # Don't leave it waiting for the batch interval
+                self._queue.put_nowait(_FlushRequest())
+            except queue.Full:
+                pass
+        with self._settled:
+            return self._settled.wait_for(lambda: log_id not in self._pending_ids, timeout)
+
+    def _settle(self, records: List[Dict[str, Any]]):
+        with self._settled:
+            for record in records:
+                self._pending_ids.discard(record.get("id"))
+            self._settled.notify_all()
+
+    def _run(self):
+        self._replay_spill()
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        while True:
+            # Every submitted record wakes this loop, so ids are topped up before they run out
+            if self.id_allocator.needs_refill():
+                self.id_allocator.refill()
+            # Block indefinitely while idle; once a batch is open, wait at most until it is due
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                batch = []
+                continue
+
+            if item is _STOP or isinstance(item, _FlushRequest):
+                self._write(batch)
+                batch = []
+                if item is _STOP:
+                    return
+                item.done.set()
+                continue
+
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+
+    @staticmethod
+    def _insert(db: Session, records: List[Dict[str, Any]]):
+        # One multi-row insert per column set (records without a preallocated id differ)
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault(tuple(sorted(record)), []).append(record)
+        for rows in groups.values():
+            db.execute(insert(ChatbotLog), rows)
+
+    def _persist(self, records: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Insert records, isolating any the database rejects.
+
+        Returns:
+            tuple: (records written, records left unwritten because the database is unavailable)
+        """
+        db = self.session_factory()
+        try:
+            try:
+                self._insert(db, records)
+                db.commit()
+                return len(records), []
+            except Exception as e:
+                db.rollback()
+                if isinstance(e, _OUTAGE_ERRORS):
+                    logger.error(f"Failed to write {len(records)} chatbot logs: {str(e)}")
+                    return 0, records
+                logger.warning(f"Batch of {len(records)} chatbot logs rejected, retrying row by row: {str(e)}")
+
+            written = 0
+            for index, record in enumerate(records):
+                try:
+                    self._insert(db, [record])
+                    db.commit()
+                    written += 1
+                except Exception as e:
+                    db.rollback()
+                    if isinstance(e, _OUTAGE_ERRORS):
+                        logger.error(f"Failed to write chatbot logs: {str(e)}")
+                        return written, records[index:]
+                    self._quarantine(record, e)
+            return written, []
+        finally:
+            db.close()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        if not batch:
+            return True
+        try:
+            written, unwritten = self._persist(batch)
+        except Exception as e:
+            # No session at all (e.g. the pool can't connect)
+            logger.error(f"Failed to write {len(batch)} chatbot logs: {str(e)}")
+            written, unwritten = 0, batch
+        if unwritten:
+            logger.warning(f"Spilling {len(unwritten)} chatbot logs to disk")
+            self._spill(unwritten)
+        self._settle(batch)
+        if unwritten:
+            return False
+
+        self.written += written
+        self.batches += 1
+        if os.path.exists(self.spill_path):
+            self._replay_spill()
+        return True
+
+    def _spill(self, batch: List[Dict[str, Any]]):
+        with self._spill_lock:
+            try:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for record in batch:
+                        f.write(json.dumps(record, default=str) + "\n")
+                self.spilled += len(batch)
+            except OSError as e:
+                logger.error(f"Could not spill {len(batch)} chatbot logs to {self.spill_path}: {str(e)}")
+
+    def _quarantine(self, record: Dict[str, Any], error: Exception):
+        """Set aside a record the database rejected, with the reason, instead of retrying it"""
+        logger.error(f"Quarantining chatbot log {record.get('id')}: {str(error)}")
+        with self._spill_lock:
+            try:
+                os.makedirs(os.path.dirname(self.quarantine_path), exist_ok=True)
+                with open(self.quarantine_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"record": record, "error": str(error)}, default=str) + "\n")
+                self.quarantined += 1
+            except OSError as e:
+                logger.error(f"Could not quarantine chatbot log to {self.quarantine_path}: {str(e)}")
+
+    def _replay_spill(self):
+        """Write records from the spill file back to the database"""
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return
+            replay_path = f"{self.spill_path}.replay"
+            os.replace(self.spill_path, replay_path)
+
+        records = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+                except (ValueError, KeyError, TypeError) as e:
+                    self._quarantine({"raw": line.strip()}, e)
+                    continue
+                records.append(record)
+
+        replayed = 0
+        for start in range(0, len(records), self.batch_size):
+            try:
+                written, unwritten = self._persist(records[start:start + self.batch_size])
+            except Exception as e:
+                written, unwritten = 0, records[start:start + self.batch_size]
+                logger.warning(f"Could not replay spilled chatbot logs: {str(e)}")
+            replayed += written
+            if unwritten:
+                # Still unavailable: keep what's left for the next attempt
+                remaining = unwritten + records[start + self.batch_size:]
+                logger.warning(f"Could not replay {len(remaining)} spilled chatbot logs")
+                self._spill(remaining)
+                self.spilled -= len(remaining)
+                break
+
+        os.remove(replay_path)
+        self.replayed += replayed
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled chatbot logs")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "quarantined": self.quarantined,
+            "log_ids_available": self.id_allocator.available if self.id_allocator else 0,
+            "log_id_reservation_failures": self.id_allocator.failed_reservations if self.id_allocator else 0
+        }
+
+# Shared writer for the process; started by the API on startup
+log_writer = ChatbotLogWriter()
@@ -0,0 +1,520 @@
+# backend/services/menu_import.py
+# Bulk import of a restaurant's menu tree and FAQs in a single transaction
+
+import io
+import csv
+import math
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session, selectinload
+
+from database.models import Restaurant, Menu, MenuCategory, MenuItem, MenuItemIngredient, FAQ
+from services.database_services import RestaurantService
+
+logger = logging.getLogger(__name__)
+
+MENU_FIELDS = ("name", "description", "start_time", "end_time", "is_active")
+CATEGORY_FIELDS = ("name", "description", "display_order")
+ITEM_FIELDS = (
+    "name", "description", "price", "image_url", "is_vegetarian", "is_vegan", "is_gluten_free",
+    "spice_level", "contains_nuts", "contains_dairy", "contains_alcohol", "popular", "chef_special",
+    "display_order", "is_active"
+)
+ITEM_FLAGS = (
+    "is_vegetarian", "is_vegan", "is_gluten_free", "contains_nuts", "contains_dairy",
+    "contains_alcohol", "popular", "chef_special"
+)
+FAQ_FIELDS = ("question", "answer", "category", "display_order", "is_active")
+
+IMPORT_MODES = ("merge", "replace")
+
+class MenuImportError(ValueError):
+    """Raised when an import payload fails validation; errors lists every problem found"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} validation error(s)")
+        self.errors = errors
+
+def _key(value: str) -> str:
+    # Natural keys match case- and whitespace-insensitively
+    return " ".join(str(value).split()).lower()
+
+def _parse_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if value is None or value == "":
+        return None
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y", "x"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise ValueError("must be true or false")
+
+def _parse_time(value: Any) -> Optional[str]:
+    # "11:00" -> "11:00:00", the format the models store
+    if value is None or value == "":
+        return None
+    parts = str(value).strip().split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError("must be a time like 11:00 or 11:00:00")
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = int(parts[2]) if len(parts) == 3 else 0
+    if hours > 23 or minutes > 59 or seconds > 59:
+        raise ValueError("must be a valid time of day")
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+class _Validator:
+    """Collects validation errors with their location in the payload"""
+
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def field(self, source: Dict[str, Any], name: str, path: str, parse: Callable[[Any], Any] = None,
+              required: bool = False, default: Any = None) -> Any:
+        value = source.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            if required:
+                self.errors.append(f"{path}.{name}: is required")
+            return default
+        if parse is None:
+            # Plain text fields; numbers are accepted as their text
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                self.errors.append(f"{path}.{name}: must be text")
+                return default
+            return str(value)
+        try:
+            return parse(value)
+        except (TypeError, ValueError, OverflowError) as e:
+            self.errors.append(f"{path}.{name}: {e if str(e).startswith('must') else 'is invalid'}")
+            return default
+
+    def objects(self, value: Any, path: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """(index, entry) for each object in a list, recording an error for anything else"""
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            self.errors.append(f"{path}: must be a list")
+            return []
+        entries = []
+        for index, entry in enumerate(value):
+            if isinstance(entry, dict):
+                entries.append((index, entry))
+            else:
+                self.errors.append(f"{path}[{index}]: must be an object")
+        return entries
+
+    def unique(self, seen: set, key: str, path: str, label: str):
+        if key in seen:
+            self.errors.append(f"{path}: duplicate {label} {key!r}")
+        seen.add(key)
+
+def _price(value: Any) -> float:
+    price = float(str(value).replace("$", ""))
+    if not math.isfinite(price) or price < 0:
+        raise ValueError("must be a non-negative number")
+    return round(price, 2)
+
+def _spice_level(value: Any) -> int:
+    level = int(value)
+    if not 0 <= level <= 5:
+        raise ValueError("must be between 0 and 5")
+    return level
+
+def _ingredients(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, str):
+        value = [part for part in value.split(";") if part.strip()]
+    if not isinstance(value, list):
+        raise ValueError("must be a list")
+    result = []
+    for entry in value:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        if not isinstance(entry, dict):
+            raise ValueError("must be names or objects with a name")
+        name = str(entry.get("name") or "").strip()
+        if not name:
+            raise ValueError("must all have a name")
+        result.append({"name": name[:255], "is_allergen": bool(_parse_bool(entry.get("is_allergen")))})
+    return result
+
+def validate_import(payload: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]:
+    """
+    Validate and normalize an import payload.
+
+    Args:
+        payload: {"menus": [...], "faqs": [...]}; either key may be omitted to leave that part untouched
+
+    Returns:
+        tuple: (menus, faqs) as normalized dictionaries (None where the payload has no such key)
+
+    Raises:
+        MenuImportError: If anything in the payload is invalid
+    """
+    if not isinstance(payload, dict) or not ("menus" in payload or "faqs" in payload):
+        raise MenuImportError(["payload: must be an object with menus and/or faqs"])
+
+    check = _Validator()
+    menus = None
+    if "menus" in payload:
+        menus = []
+        menu_names = set()
+        for m, raw_menu in check.objects(payload["menus"], "menus"):
+            path = f"menus[{m}]"
+            menu = {
+                "name": check.field(raw_menu, "name", path, required=True),
+                "description": check.field(raw_menu, "description", path),
+                "start_time": check.field(raw_menu, "start_time", path, _parse_time),
+                "end_time": check.field(raw_menu, "end_time", path, _parse_time),
+                "is_active": check.field(raw_menu, "is_active", path, _parse_bool, default=True),
+                "categories": []
+            }
+            if menu["name"]:
+                check.unique(menu_names, _key(menu["name"]), path, "menu")
+
+            category_names = set()
+            for c, raw_category in check.objects(raw_menu.get("categories"), f"{path}.categories"):
+                category_path = f"{path}.categories[{c}]"
+                category = {
+                    "name": check.field(raw_category, "name", category_path, required=True),
+                    "description": check.field(raw_category, "description", category_path),
+                    "display_order": check.field(raw_category, "display_order", category_path, int, default=c),
+                    "items": []
+                }
+                if category["name"]:
+                    check.unique(category_names, _key(category["name"]), category_path, "category")
+
+                item_names = set()
+                for i, raw_item in check.objects(raw_category.get("items"), f"{category_path}.items"):
+                    item_path = f"{category_path}.items[{i}]"
+                    item = {
+                        "name": check.field(raw_item, "name", item_path, required=True),
+                        "description": check.field(raw_item, "description", item_path),
+                        "price": check.field(raw_item, "price", item_path, _price, required=True),
+                        "image_url": check.field(raw_item, "image_url", item_path),
+                        "spice_level": check.field(raw_item, "spice_level", item_path, _spice_level),
+                        "display_order": check.field(raw_item, "display_order", item_path, int, default=i),
+                        "is_active": check.field(raw_item, "is_active", item_path, _parse_bool, default=True),
+                        "ingredients": check.field(raw_item, "ingredients", item_path, _ingredients, default=[]),
+                    }
+                    for flag in ITEM_FLAGS:
+                        item[flag] = check.field(raw_item, flag, item_path, _parse_bool, default=False)
+                    if item["name"]:
+                        check.unique(item_names, _key(item["name"]), item_path, "item")
+                    category["items"].append(item)
+                menu["categories"].append(category)
+            menus.append(menu)
+
+    faqs = None
+    if "faqs" in payload:
+        faqs = []
+        questions = set()
+        for f, raw_faq in check.objects(payload["faqs"], "faqs"):
+            path = f"faqs[{f}]"
+            faq = {
+                "question": check.field(raw_faq, "question", path, required=True),
+                "answer": check.field(raw_faq, "answer", path, required=True),
+                "category": check.field(raw_faq, "category", path),
+                "display_order": check.field(raw_faq, "display_order", path, int, default=f),
+                "is_active": check.field(raw_faq, "is_active", path, _parse_bool, default=True),
+            }
+            if faq["question"]:
+                check.unique(questions, _key(faq["question"]), path, "question")
+            faqs.append(faq)
+
+    if check.errors:
+        raise MenuImportError(check.errors)
+    return menus, faqs
+
+# CSV column names that differ from the model fields
+_CSV_ALIASES = {
+    "vegetarian": "is_vegetarian", "vegan": "is_vegan", "gluten_free": "is_gluten_free",
+    "item": "name", "item_name": "name",
+}
+
+def parse_menu_csv(text: str) -> Dict[str, Any]:
+    """
+    Turn a menu CSV (one row per item) into an import payload.
+
+    Required columns are menu, category, name and price. Optional columns
+    are any other item field, ingredients (separated by ";"),
+    menu_start_time, menu_end_time and category_description.
+    """
+    menus: Dict[str, Dict[str, Any]] = {}
+    reader = csv.DictReader(io.StringIO(text.lstrip("﻿")))
+    for row in reader:
+        row = {_CSV_ALIASES.get(key.strip().lower(), key.strip().lower()): value for key, value in row.items() if key}
+        menu_name = (row.get("menu") or "").strip()
+        category_name = (row.get("category") or "").strip()
+        menu = menus.setdefault(_key(menu_name), {
+            "name": menu_name,
+            "start_time": row.get("menu_start_time"),
+            "end_time": row.get("menu_end_time"),
+            "categories": {}
+        })
+        category = menu["categories"].setdefault(_key(category_name), {
+            "name": category_name,
+            "description": row.get("category_description"),
+            "items": []
+        })
+        category["items"].append({field: row.get(field) for field in ITEM_FIELDS + ("ingredients",) if field in row})
+
+    for menu in menus.values():
+        menu["categories"] = list(menu["categories"].values())
+    return {"menus": list(menus.values())}
+
+def parse_faq_csv(text: str) -> Dict[str, Any]:
+    """Turn an FAQ CSV (question, answer and optional category, display_order, is_active) into an import payload"""
+    reader = csv.DictReader(io.StringIO(text.lstrip("﻿")))
+    faqs = []
+    for row in reader:
+        row = {key.strip().lower(): value for key, value in row.items() if key}
+        faqs.append({field: row.get(field) for field in FAQ_FIELDS if field in row})
+    return {"faqs": faqs}
+
+class _Counts:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deactivated = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+def _changes(existing, values: Dict[str, Any], fields) -> Optional[Dict[str, Any]]:
+    """Return the full update row if any field differs from the existing row, else None"""
+    if all(getattr(existing, field) == values[field] for field in fields):
+        return None
+    return {"id": existing.id, **{field: values[field] for field in fields}}
+
+def _insert_returning_ids(db: Session, model, rows: List[Dict[str, Any]], parent: str, name: str) -> Dict[tuple, int]:
+    """
+    Multi-row insert that maps each new row's (parent id, name key) to its id.
+
+    Ids are matched back by natural key rather than by row order, since
+    keeping RETURNING in parameter order makes some drivers insert one row at a time.
+    """
+    if not rows:
+        return {}
+    parent_column, name_column = getattr(model, parent), getattr(model, name)
+    result = db.execute(insert(model).returning(model.id, parent_column, name_column), rows)
+    return {(parent_id, _key(row_name)): row_id for row_id, parent_id, row_name in result}
+
+class MenuImportService:
+    """Service for importing a restaurant's menus and FAQs in bulk"""
+
+    @staticmethod
+    def import_restaurant_data(db: Session, restaurant_id: int, payload: Dict[str, Any],
+                               mode: str = "merge") -> Optional[Dict[str, Any]]:
+        """
+        Upsert a full menu tree and FAQ list in one transaction.
+
+        Menus, categories, items and FAQs are matched to existing rows by name
+        (question for FAQs); matched rows are updated only if something changed
+        and an item's ingredients are replaced only when they differ. In
+        "replace" mode, existing menus, items and FAQs missing from the payload
+        are deactivated. All writes are multi-row statements, so the number of
+        round trips doesn't grow with the size of the menu.
+
+        Args:
+            restaurant_id: Restaurant to import into
+            payload: {"menus": [...], "faqs": [...]} (see validate_import)
+            mode: "merge" or "replace"
+
+        Returns:
+            dict: Created/updated/unchanged/deactivated counts per entity, or None if the restaurant doesn't exist
+
+        Raises:
+            MenuImportError: If the payload is invalid (nothing is written)
+        """
+        if mode not in IMPORT_MODES:
+            raise MenuImportError([f"mode: must be one of {', '.join(IMPORT_MODES)}"])
+        started_at = time.perf_counter()
+        menus, faqs = validate_import(payload)
+
+        if not db.query(Restaurant.id).filter(Restaurant.id == restaurant_id).scalar():
+            return None
+
+        summary: Dict[str, Any] = {"mode": mode}
+        try:
+            if menus is not None:
+                summary.update(MenuImportService._import_menus(db, restaurant_id, menus, mode == "replace"))
+            if faqs is not None:
+                summary["faqs"] = MenuImportService._import_faqs(db, restaurant_id, faqs, mode == "replace")
+            RestaurantService.touch_restaurant(db, restaurant_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        summary["elapsed_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+        logger.info(f"Imported data for restaurant {restaurant_id}: {summary}")
+        return summary
+
+    @staticmethod
+    def _import_menus(db: Session, restaurant_id: int, menus: List[Dict[str, Any]], replace: bool) -> Dict[str, Any]:
+        counts = {name: _Counts() for name in ("menus", "categories", "items")}
+        ingredients = {"replaced_for_items": 0, "created": 0, "deleted": 0}
+
+        # Load the existing tree with one query per level
+        existing_menus = {
+            _key(menu.name): menu for menu in db.query(Menu).options(
+                selectinload(Menu.categories).selectinload(MenuCategory.items).selectinload(MenuItem.ingredients)
+            ).filter(Menu.restaurant_id == restaurant_id).all()
+        }
+
+        # Menus
+        menu_updates, new_menus = [], []
+        for menu in menus:
+            existing = existing_menus.get(_key(menu["name"]))
+            if existing is None:
+                new_menus.append(menu)
+                continue
+            menu["id"] = existing.id
+            change = _changes(existing, menu, MENU_FIELDS)
+            if change:
+                menu_updates.append(change)
+            else:
+                counts["menus"].unchanged += 1
+        menu_ids = _insert_returning_ids(
+            db, Menu, [{"restaurant_id": restaurant_id, **{f: m[f] for f in MENU_FIELDS}} for m in new_menus],
+            "restaurant_id", "name"
+        )
+        for menu in new_menus:
+            menu["id"] = menu_ids[(restaurant_id, _key(menu["name"]))]
+        counts["menus"].created = len(new_menus)
+        counts["menus"].updated = len(menu_updates)
+
+        # Categories
+        existing_categories = {
+            (menu.id, _key(category.name)): category
+            for menu in existing_menus.values() for category in menu.categories
+        }
+        category_updates, new_categories = [], []
+        for menu in menus:
+            for category in menu["categories"]:
+                existing = existing_categories.get((menu["id"], _key(category["name"])))
+                if existing is None:
+                    new_categories.append((menu["id"], category))
+                    continue
+                category["id"] = existing.id
+                change = _changes(existing, category, CATEGORY_FIELDS)
+                if change:
+                    category_updates.append(change)
+                else:
+                    counts["categories"].unchanged += 1
+        category_ids = _insert_returning_ids(
+            db, MenuCategory, [{"menu_id": menu_id, **{f: c[f] for f in CATEGORY_FIELDS}} for menu_id, c in new_categories],
+            "menu_id", "name"
+        )
+        for menu_id, category in new_categories:
+            category["id"] = category_ids[(menu_id, _key(category["name"]))]
+        counts["categories"].created = len(new_categories)
+        counts["categories"].updated = len(category_updates)
+
+        # Items and their ingredients
+        existing_items = {
+            (category.id, _key(item.name)): item
+            for category in existing_categories.values() for item in category.items
+        }
+        item_updates, new_items, imported_item_ids = [], [], set()
+        ingredient_rows, stale_ingredient_item_ids = [], []
+        for menu in menus:
+            for category in menu["categories"]:
+                for item in category["items"]:
+                    existing = existing_items.get((category["id"], _key(item["name"])))
+                    if existing is None:
+                        new_items.append((category["id"], item))
+                        continue
+                    imported_item_ids.add(existing.id)
+                    item["id"] = existing.id
+                    change = _changes(existing, item, ITEM_FIELDS)
+                    current = [(ing.name, bool(ing.is_allergen)) for ing in existing.ingredients]
+                    wanted = [(ing["name"], ing["is_allergen"]) for ing in item["ingredients"]]
+                    if current != wanted:
+                        stale_ingredient_item_ids.append(existing.id)
+                        ingredients["deleted"] += len(current)
+                        ingredient_rows.extend({"menu_item_id": existing.id, **ing} for ing in item["ingredients"])
+                    if change:
+                        item_updates.append(change)
+                    elif current == wanted:
+                        counts["items"].unchanged += 1
+                    else:
+                        counts["items"].updated += 1
+        item_ids = _insert_returning_ids(
+            db, MenuItem, [{"category_id": category_id, **{f: i[f] for f in ITEM_FIELDS}} for category_id, i in new_items],
+            "category_id", "name"
+        )
+        for category_id, item in new_items:
+            item["id"] = item_ids[(category_id, _key(item["name"]))]
+            ingredient_rows.extend({"menu_item_id": item["id"], **ing} for ing in item["ingredients"])
+        counts["items"].created = len(new_items)
+        counts["items"].updated += len(item_updates)
+
+        if replace:
+            missing_menu_ids = [
+                menu.id for key, menu in existing_menus.items()
+                if menu.is_active and key not in {_key(m["name"]) for m in menus}
+            ]
+            missing_item_ids = [
+                item.id for item in existing_items.values()
+                if item.is_active and item.id not in imported_item_ids
+            ]
+            menu_updates.extend({"id": menu_id, "is_active": False} for menu_id in missing_menu_ids)
+            item_updates.extend({"id": item_id, "is_active": False} for item_id in missing_item_ids)
+            counts["menus"].deactivated = len(missing_menu_ids)
+            counts["items"].deactivated = len(missing_item_ids)
+
+        # Bulk UPDATE by primary key (grouped by column set) and ingredient replacement
+        for model, rows in ((Menu, menu_updates), (MenuCategory, category_updates), (MenuItem, item_updates)):
+            if rows:
+                db.execute(update(model), rows)
+        if stale_ingredient_item_ids:
+            db.execute(
+                delete(MenuItemIngredient).where(MenuItemIngredient.menu_item_id.in_(stale_ingredient_item_ids)),
+                execution_options={"synchronize_session": False}
+            )
+        if ingredient_rows:
+            db.execute(insert(MenuItemIngredient), ingredient_rows)
+        ingredients["replaced_for_items"] = len(stale_ingredient_item_ids)
+        ingredients["created"] = len(ingredient_rows)
+
+        return {**{name: c.as_dict() for name, c in counts.items()}, "ingredients": ingredients}
+
+    @staticmethod
+    def _import_faqs(db: Session, restaurant_id: int, faqs: List[Dict[str, Any]], replace: bool) -> Dict[str, int]:
+        counts = _Counts()
+        existing_faqs = {_key(faq.question): faq for faq in db.query(FAQ).filter(FAQ.restaurant_id == restaurant_id).all()}
+
+        updates, new_rows, imported = [], [], set()
+        for faq in faqs:
+            key = _key(faq["question"])
+            imported.add(key)
+            existing = existing_faqs.get(key)
+            if existing is None:
+                new_rows.append({"restaurant_id": restaurant_id, **faq})
+                continue
+            change = _changes(existing, faq, FAQ_FIELDS)
+            if change:
+                updates.append(change)
+            else:
+                counts.unchanged += 1
+
+        if replace:
+            missing = [faq.id for key, faq in existing_faqs.items() if faq.is_active and key not in imported]
+            updates.extend({"id": faq_id, "is_active": False} for faq_id in missing)
+            counts.deactivated = len(missing)
+
+        if new_rows:
+            db.execute(insert(FAQ), new_rows)
+        if updates:
+            db.execute(update(FAQ), updates)
+        counts.created = len(new_rows)
+        counts.updated = len(updates) - counts.deactivated
+        return counts.as_dict()
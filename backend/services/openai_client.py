@@ -0,0 +1,112 @@
+# backend/services/openai_client.py
+# Process-wide OpenAI clients with pooled, keep-alive HTTP connections
+
+import os
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Connection pool settings (shared by every request in this worker process)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 200))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 50))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 30))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+# Point at any OpenAI-compatible server, e.g. the local stub used for load tests (llm_stub.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Shared clients keyed by base URL (the OpenAI API or an OpenAI-compatible stand-in) and API key
+_clients: Dict[Tuple[Optional[str], Optional[str]], openai.OpenAI] = {}
+_async_clients: Dict[Tuple[Optional[str], Optional[str]], openai.AsyncOpenAI] = {}
+_lock = threading.Lock()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+def _client_key(api_key: Optional[str], base_url: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Cache key for a client; a service built with its own API key gets its own client"""
+    return base_url or OPENAI_BASE_URL, api_key or os.getenv("OPENAI_API_KEY")
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> openai.OpenAI:
+    """
+    Get the shared synchronous OpenAI client for a server and API key,
+    creating it on first use.
+
+    Args:
+        api_key: OpenAI API key (defaults to the OPENAI_API_KEY environment variable)
+        base_url: Server to send requests to (defaults to OPENAI_BASE_URL, then the OpenAI API)
+
+    Returns:
+        openai.OpenAI: Client backed by a bounded keep-alive connection pool
+    """
+    key = _client_key(api_key, base_url)
+    base_url, api_key = key
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=openai.DefaultHttpxClient(limits=_limits(), timeout=_timeout())
+                )
+                logger.info(f"Created shared OpenAI client for {client.base_url} (max_connections={OPENAI_MAX_CONNECTIONS})")
+    return client
+
+def get_async_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for a server and API key, creating it
+    on first use.
+
+    The client (and its connection pool) belongs to the event loop of the
+    serving process, so one uvicorn worker can keep many completions in
+    flight concurrently without a thread per request.
+
+    Args:
+        api_key: OpenAI API key (defaults to the OPENAI_API_KEY environment variable)
+        base_url: Server to send requests to (defaults to OPENAI_BASE_URL, then the OpenAI API)
+
+    Returns:
+        openai.AsyncOpenAI: Client backed by a bounded keep-alive connection pool
+    """
+    key = _client_key(api_key, base_url)
+    base_url, api_key = key
+    client = _async_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(key)
+            if client is None:
+                client = _async_clients[key] = openai.AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=openai.DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout())
+                )
+                logger.info(f"Created shared AsyncOpenAI client for {client.base_url} (max_connections={OPENAI_MAX_CONNECTIONS})")
+    return client
+
+async def close_openai_clients():
+    """Close the shared clients and release their pooled connections"""
+    with _lock:
+        clients, async_clients = list(_clients.values()), list(_async_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    for async_client in async_clients:
+        await async_client.close()
+    for client in clients:
+        client.close()
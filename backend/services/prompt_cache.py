@@ -0,0 +1,155 @@
+# backend/services/prompt_cache.py
+# In-process LRU cache of compiled per-restaurant chatbot prompts
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_MAX_BYTES = int(os.getenv("PROMPT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", 5000))
+PROMPT_CACHE_NEGATIVE_TTL = float(os.getenv("PROMPT_CACHE_NEGATIVE_TTL", 30))
+PROMPT_CACHE_VERSION_TTL = float(os.getenv("PROMPT_CACHE_VERSION_TTL", 5))  # Seconds an entry is served without re-checking its version
+
+class PromptCache:
+    """
+    LRU cache of compiled prompts keyed by restaurant id and data version.
+
+    Entries are evicted least-recently-used first once either the total size
+    (in bytes) or the number of entries exceeds its limit. Unknown restaurant
+    ids are remembered for a short time so repeated lookups don't hit the
+    database. An entry whose version was confirmed within version_ttl seconds
+    is served without checking the version again, so a busy restaurant costs
+    one version query per version_ttl rather than one per chat turn.
+    """
+
+    def __init__(self, max_bytes: int = PROMPT_CACHE_MAX_BYTES,
+                 max_entries: int = PROMPT_CACHE_MAX_ENTRIES,
+                 negative_ttl: float = PROMPT_CACHE_NEGATIVE_TTL,
+                 version_ttl: float = PROMPT_CACHE_VERSION_TTL):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.version_ttl = version_ttl
+
+        # restaurant_id -> (version, value, size)
+        self._entries: "OrderedDict[int, Tuple[str, Any, int]]" = OrderedDict()
+        self._checked_at: Dict[int, float] = {}  # When each entry's version was last confirmed
+        self._missing: Dict[int, float] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.negative_hits = 0
+        self.unchecked_hits = 0
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        if isinstance(value, str):
+            return len(value.encode("utf-8"))
+        return getattr(value, "size", 0)
+
+    def get(self, restaurant_id: int, version: str) -> Optional[Any]:
+        """Return the cached value for this restaurant and version, or None"""
+        with self._lock:
+            entry = self._entries.get(restaurant_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(restaurant_id)
+            self._checked_at[restaurant_id] = time.monotonic()
+            self.hits += 1
+            return entry[1]
+
+    def get_recent(self, restaurant_id: int) -> Optional[Any]:
+        """Return the cached value if its version was confirmed within version_ttl, or None"""
+        with self._lock:
+            checked_at = self._checked_at.get(restaurant_id)
+            if checked_at is None or time.monotonic() - checked_at >= self.version_ttl:
+                return None
+            self._entries.move_to_end(restaurant_id)
+            self.unchecked_hits += 1
+            return self._entries[restaurant_id][1]
+
+    def put(self, restaurant_id: int, version: str, value: Any, size: Optional[int] = None):
+        """Store a value, replacing any older version for the restaurant"""
+        size = self._size_of(value) if size is None else size
+        if size > self.max_bytes:
+            logger.warning(f"Prompt for restaurant {restaurant_id} ({size} bytes) exceeds the cache size limit")
+            return
+
+        with self._lock:
+            self._missing.pop(restaurant_id, None)
+            self._remove(restaurant_id)
+            self._entries[restaurant_id] = (version, value, size)
+            self._checked_at[restaurant_id] = time.monotonic()
+            self._total_bytes += size
+
+            while self._entries and (self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                evicted_id, _ = next(iter(self._entries.items()))
+                self._remove(evicted_id)
+                self.evictions += 1
+
+    def is_known_missing(self, restaurant_id: int) -> bool:
+        """Check whether the restaurant was recently looked up and not found"""
+        with self._lock:
+            expires_at = self._missing.get(restaurant_id)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._missing[restaurant_id]
+                return False
+            self.negative_hits += 1
+            return True
+
+    def mark_missing(self, restaurant_id: int):
+        """Remember that the restaurant doesn't exist for negative_ttl seconds"""
+        with self._lock:
+            self._remove(restaurant_id)
+            self._missing[restaurant_id] = time.monotonic() + self.negative_ttl
+
+    def invalidate(self, restaurant_id: int):
+        """Drop any cached entry (positive or negative) for the restaurant"""
+        with self._lock:
+            self._remove(restaurant_id)
+            self._missing.pop(restaurant_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._checked_at.clear()
+            self._missing.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "negative_hits": self.negative_hits,
+                "unchecked_hits": self.unchecked_hits,
+                "entries": len(self._entries),
+                "negative_entries": len(self._missing),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _remove(self, restaurant_id: int):
+        # Caller must hold the lock
+        self._checked_at.pop(restaurant_id, None)
+        entry = self._entries.pop(restaurant_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+# Shared cache for the process
+prompt_cache = PromptCache()
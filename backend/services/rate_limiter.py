@@ -0,0 +1,298 @@
+# backend/services/rate_limiter.py
+# Sliding-window rate limits per restaurant, chat session and client IP
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+RATE_LIMIT_ENABLED = _env_bool("RATE_LIMIT_ENABLED", True)
+# "memory" counts per worker process; "sqlite" shares counts between the workers on one host
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory").strip().lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv(
+    "RATE_LIMIT_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "rate_limits.sqlite3")
+)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))  # Keys kept by the memory store
+# Limits as "<requests>/<seconds>"; an empty value disables that limit
+RATE_LIMIT_PER_RESTAURANT = os.getenv("RATE_LIMIT_PER_RESTAURANT", "1200/60")
+RATE_LIMIT_PER_SESSION = os.getenv("RATE_LIMIT_PER_SESSION", "30/60")
+RATE_LIMIT_PER_IP = os.getenv("RATE_LIMIT_PER_IP", "120/60")
+# Only trust X-Forwarded-For when the apps run behind a proxy that sets it
+RATE_LIMIT_TRUST_FORWARDED = _env_bool("RATE_LIMIT_TRUST_FORWARDED", False)
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int = 0  # Whole seconds until a request would be allowed (0 when allowed)
+    scope: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        """Response headers describing the limit (Retry-After only on denials)"""
+        headers = {"X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(self.remaining)}
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+def sliding_window(previous: int, current: int, elapsed: float, window: float, limit: int) -> Tuple[bool, float, float]:
+    """
+    Decide one request with the sliding-window counter algorithm.
+
+    The request rate is estimated from two fixed windows: the previous
+    window's count, weighted by how much of it still overlaps the sliding
+    window, plus the current window's count. Only two counters are kept
+    per key, so every check is O(1).
+
+    Args:
+        previous: Requests counted in the previous fixed window
+        current: Requests counted so far in the current fixed window
+        elapsed: Seconds since the current fixed window started
+        window: Window length in seconds
+        limit: Requests allowed per window
+
+    Returns:
+        tuple: (allowed, estimated count including this request if allowed, seconds until allowed)
+    """
+    weight = 1 - elapsed / window
+    estimate = previous * weight + current
+    if estimate + 1 <= limit:
+        return True, estimate + 1, 0.0
+
+    if current + 1 <= limit and previous:
+        # Allowed once enough of the previous window has slid out
+        needed_weight = (limit - 1 - current) / previous
+        return False, estimate, max(0.0, (1 - needed_weight) * window - elapsed)
+
+    # Not before the next window, once enough of this window's requests have slid out
+    needed_weight = (limit - 1) / current if current else 1.0
+    return False, estimate, (window - elapsed) + (1 - needed_weight) * window
+
+class MemoryRateLimitStore:
+    """Per-process counters, bounded to RATE_LIMIT_MAX_KEYS least recently used keys"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()  # key -> [window index, current, previous]
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float, float]:
+        return self.hit_all([(key, limit, window)], now)[0]
+
+    def _counter(self, key: str, index: int) -> List[int]:
+        # Caller must hold the lock
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [index, 0, 0]
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            if counter[0] != index:
+                counter[2] = counter[1] if counter[0] == index - 1 else 0
+                counter[1] = 0
+                counter[0] = index
+        return counter
+
+    def hit_all(self, checks: List[Tuple[str, int, float]], now: float) -> List[Tuple[bool, float, float]]:
+        """Decide (key, limit, window) checks together, counting the request only if every one allows it"""
+        with self._lock:
+            results, counters = [], []
+            for key, limit, window in checks:
+                index = int(now // window)
+                counter = self._counter(key, index)
+                counters.append(counter)
+                results.append(sliding_window(counter[2], counter[1], now - index * window, window, limit))
+            if all(allowed for allowed, _, _ in results):
+                for counter in counters:
+                    counter[1] += 1
+            return results
+
+class SQLiteRateLimitStore:
+    """
+    Counters in a SQLite file shared by every worker process on the host.
+
+    A local stand-in for a shared cache such as Redis: each hit is one short
+    write transaction, so counts stay exact across workers without another
+    service to run. Windows older than the previous one are pruned periodically.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT NOT NULL, window_index INTEGER NOT NULL, count INTEGER NOT NULL, "
+            "PRIMARY KEY (key, window_index)) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float, float]:
+        return self.hit_all([(key, limit, window)], now)[0]
+
+    def hit_all(self, checks: List[Tuple[str, int, float]], now: float) -> List[Tuple[bool, float, float]]:
+        """Decide (key, limit, window) checks in one transaction, counting the request only if every one allows it"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            results, indexes = [], []
+            for key, limit, window in checks:
+                index = int(now // window)
+                indexes.append(index)
+                counts = dict(connection.execute(
+                    "SELECT window_index, count FROM rate_limits WHERE key = ? AND window_index IN (?, ?)",
+                    (key, index - 1, index)
+                ).fetchall())
+                results.append(sliding_window(
+                    counts.get(index - 1, 0), counts.get(index, 0), now - index * window, window, limit
+                ))
+            if all(allowed for allowed, _, _ in results):
+                connection.executemany(
+                    "INSERT INTO rate_limits (key, window_index, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (key, window_index) DO UPDATE SET count = count + 1",
+                    [(key, index) for (key, _, _), index in zip(checks, indexes)]
+                )
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM rate_limits WHERE window_index < ?", (min(indexes) - 1,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return results
+
+def parse_limit(spec: Optional[str]) -> Optional[Tuple[int, float]]:
+    """Parse "<requests>/<seconds>" (e.g. "30/60"); empty or "0" disables the limit"""
+    if not spec or spec.strip() in ("0", "off", "none"):
+        return None
+    requests, _, seconds = spec.partition("/")
+    return int(requests), float(seconds or 60)
+
+class RateLimiter:
+    """
+    Chat request limits per restaurant, per chat session and per client IP.
+
+    Every applicable limit is checked before anything is counted, and the
+    request is counted against all of them only when all of them allow it,
+    so a denied request never uses up another scope's allowance. A denial
+    reports the most specific scope that was exceeded.
+    """
+
+    def __init__(self, store=None, enabled: bool = RATE_LIMIT_ENABLED,
+                 per_restaurant: Optional[str] = RATE_LIMIT_PER_RESTAURANT,
+                 per_session: Optional[str] = RATE_LIMIT_PER_SESSION,
+                 per_ip: Optional[str] = RATE_LIMIT_PER_IP):
+        self.store = store
+        self.enabled = enabled
+        self.limits = {
+            "session": parse_limit(per_session),
+            "ip": parse_limit(per_ip),
+            "restaurant": parse_limit(per_restaurant)
+        }
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.denied: Dict[str, int] = {scope: 0 for scope in self.limits}
+
+    def _get_store(self):
+        if self.store is None:
+            with self._lock:
+                if self.store is None:
+                    self.store = SQLiteRateLimitStore() if RATE_LIMIT_STORE == "sqlite" else MemoryRateLimitStore()
+                    logger.info(f"Rate limiter using the {type(self.store).__name__}")
+        return self.store
+
+    def check(self, restaurant_id=None, session_id: Optional[str] = None, client_ip: Optional[str] = None,
+              now: Optional[float] = None) -> RateLimitResult:
+        """
+        Count a chat request against every applicable limit.
+
+        Args:
+            restaurant_id: Restaurant the request is for
+            session_id: Chat session, if the client sent one
+            client_ip: Address of the client
+
+        Returns:
+            RateLimitResult: Whether the request may proceed, with header values
+        """
+        keys = {"session": session_id, "ip": client_ip, "restaurant": restaurant_id}
+        applicable = [
+            (scope, f"{scope}:{keys[scope]}", limit)
+            for scope, limit in self.limits.items() if limit and keys[scope] not in (None, "")
+        ]
+        if not self.enabled or not applicable:
+            return RateLimitResult(allowed=True, limit=0, remaining=0)
+
+        now = time.time() if now is None else now
+        store = self._get_store()
+        try:
+            results = store.hit_all([(key, limit, window) for _, key, (limit, window) in applicable], now)
+        except Exception as e:
+            # Fail open: a broken shared store must not take the chat down
+            logger.error(f"Rate limit store error, allowing request: {str(e)}")
+            return RateLimitResult(allowed=True, limit=0, remaining=0)
+
+        denied = [
+            (scope, key, limit, window, retry_after)
+            for (scope, key, (limit, window)), (allowed, _, retry_after) in zip(applicable, results) if not allowed
+        ]
+        if denied:
+            scope, key, limit, window, _ = denied[0]
+            # Not allowed again until every exceeded limit has room
+            retry_after = max(retry for *_, retry in denied)
+            with self._lock:
+                self.denied[scope] += 1
+            logger.warning(f"Rate limit exceeded for {key}: {limit} requests per {window:g}s")
+            return RateLimitResult(False, limit, 0, max(1, math.ceil(retry_after)), scope)
+
+        tightest = None
+        for (scope, _, (limit, _)), (_, estimate, _) in zip(applicable, results):
+            remaining = max(0, int(limit - estimate))
+            if tightest is None or remaining < tightest.remaining:
+                tightest = RateLimitResult(True, limit, remaining, 0, scope)
+        with self._lock:
+            self.allowed += 1
+        return tightest
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "store": type(self.store).__name__ if self.store else RATE_LIMIT_STORE,
+                "limits": {scope: f"{limit[0]}/{limit[1]:g}s" if limit else None for scope, limit in self.limits.items()},
+                "allowed": self.allowed,
+                "denied": dict(self.denied)
+            }
+
+def client_ip_from(remote_addr: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+    """The client's address, taken from X-Forwarded-For only when RATE_LIMIT_TRUST_FORWARDED is set"""
+    if RATE_LIMIT_TRUST_FORWARDED and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return remote_addr
+
+# Shared limiter for the chat endpoints
+rate_limiter = RateLimiter()
@@ -0,0 +1,54 @@
+# backend/services/response_metrics.py
+# In-process counters for how chatbot turns are answered
+
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional
+
+# Sources answered from restaurant data without the LLM
+DETERMINISTIC_SOURCES = ("faq", "intent")
+
+class ResponseMetrics:
+    """Counts chatbot turns and latency per response source (llm, cache, faq, intent)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.turns = Counter()
+            self.intents = Counter()
+            self.total_ms = defaultdict(float)
+            self.max_ms = defaultdict(float)
+
+    def record(self, source: str, elapsed_ms: float, intent: Optional[str] = None):
+        """Record one answered turn"""
+        with self._lock:
+            self.turns[source] += 1
+            self.total_ms[source] += elapsed_ms
+            self.max_ms[source] = max(self.max_ms[source], elapsed_ms)
+            if intent:
+                self.intents[intent] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.turns.values())
+            deterministic = sum(self.turns[source] for source in DETERMINISTIC_SOURCES)
+            without_llm = total - self.turns["llm"]
+            return {
+                "turns": total,
+                "deterministic_share": round(deterministic / total, 4) if total else 0.0,
+                "without_llm_share": round(without_llm / total, 4) if total else 0.0,
+                "by_source": {
+                    source: {
+                        "turns": count,
+                        "avg_ms": round(self.total_ms[source] / count, 2),
+                        "max_ms": round(self.max_ms[source], 2)
+                    } for source, count in self.turns.items()
+                },
+                "intents": dict(self.intents)
+            }
+
+# Shared metrics for the process
+response_metrics = ResponseMetrics()
@@ -0,0 +1,166 @@
+# backend/services/restaurant_snapshot.py
+# Compiled, cacheable per-restaurant chatbot context
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.context_serializer import serialize_restaurant_context
+from services.retrieval import BM25Index
+from services.faq_matcher import FAQMatcher
+from services.intent_router import classify_intent, answer_intent, restaurant_timezone
+
+RETRIEVAL_TOP_K_ITEMS = int(os.getenv("RETRIEVAL_TOP_K_ITEMS", 12))
+RETRIEVAL_TOP_K_FAQS = int(os.getenv("RETRIEVAL_TOP_K_FAQS", 4))
+# Restaurants whose full context fits in this many tokens skip retrieval
+RETRIEVAL_FULL_CONTEXT_MAX_TOKENS = int(os.getenv("RETRIEVAL_FULL_CONTEXT_MAX_TOKENS", 1500))
+
+STATIC_INSTRUCTIONS = """You are a helpful waiter assistant for the restaurant described below.
+Use the restaurant information to answer customer questions.
+- Be polite, friendly, and helpful like a waiter would be.
+- If asked about menu items, provide details about ingredients, pricing, and dietary information.
+- If asked about hours, provide the correct operating hours for the requested day.
+- If asked about location, provide the address and contact information.
+- If asked about reservations, provide the reservation policy and how to make a reservation.
+- If asked a question you don't have information for, apologize and offer to connect them with the restaurant directly.
+- Keep responses concise and conversational, like a helpful waiter would.
+- Do not mention that you're an AI or that you're using provided information."""
+
+DIETARY_KEYWORDS = {
+    "vegetarian": "vegetarian veggie",
+    "vegan": "vegan plant based",
+    "gluten_free": "gluten free celiac",
+    "contains_nuts": "nuts nut allergy",
+    "contains_dairy": "dairy milk lactose",
+    "contains_alcohol": "alcohol",
+}
+
+class RestaurantSnapshot:
+    """
+    Everything needed to build a restaurant's system prompt without the database.
+
+    Holds plain data only (no ORM objects) so it can be shared between
+    requests through the prompt cache. Small restaurants get their full
+    context in every prompt; larger ones get a BM25 index over menu items
+    and FAQs so each turn only includes the entries relevant to the question,
+    keeping prompt size flat as menus grow.
+    """
+
+    def __init__(self, restaurant, data: Dict[str, Any], version: Optional[str] = None):
+        self.restaurant_id = restaurant.id
+        self.name = restaurant.name
+        self.greeting = restaurant.chatbot_greeting or f"Welcome to {restaurant.name}! How can I help you today?"
+        self.token_budget = restaurant.context_token_budget
+        self.faq_match_threshold = restaurant.faq_match_threshold
+        self.timezone = restaurant_timezone(restaurant.timezone)
+        self.version = version
+        self.data = data
+
+        self.full_context = serialize_restaurant_context(data, self.token_budget)
+        self.faq_matcher = FAQMatcher([faq for faqs in data.get("faqs", {}).values() for faq in faqs])
+        self.use_retrieval = (
+            self.full_context["truncated"]
+            or self.full_context["token_count"] > RETRIEVAL_FULL_CONTEXT_MAX_TOKENS
+        )
+
+        self.item_index = None
+        self.faq_index = None
+        self.featured_item_ids: List[int] = []
+        if self.use_retrieval:
+            self._build_indexes()
+
+        # Rough in-memory footprint, used for size-aware cache eviction
+        self.size = len(json.dumps(data, default=str)) * (3 if self.use_retrieval else 2)
+
+    def _build_indexes(self):
+        item_documents = []
+        for menu in self.data.get("menus", []):
+            for category in menu.get("categories", []):
+                for item in category.get("items", []):
+                    dietary = item.get("dietary_info", {})
+                    parts = [
+                        item["name"], item["name"],  # Weight the name over the description
+                        item.get("description") or "",
+                        " ".join(item.get("ingredients", [])),
+                        category["name"],
+                        menu["name"],
+                    ]
+                    parts.extend(words for key, words in DIETARY_KEYWORDS.items() if dietary.get(key))
+                    if dietary.get("spice_level"):
+                        parts.append("spicy hot")
+                    if item.get("popular") or item.get("chef_special"):
+                        parts.append("popular recommend special favorite")
+                        self.featured_item_ids.append(item["id"])
+                    item_documents.append((item["id"], " ".join(parts)))
+        self.item_index = BM25Index(item_documents)
+
+        faq_documents = []
+        for category, faqs in self.data.get("faqs", {}).items():
+            for position, faq in enumerate(faqs):
+                faq_documents.append(((category, position), f"{faq['question']} {faq['question']} {faq['answer']} {category or ''}"))
+        self.faq_index = BM25Index(faq_documents)
+
+    def _select(self, item_ids: Set[int], faq_keys: Set[Tuple[Optional[str], int]]) -> Dict[str, Any]:
+        """Copy the snapshot data keeping only the selected menu items and FAQs"""
+        menus = []
+        for menu in self.data.get("menus", []):
+            categories = []
+            for category in menu.get("categories", []):
+                items = [item for item in category.get("items", []) if item["id"] in item_ids]
+                if items:
+                    categories.append({**category, "items": items})
+            if categories:
+                menus.append({**menu, "categories": categories})
+
+        faqs = {}
+        for category, entries in self.data.get("faqs", {}).items():
+            selected = [faq for position, faq in enumerate(entries) if (category, position) in faq_keys]
+            if selected:
+                faqs[category] = selected
+
+        return {**self.data, "menus": menus, "faqs": faqs}
+
+    def match_faq(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Find an FAQ that answers the user message directly, using the restaurant's threshold"""
+        return self.faq_matcher.match(user_input, self.faq_match_threshold)
+
+    def answer_intent(self, user_input: str) -> Optional[Dict[str, str]]:
+        """Answer hours, location, contact and reservation questions from the restaurant data"""
+        intent = classify_intent(user_input)
+        if not intent:
+            return None
+        answer = answer_intent(intent, self.data, self.timezone)
+        if not answer:
+            return None
+        return {"intent": intent["name"], "answer": answer}
+
+    def context_for(self, user_input: str) -> str:
+        """Get the restaurant context to include in the prompt for a user message"""
+        if not self.use_retrieval:
+            return self.full_context["text"]
+
+        item_ids = [item_id for item_id, _ in self.item_index.search(user_input, RETRIEVAL_TOP_K_ITEMS)]
+        # Top up with popular items so vague questions still get useful context
+        for item_id in self.featured_item_ids:
+            if len(item_ids) >= RETRIEVAL_TOP_K_ITEMS:
+                break
+            if item_id not in item_ids:
+                item_ids.append(item_id)
+
+        faq_keys = {key for key, _ in self.faq_index.search(user_input, RETRIEVAL_TOP_K_FAQS)}
+
+        selected = self._select(set(item_ids), faq_keys)
+        context = serialize_restaurant_context(selected, self.token_budget)["text"]
+        return context + "\n(Only the menu items and FAQs most relevant to this question are listed; others may exist.)"
+
+    def build_system_message(self, user_input: str) -> str:
+        """Build the full system prompt for a user message"""
+        # Static instructions go first so the prompt prefix is identical across
+        # restaurants and turns, letting upstream prompt caching apply
+        return f"""{STATIC_INSTRUCTIONS}
+
+You are the waiter assistant for {self.name}. Your name is "{self.name} Assistant".
+If greeting the user, use this greeting: "{self.greeting}"
+
+Restaurant information:
+{self.context_for(user_input)}"""
@@ -0,0 +1,93 @@
+# backend/services/retrieval.py
+# In-memory lexical (BM25) retrieval over restaurant menu items and FAQs
+
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Tuple
+
+STOPWORDS = frozenset("""
+a about all also am an and any are as at be been but by can could do does did for from
+get got had has have hi hello how i if in into is it its me my of on or our please
+so some than that the their them then there these they this those to too us was we
+what when where which who why will with would you your yours
+""".split())
+# Stopwords that still tell one question from another ("when" vs "where is happy hour")
+QUESTION_WORDS = frozenset({"what", "when", "where", "which", "who", "why", "how"})
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def stem(word: str) -> str:
+    # Deliberately light: enough to match simple plurals ("options" / "option")
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text: str, stopwords: FrozenSet[str] = STOPWORDS) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem plurals"""
+    if not text:
+        return []
+    return [stem(word) for word in _TOKEN_PATTERN.findall(text.lower()) if word not in stopwords]
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over a fixed set of documents.
+
+    Built once (e.g. when a restaurant snapshot is compiled) and then searched
+    on every chat turn; search cost depends on the query's posting lists, not
+    on the total number of documents.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[Hashable, str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys: List[Hashable] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        for key, text in documents:
+            doc_index = len(self.keys)
+            tokens = tokenize(text)
+            self.keys.append(key)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((doc_index, frequency))
+
+        doc_count = len(self.keys)
+        self.avg_length = (sum(self.doc_lengths) / doc_count) if doc_count else 0.0
+        self.idf = {
+            term: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """
+        Find the best matching documents for a query.
+
+        Args:
+            query: Free-text query (e.g. the user's message)
+            k: Maximum number of results
+
+        Returns:
+            list: (document key, score) pairs, best first
+        """
+        if not self.keys or k <= 0:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, frequency in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_length or 1)
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        return [(self.keys[doc_index], score) for doc_index, score in best]
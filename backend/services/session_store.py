@@ -0,0 +1,241 @@
+# backend/services/session_store.py
+# Server-side conversation history keyed by session_id
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 1800))  # Idle sessions expire after this
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))  # Least recently used are evicted beyond this
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 6))  # Recent user/assistant exchanges kept per session
+SESSION_MAX_MESSAGE_CHARS = int(os.getenv("SESSION_MAX_MESSAGE_CHARS", 1000))  # Longer messages are truncated
+
+# Words that make a message depend on what was said before it
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "those", "them", "they", "this", "these", "one", "ones", "also",
+    "else", "more", "another", "same"
+}
+
+def is_follow_up(user_input: str) -> bool:
+    """Whether a message likely refers back to the conversation ("is it spicy?", "what about dessert?")"""
+    text = user_input.lower()
+    words = re.findall(r"[a-z']+", text)
+    if len(words) <= 2:
+        return True
+    return any(phrase in text for phrase in ("what about", "how about")) or bool(FOLLOW_UP_WORDS & set(words))
+
+class _Session:
+    __slots__ = ("restaurant_id", "turns", "last_seen", "summary", "compacting", "compaction_stats")
+
+    def __init__(self, restaurant_id: Any, max_turns: int):
+        self.restaurant_id = restaurant_id
+        self.turns: Deque[Dict[str, str]] = deque(maxlen=max_turns * 2)
+        self.last_seen = time.monotonic()
+        self.summary: Optional[str] = None  # Running summary of turns folded out of the history
+        self.compacting = False
+        self.compaction_stats = {"compactions": 0, "turns_folded": 0, "tokens_before": 0, "tokens_after": 0, "failures": 0}
+
+    def messages(self) -> List[Dict[str, str]]:
+        summary = [{"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}] if self.summary else []
+        return summary + list(self.turns)
+
+class ConversationStore:
+    """
+    Recent turns of each chat session, kept in memory.
+
+    Sessions are evicted after SESSION_TTL_SECONDS without activity or when
+    more than SESSION_MAX_SESSIONS are active (least recently used first),
+    and each keeps at most SESSION_MAX_TURNS exchanges of bounded length, so
+    memory per session is capped. When a session isn't in memory (another
+    worker served it, or the process restarted) its recent turns are
+    reloaded through a loader, such as one reading ChatbotLog. Older turns
+    can be folded into a running summary (see conversation_compactor).
+    """
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_turns: int = SESSION_MAX_TURNS, max_message_chars: int = SESSION_MAX_MESSAGE_CHARS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_message_chars = max_message_chars
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def _expire(self, now: float):
+        # Sessions are kept in last-used order, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def _clip(self, content: str) -> str:
+        return content if len(content) <= self.max_message_chars else content[:self.max_message_chars] + "..."
+
+    def get_history(self, session_id: Optional[str], restaurant_id: Any,
+                    loader: Optional[Callable[[str, int], List[Dict[str, str]]]] = None) -> List[Dict[str, str]]:
+        """
+        Get a session's recent turns as chat messages, oldest first.
+
+        Once older turns have been compacted, the first message is a system
+        message carrying the running summary of them.
+
+        Args:
+            session_id: Chat session id (no history without one)
+            restaurant_id: Restaurant the conversation is with; a session is never
+                shared across restaurants
+            loader: Called with (session_id, max messages) to reload a session
+                that isn't in memory
+
+        Returns:
+            list: {"role", "content"} messages
+        """
+        if not session_id:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None and session.restaurant_id == restaurant_id:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = now
+                self.hits += 1
+                return session.messages()
+            self.misses += 1
+
+        if loader is None:
+            return []
+        try:
+            turns = loader(session_id, self.max_turns * 2)
+        except Exception as e:
+            logger.warning(f"Could not reload conversation {session_id}: {str(e)}")
+            return []
+        if turns:
+            with self._lock:
+                self.reloads += 1
+                session = self._new_session(session_id, restaurant_id)
+                session.turns.extend({"role": t["role"], "content": self._clip(t["content"])} for t in turns)
+            return session.messages()
+        return []
+
+    def _new_session(self, session_id: str, restaurant_id: Any) -> _Session:
+        # Caller holds the lock
+        session = self._sessions[session_id] = _Session(restaurant_id, self.max_turns)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        return session
+
+    def append(self, session_id: Optional[str], restaurant_id: Any, user_input: str, response: str):
+        """Record one exchange of a session"""
+        if not session_id:
+            return
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.restaurant_id != restaurant_id:
+                session = self._new_session(session_id, restaurant_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = time.monotonic()
+            session.turns.append({"role": "user", "content": self._clip(user_input)})
+            session.turns.append({"role": "assistant", "content": self._clip(response)})
+
+    def start_compaction(self, session_id: str, should_compact: Callable[[List[Dict[str, str]]], int]) -> Optional[Dict[str, Any]]:
+        """
+        Claim a session's oldest turns for compaction.
+
+        Args:
+            session_id: Chat session id
+            should_compact: Called with the session's turns; returns how many of
+                the oldest messages to fold into the summary (0 for none)
+
+        Returns:
+            dict: The turns to fold and the current summary, or None if there is
+                  nothing to do or a compaction is already running
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.compacting:
+                return None
+            turns = list(session.turns)
+            count = should_compact(turns)
+            if count <= 0:
+                return None
+            session.compacting = True
+            return {"restaurant_id": session.restaurant_id, "summary": session.summary, "turns": turns[:count]}
+
+    def finish_compaction(self, session_id: str, folded: Optional[List[Dict[str, str]]], summary: Optional[str],
+                          tokens_before: int = 0, tokens_after: int = 0):
+        """
+        Replace folded turns with the new running summary.
+
+        Turns added while the summary was computed are kept. Passing no
+        summary records a failed compaction and leaves the session as it was.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.compacting = False
+            stats = session.compaction_stats
+            if not summary or not folded:
+                stats["failures"] += 1
+                return
+            # Drop whichever folded turns are still at the front (the oldest may
+            # already have been pushed out by turns added in the meantime)
+            folded_ids = {id(message) for message in folded}
+            while session.turns and id(session.turns[0]) in folded_ids:
+                session.turns.popleft()
+            session.summary = summary
+            stats["compactions"] += 1
+            stats["turns_folded"] += len(folded) // 2
+            stats["tokens_before"] = tokens_before
+            stats["tokens_after"] = tokens_after
+
+    def session_stats(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """History size and compaction counters of one session"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {
+                "restaurant_id": session.restaurant_id,
+                "turns": len(session.turns) // 2,
+                "has_summary": bool(session.summary),
+                "compacting": session.compacting,
+                **session.compaction_stats
+            }
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "reloads": self.reloads,
+                "evictions": self.evictions
+            }
+
+# Shared store for the process
+conversation_store = ConversationStore()
@@ -0,0 +1,219 @@
+# backend/services/snapshot_publisher.py
+# Content-addressed publishing of restaurant snapshots to Azure Blob Storage
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+
+from services.blob_cache import blob_cache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PUBLISH_WORKERS = int(os.getenv("SNAPSHOT_PUBLISH_WORKERS", 2))
+SNAPSHOT_MANIFEST_ATTEMPTS = int(os.getenv("SNAPSHOT_MANIFEST_ATTEMPTS", 3))  # Tries when another worker moves the manifest first
+
+def canonical_snapshot(data: Dict[str, Any]) -> bytes:
+    """Serialize a snapshot so identical data always gives identical bytes"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def snapshot_blob_name(restaurant_id: Any, digest: str) -> str:
+    return f"restaurant_{restaurant_id}/snapshots/{digest}.json"
+
+def manifest_blob_name(restaurant_id: Any) -> str:
+    return f"restaurant_{restaurant_id}/manifest.json"
+
+class SnapshotPublisher:
+    """
+    Publishes restaurant snapshots under the SHA-256 of their canonical JSON.
+
+    A snapshot whose hash matches the one last published is not uploaded
+    again, so storage writes follow data changes rather than refreshes or
+    chat traffic. Each new version is written once (never overwritten),
+    and restaurant_{id}/manifest.json then points at it, so a reader never
+    sees a half-written snapshot.
+
+    Several worker processes may publish the same restaurant. The manifest
+    is read first, so content another worker already published is not
+    uploaded again, and it is replaced only with a conditional write (ETag,
+    or if-none-match when there is none yet) carrying the time its data was
+    captured: a worker never moves the manifest back to older data, and
+    one that loses a race re-reads the manifest and decides again.
+    """
+
+    def __init__(self, workers: int = SNAPSHOT_PUBLISH_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._published: Dict[str, str] = {}  # container/restaurant -> last published digest
+        self._pending = set()
+        self._containers_ready = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def _ensure_container(self, container_client):
+        # Checked once per container instead of on every upload
+        name = getattr(container_client, "container_name", None)
+        if name in self._containers_ready:
+            return
+        if not container_client.exists():
+            try:
+                container_client.create_container()
+            except ResourceExistsError:
+                pass
+        self._containers_ready.add(name)
+
+    @staticmethod
+    def _read_manifest(manifest_client) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """The current manifest and its ETag, or (None, None) if there is none yet"""
+        try:
+            downloader = manifest_client.download_blob()
+        except ResourceNotFoundError:
+            return None, None
+        return json.loads(downloader.readall()), downloader.properties.etag
+
+    @staticmethod
+    def _is_newer(manifest: Dict[str, Any], captured_at: datetime) -> bool:
+        # Manifests written before captured_at was recorded count as older
+        published = manifest.get("captured_at")
+        return bool(published) and datetime.fromisoformat(published) > captured_at
+
+    def publish(self, container_client, restaurant_id: Any, data: Dict[str, Any],
+                current_blob: Optional[str] = None, captured_at: Optional[datetime] = None) -> Tuple[str, bool]:
+        """
+        Publish a snapshot unless the same content (or newer data) is already published.
+
+        Args:
+            container_client: Azure ContainerClient to publish to
+            restaurant_id: Restaurant the snapshot belongs to
+            data: The snapshot
+            current_blob: Blob the restaurant currently points at, if known
+            captured_at: When data was read from the database (defaults to now)
+
+        Returns:
+            tuple: (blob the manifest points at, whether this call moved it)
+        """
+        captured_at = captured_at or datetime.utcnow()
+        raw = canonical_snapshot(data)
+        digest = hashlib.sha256(raw).hexdigest()
+        blob_name = snapshot_blob_name(restaurant_id, digest)
+        key = f"{getattr(container_client, 'container_name', '')}/{restaurant_id}"
+        if blob_name == current_blob or self._published.get(key) == digest:
+            with self._lock:
+                self.skipped += 1
+            return blob_name, False
+
+        self._ensure_container(container_client)
+        content_settings = ContentSettings(content_type="application/json")
+        manifest_client = container_client.get_blob_client(manifest_blob_name(restaurant_id))
+        snapshot_uploaded = False
+        for _ in range(SNAPSHOT_MANIFEST_ATTEMPTS):
+            current, etag = self._read_manifest(manifest_client)
+            if current and (current.get("sha256") == digest or self._is_newer(current, captured_at)):
+                # Another worker already published this content, or newer data
+                with self._lock:
+                    if current.get("sha256") == digest:
+                        self._published[key] = digest
+                    self.skipped += 1
+                return current["blob"], False
+
+            if not snapshot_uploaded:
+                try:
+                    result = container_client.get_blob_client(blob_name).upload_blob(
+                        raw, overwrite=False, content_settings=content_settings
+                    )
+                    blob_cache.put(container_client, blob_name, raw, result.get("etag"))
+                except ResourceExistsError:
+                    pass  # Same content published earlier, e.g. before a rollback
+                snapshot_uploaded = True
+
+            manifest = {
+                "restaurant_id": restaurant_id,
+                "sha256": digest,
+                "blob": blob_name,
+                "size": len(raw),
+                "captured_at": captured_at.isoformat(),
+                "published_at": datetime.utcnow().isoformat()
+            }
+            # Only replaces the manifest that was just read (or creates the first one)
+            conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+            try:
+                manifest_client.upload_blob(
+                    json.dumps(manifest), overwrite=bool(etag), content_settings=content_settings, **conditions
+                )
+            except (ResourceModifiedError, ResourceExistsError):
+                logger.info(f"Manifest for restaurant {restaurant_id} changed while publishing; checking it again")
+                continue
+
+            with self._lock:
+                self._published[key] = digest
+                self.uploaded += 1
+            logger.info(f"Published snapshot {digest[:12]} for restaurant {restaurant_id} ({len(raw)} bytes)")
+            return blob_name, True
+
+        raise RuntimeError(f"Manifest for restaurant {restaurant_id} kept changing; gave up after {SNAPSHOT_MANIFEST_ATTEMPTS} attempts")
+
+    def publish_in_background(self, container_client, restaurant_id: Any, data: Dict[str, Any],
+                              current_blob: Optional[str] = None,
+                              on_published: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        Publish a snapshot on a worker thread, so the caller doesn't wait on storage.
+
+        At most one publish per restaurant is queued at a time; on_published is
+        called with the blob name when a new snapshot was uploaded.
+
+        Returns:
+            bool: Whether a publish was queued
+        """
+        key = f"{getattr(container_client, 'container_name', '')}/{restaurant_id}"
+        # Stamped now, not when the job runs, since data was read just before this call
+        captured_at = datetime.utcnow()
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="snapshot-publisher")
+        self._executor.submit(self._publish_job, key, container_client, restaurant_id, data, current_blob,
+                              captured_at, on_published)
+        return True
+
+    def _publish_job(self, key, container_client, restaurant_id, data, current_blob, captured_at, on_published):
+        try:
+            blob_name, changed = self.publish(container_client, restaurant_id, data, current_blob, captured_at)
+            if changed and on_published:
+                on_published(blob_name)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Error publishing snapshot for restaurant {restaurant_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "uploaded": self.uploaded,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "pending": len(self._pending)
+            }
+
+# Shared publisher for the process
+snapshot_publisher = SnapshotPublisher()
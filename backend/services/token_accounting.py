@@ -0,0 +1,182 @@
+# backend/services/token_accounting.py
+# Prompt token budgets, per-turn usage and cost aggregates
+
+import os
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.context_serializer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", 6000))  # Prompts above this are trimmed or refused before sending
+
+# Chat format overhead: each message is wrapped in a few tokens, and the reply is primed with 3
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# USD per 1K tokens as (prompt, completion); extend or override with MODEL_PRICES='{"model": [prompt, completion]}'
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+try:
+    MODEL_PRICES.update({model: tuple(price) for model, price in json.loads(os.getenv("MODEL_PRICES", "{}")).items()})
+except (ValueError, TypeError, AttributeError) as e:
+    logger.warning(f"Ignoring invalid MODEL_PRICES: {str(e)}")
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt can't be brought under the token budget"""
+
+    def __init__(self, prompt_tokens: int, max_prompt_tokens: int):
+        super().__init__(f"Prompt needs {prompt_tokens} tokens, over the {max_prompt_tokens} token limit")
+        self.prompt_tokens = prompt_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+
+def count_prompt_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """Count the prompt tokens a list of chat messages will be billed for"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m.get("content") or "") for m in messages) + TOKENS_PER_REPLY
+
+def fit_prompt(messages: List[Dict[str, str]], max_prompt_tokens: int = MAX_PROMPT_TOKENS) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Bring a prompt under the token budget before it is sent.
+
+    The oldest conversation turns are dropped first, a whole turn (the user
+    message and the replies to it) at a time so the history never starts
+    with an answer to a question that is gone. The system messages
+    (restaurant context and conversation summary) and the current user
+    message are always kept.
+
+    Args:
+        messages: Chat messages, ending with the current user message
+        max_prompt_tokens: Token budget for the prompt
+
+    Returns:
+        tuple: (messages to send, their prompt token count)
+
+    Raises:
+        PromptTooLargeError: If the prompt is still over budget without any history
+    """
+    messages = list(messages)
+    costs = [TOKENS_PER_MESSAGE + count_tokens(m.get("content") or "") for m in messages]
+    total = sum(costs) + TOKENS_PER_REPLY
+    turns: List[List[int]] = []
+    for n, message in enumerate(messages[:-1]):
+        if message.get("role") == "system":
+            continue
+        if message.get("role") == "user" or not turns:
+            turns.append([n])
+        else:
+            turns[-1].append(n)
+    dropped = set()
+    while total > max_prompt_tokens and turns:
+        turn = turns.pop(0)
+        dropped.update(turn)
+        total -= sum(costs[n] for n in turn)
+    if total > max_prompt_tokens:
+        raise PromptTooLargeError(total, max_prompt_tokens)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} history messages to fit the {max_prompt_tokens} token prompt budget")
+        messages = [m for n, m in enumerate(messages) if n not in dropped]
+    return messages, total
+
+def _prices(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    if not model:
+        return None
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    # Dated snapshots ("gpt-4o-mini-2024-07-18") are priced as their base model
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+def turn_cost(model: Optional[str], prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    """Estimated USD cost of one completion (None for models without a known price)"""
+    prices = _prices(model)
+    if prices is None:
+        return None
+    return ((prompt_tokens or 0) * prices[0] + (completion_tokens or 0) * prices[1]) / 1000
+
+def summarize_usage(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-model usage totals into one restaurant's aggregates.
+
+    Args:
+        rows: dicts with model, turns, prompt_tokens, completion_tokens,
+            upstream_ms (sum over LLM turns), llm_turns and total_ms (sum)
+
+    Returns:
+        dict: Totals, estimated cost, average latencies and a per-model breakdown
+    """
+    result = {"turns": 0, "llm_turns": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "by_model": {}}
+    upstream_ms = total_ms = 0.0
+    for row in rows:
+        cost = turn_cost(row["model"], row["prompt_tokens"], row["completion_tokens"])
+        result["turns"] += row["turns"]
+        result["llm_turns"] += row["llm_turns"]
+        result["prompt_tokens"] += row["prompt_tokens"] or 0
+        result["completion_tokens"] += row["completion_tokens"] or 0
+        result["cost_usd"] += cost or 0.0
+        upstream_ms += row["upstream_ms"] or 0.0
+        total_ms += row["total_ms"] or 0.0
+        if row["model"]:
+            result["by_model"][row["model"]] = {
+                "turns": row["llm_turns"],
+                "prompt_tokens": row["prompt_tokens"] or 0,
+                "completion_tokens": row["completion_tokens"] or 0,
+                "cost_usd": round(cost, 6) if cost is not None else None
+            }
+    result["cost_usd"] = round(result["cost_usd"], 6)
+    result["avg_upstream_ms"] = round(upstream_ms / result["llm_turns"], 1) if result["llm_turns"] else 0.0
+    result["avg_total_ms"] = round(total_ms / result["turns"], 1) if result["turns"] else 0.0
+    return result
+
+class UsageTracker:
+    """
+    In-process usage totals per restaurant and model.
+
+    For the Flask chat app, which keeps no database; the FastAPI app stores
+    the same figures on each ChatbotLog row.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[Any, Dict[Optional[str], Dict[str, Any]]] = defaultdict(dict)
+
+    @staticmethod
+    def _key(restaurant_id: Any) -> Optional[str]:
+        # Ids arrive as ints in request bodies and as strings in URLs
+        return None if restaurant_id is None else str(restaurant_id)
+
+    def record(self, restaurant_id: Any, model: Optional[str], prompt_tokens: Optional[int],
+               completion_tokens: Optional[int], upstream_ms: Optional[float], total_ms: float):
+        """Record one chat turn (model and tokens are None for turns answered without the LLM)"""
+        with self._lock:
+            totals = self._totals[self._key(restaurant_id)].setdefault(model, {
+                "model": model, "turns": 0, "llm_turns": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "upstream_ms": 0.0, "total_ms": 0.0
+            })
+            totals["turns"] += 1
+            totals["total_ms"] += total_ms
+            if model:
+                totals["llm_turns"] += 1
+                totals["prompt_tokens"] += prompt_tokens or 0
+                totals["completion_tokens"] += completion_tokens or 0
+                totals["upstream_ms"] += upstream_ms or 0.0
+
+    def stats(self, restaurant_id: Any) -> Dict[str, Any]:
+        with self._lock:
+            rows = [dict(totals) for totals in self._totals.get(self._key(restaurant_id), {}).values()]
+        return summarize_usage(rows)
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+# Shared tracker for the process
+usage_tracker = UsageTracker()
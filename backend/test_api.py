@@ -2,15 +2,19 @@
 Combined file to run the Restaurant Chatbot API
 """
 import os
+import csv
+import json
 import logging
 import uvicorn
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, Body, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Body, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import uuid
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 # Add this right after creating your FastAPI app
 app = FastAPI(title="Restaurant Chatbot API - Test")
@@ -32,11 +36,22 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Import database configuration
-from config.database import engine, Base, get_db
+from config.database import engine, Base, get_db, SessionLocal, pool_stats
+from utils.utils import format_sse
 from database.models import *  # Import all models
 
 # Import services
 from services.chatbot_integration import ChatbotService
+from services.openai_client import close_openai_clients
+from services.llm_backend import get_llm_backend
+from services.rate_limiter import rate_limiter, client_ip_from
+from services.session_store import conversation_store
+from services.conversation_compactor import conversation_compactor
+from services.prompt_cache import prompt_cache
+from services.answer_cache import answer_cache
+from services.response_metrics import response_metrics
+from services.log_writer import log_writer
+from services.menu_import import MenuImportService, MenuImportError, parse_menu_csv, parse_faq_csv
 from services.database_services import (
     RestaurantService, MenuService, FAQService, 
     LocationService, OperatingHoursService, ChatbotLogService
@@ -53,6 +68,9 @@ class ChatbotRequest(BaseModel):
 class ChatbotResponse(BaseModel):
     session_id: str
     response: str
+    log_id: Optional[int] = None
+    cached: bool = False
+    source: Optional[str] = None  # llm, cache, faq, intent or too_large
     error: Optional[str] = None
 
 class FeedbackRequest(BaseModel):
@@ -69,30 +87,82 @@ Base.metadata.create_all(bind=engine)
 # Create router
 router = APIRouter()
 
+def enforce_chat_rate_limit(http_request: Request, request: ChatbotRequest) -> Dict[str, str]:
+    """Count a chat request against the restaurant, session and client IP limits; 429 when exceeded"""
+    result = rate_limiter.check(
+        restaurant_id=request.restaurant_id,
+        session_id=request.session_id,
+        client_ip=client_ip_from(
+            http_request.client.host if http_request.client else None,
+            http_request.headers.get("x-forwarded-for")
+        )
+    )
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many chat requests ({result.scope} limit). Please try again in {result.retry_after} seconds.",
+            headers=result.headers()
+        )
+    return result.headers()
+
 # Chatbot endpoint
 @router.post("/api/chatbot", response_model=ChatbotResponse)
 async def chatbot_interaction(
     request: ChatbotRequest,
+    http_request: Request,
+    http_response: Response,
     db: Session = Depends(get_db)
 ):
+    http_response.headers.update(enforce_chat_rate_limit(http_request, request))
     chatbot_service = ChatbotService(db)
     
     # Generate response
-    response = chatbot_service.generate_chatbot_response(
+    response = await chatbot_service.generate_chatbot_response(
         restaurant_id=request.restaurant_id,
         user_input=request.user_input,
         session_id=request.session_id
     )
+    if response.get("source") == "too_large":
+        http_response.status_code = 413
     
     return response
 
+# Streaming chatbot endpoint (Server-Sent Events)
+@router.post("/api/chatbot/stream")
+async def chatbot_interaction_stream(request: ChatbotRequest, http_request: Request):
+    rate_limit_headers = enforce_chat_rate_limit(http_request, request)
+    
+    async def event_stream():
+        # The session is owned by the stream so it stays open until the
+        # conversation has been logged after the last token
+        db = SessionLocal()
+        try:
+            chatbot_service = ChatbotService(db)
+            async for event in chatbot_service.stream_chatbot_response(
+                restaurant_id=request.restaurant_id,
+                user_input=request.user_input,
+                session_id=request.session_id
+            ):
+                event_name = event.pop("event")
+                yield format_sse(event_name, event)
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **rate_limit_headers}
+    )
+
 # Feedback endpoint
 @router.post("/api/chatbot/feedback")
 async def submit_feedback(
     feedback: FeedbackRequest,
     db: Session = Depends(get_db)
 ):
-    updated_log = ChatbotLogService.add_feedback(
+    # May wait briefly for the log writer, so keep it off the event loop
+    updated_log = await run_in_threadpool(
+        ChatbotLogService.add_feedback,
         db, 
         feedback.log_id, 
         feedback.rating, 
@@ -150,6 +220,82 @@ async def get_restaurant_logs(
     logs = ChatbotLogService.get_logs_by_restaurant(db, restaurant_id, limit)
     return {"logs": logs}
 
+# Token usage, estimated cost and latency of a restaurant's chatbot
+@router.get("/api/restaurant/{restaurant_id}/usage")
+async def get_restaurant_usage(
+    restaurant_id: int,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db)
+):
+    return {"restaurant_id": restaurant_id, **ChatbotLogService.get_usage_aggregates(db, restaurant_id, days)}
+
+# Prompt cache statistics
+@router.get("/api/chatbot/cache-stats")
+async def get_prompt_cache_stats():
+    return {"prompt_cache": prompt_cache.stats(), "answer_cache": answer_cache.stats()}
+
+# How chatbot turns are being answered (LLM, cache, FAQ or intent router)
+@router.get("/api/chatbot/metrics")
+async def get_chatbot_metrics():
+    return {
+        **response_metrics.stats(),
+        "log_writer": log_writer.stats(),
+        "llm_backend": get_llm_backend().describe(),
+        "rate_limiter": rate_limiter.stats(),
+        "sessions": conversation_store.stats(),
+        "compaction": conversation_compactor.stats()
+    }
+
+# History size and compaction stats of one chat session
+@router.get("/api/chatbot/sessions/{session_id}")
+async def get_chat_session_stats(session_id: str):
+    stats = conversation_store.session_stats(session_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, **stats}
+
+# Bulk import of a restaurant's menus and FAQs
+@router.post("/api/restaurant/{restaurant_id}/import")
+async def import_restaurant_data(
+    restaurant_id: int,
+    request: Request,
+    mode: str = Query("merge", pattern="^(merge|replace)$"),
+    kind: Optional[str] = Query(None, pattern="^(menu|faq)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a menu tree and/or FAQ list in one transaction.
+    
+    Send JSON ({"menus": [...], "faqs": [...]}) or a CSV body with
+    Content-Type text/csv and kind=menu (one row per item) or kind=faq.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            if not kind:
+                raise HTTPException(status_code=400, detail="CSV imports need kind=menu or kind=faq")
+            text = body.decode("utf-8")
+            payload = parse_menu_csv(text) if kind == "menu" else parse_faq_csv(text)
+        else:
+            payload = json.loads(body or b"{}")
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse import body: {str(e)}")
+    
+    try:
+        summary = MenuImportService.import_restaurant_data(db, restaurant_id, payload, mode)
+    except MenuImportError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    
+    return summary
+
+# Database connection pool gauges, for sizing workers against Postgres max_connections
+@router.get("/api/db/pool-stats")
+async def get_pool_stats():
+    return pool_stats()
+
 # Refresh restaurant data in blob storage
 @router.post("/api/restaurant/{restaurant_id}/refresh-data")
 async def refresh_restaurant_data(
@@ -167,6 +313,26 @@ async def refresh_restaurant_data(
 # Include router in app
 app.include_router(router)
 
+# Write chatbot logs in the background instead of inside each request
+@app.on_event("startup")
+def start_log_writer():
+    log_writer.start(SessionLocal)
+
+# Drain queued chatbot logs on shutdown
+@app.on_event("shutdown")
+def stop_log_writer():
+    log_writer.stop()
+
+# Let running conversation compactions finish on shutdown
+@app.on_event("shutdown")
+def stop_conversation_compactor():
+    conversation_compactor.shutdown()
+
+# Release pooled OpenAI connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_openai_clients():
+    await close_openai_clients()
+
 # Root endpoint
 @app.get("/")
 def read_root():
@@ -0,0 +1,130 @@
+# backend test file for the per-restaurant answer cache
+
+import asyncio
+
+import pytest
+
+from services.answer_cache import (
+    ANSWER_CACHE_SIMILARITY_THRESHOLD, AnswerCache, cosine_similarity, embed, normalize_question
+)
+
+QUESTION = "Do you have vegan dishes on the dinner menu?"
+
+def test_exact_match_after_normalization():
+    cache = AnswerCache()
+    cache.store(1, "v1", QUESTION, "Yes, three.")
+
+    hit = cache.lookup(1, "v1", "do you have VEGAN dishes on the dinner menu")
+
+    assert hit == {"answer": "Yes, three.", "match": "exact", "similarity": 1.0}
+
+@pytest.mark.parametrize("question, expected", [
+    ("Any vegan dishes on your dinner menu today?", "similar"),  # ~0.89
+    ("Do you have vegan dishes on the lunch menu?", None),  # ~0.66, a different question
+    ("Do you have vegan dish on the dinner menu?", None),  # ~0.75, under the threshold
+    ("What is the parking situation?", None)
+])
+def test_similarity_threshold(question, expected):
+    cache = AnswerCache()
+    cache.store(1, "v1", QUESTION, "Yes, three.")
+
+    hit = cache.lookup(1, "v1", question)
+
+    assert (hit and hit["match"]) == expected
+    if hit:
+        assert ANSWER_CACHE_SIMILARITY_THRESHOLD <= hit["similarity"] < 1.0
+
+@pytest.mark.parametrize("cached, asked", [
+    ("How is the salmon cooked?", "What is the salmon cooked in?"),
+    ("When is happy hour?", "Where is happy hour?"),
+    ("How spicy is the curry", "Why is the curry spicy"),  # 0.846 when question words were dropped
+    ("How spicy is the curry", "How spicy is the green curry"),  # ~0.81, the closest different question
+])
+def test_different_questions_do_not_share_answers(cached, asked):
+    assert normalize_question(cached) != normalize_question(asked)
+    assert cosine_similarity(embed(cached), embed(asked)) < ANSWER_CACHE_SIMILARITY_THRESHOLD - 0.05
+
+    cache = AnswerCache()
+    cache.store(1, "v1", cached, "Cached answer")
+
+    assert cache.lookup(1, "v1", asked) is None
+
+def test_questions_with_only_question_words_are_not_cached():
+    assert normalize_question("How are you?") == ""
+    assert normalize_question("What time do you close?") == "what time close"
+
+def test_entries_are_per_restaurant():
+    cache = AnswerCache()
+    cache.store(1, "v1", QUESTION, "Yes, three.")
+
+    assert cache.lookup(2, "v1", QUESTION) is None
+
+def test_new_data_version_invalidates_answers():
+    cache = AnswerCache()
+    cache.store(1, "v1", QUESTION, "Yes, three.")
+
+    assert cache.lookup(1, "v2", QUESTION) is None
+    # The old version's entries are gone, not just hidden
+    assert cache.lookup(1, "v1", QUESTION) is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_expired_entries_are_not_served():
+    cache = AnswerCache(ttl=0)
+    cache.store(1, "v1", QUESTION, "Yes, three.")
+
+    assert cache.lookup(1, "v1", QUESTION) is None
+
+def test_concurrent_callers_share_one_compute():
+    cache = AnswerCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Yes, three."
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_compute(1, "v1", QUESTION, compute) for _ in range(5)])
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert [answer for answer, _ in results] == ["Yes, three."] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert cache.lookup(1, "v1", QUESTION)["answer"] == "Yes, three."
+    assert cache.stats()["inflight"] == 0
+
+def test_compute_errors_reach_every_waiter():
+    cache = AnswerCache()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_compute(1, "v1", QUESTION, compute) for _ in range(3)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    # Nothing cached, and the next call computes again
+    assert cache.lookup(1, "v1", QUESTION) is None
+    assert cache.stats()["inflight"] == 0
+
+def test_different_versions_do_not_share_a_compute():
+    cache = AnswerCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"answer {len(calls)}"
+
+    async def run():
+        return await asyncio.gather(cache.get_or_compute(1, "v1", QUESTION, compute),
+                                    cache.get_or_compute(1, "v2", QUESTION, compute))
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
@@ -0,0 +1,197 @@
+# backend test file for parallel, resumable batch uploads
+
+import io
+import threading
+
+from azure.core.exceptions import ResourceNotFoundError
+
+import main
+from services.batch_upload import BatchUploader, UploadItem
+
+BLOCK_SIZE = 1024
+
+class FakeBlob:
+    """Stands in for an Azure BlobClient, keeping staged and committed blocks"""
+
+    def __init__(self, name, fail_blocks=None):
+        self.blob_name = name
+        self.staged = {}
+        self.committed = []
+        self.stage_calls = 0
+        self.fail_blocks = dict(fail_blocks or {})  # block index -> failures left
+
+    def get_block_list(self, block_list_type="committed"):
+        if not self.committed and not self.staged:
+            raise ResourceNotFoundError("missing")
+        block = lambda block_id: type("Block", (), {"id": block_id})()
+        uncommitted = [block(block_id) for block_id in self.staged if block_id not in self.committed]
+        return [block(block_id) for block_id in self.committed], uncommitted
+
+    def stage_block(self, block_id, data, length=None):
+        self.stage_calls += 1
+        index = int(block_id.split("-")[0])
+        if self.fail_blocks.get(index):
+            self.fail_blocks[index] -= 1
+            raise ConnectionError("connection reset")
+        self.staged[block_id] = bytes(data)
+
+    def commit_block_list(self, block_list, content_settings=None):
+        self.committed = [block.id for block in block_list]
+        self.content_type = getattr(content_settings, "content_type", None)
+
+    def content(self):
+        return b"".join(self.staged[block_id] for block_id in self.committed)
+
+    def download_blob(self, **kwargs):
+        if not self.committed:
+            raise ResourceNotFoundError("missing")
+        settings = type("ContentSettings", (), {"content_type": self.content_type})()
+        chunks = [self.staged[block_id] for block_id in self.committed]
+        return type("Downloader", (), {
+            "size": sum(len(chunk) for chunk in chunks),
+            "properties": type("Properties", (), {"content_settings": settings})(),
+            "chunks": lambda _: iter(chunks)
+        })()
+
+    def delete_blob(self):
+        if not self.committed:
+            raise ResourceNotFoundError("missing")
+        self.staged, self.committed = {}, []
+
+class FakeContainer:
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, name):
+        return self.blobs.setdefault(name, FakeBlob(name))
+
+def _data(size, seed=b"x"):
+    return (seed * (size // len(seed) + 1))[:size]
+
+def _uploader(retries=2):
+    return BatchUploader(workers=3, block_size=BLOCK_SIZE, block_retries=retries, backoff_seconds=0)
+
+def test_uploads_files_concurrently_in_blocks():
+    blobs = [FakeBlob(f"batch/b/{i}.pdf") for i in range(4)]
+    data = [_data(BLOCK_SIZE * 3 + i, bytes([65 + i])) for i in range(4)]
+
+    result = _uploader().upload([UploadItem(blob.blob_name, blob, io.BytesIO(d)) for blob, d in zip(blobs, data)])
+
+    assert [f["status"] for f in result["files"]] == ["uploaded"] * 4
+    assert [blob.content() for blob in blobs] == data
+    assert result["files"][1]["blocks"] == 4 and all(len(v) <= BLOCK_SIZE for v in blobs[1].staged.values())
+    assert result["summary"]["bytes"] == sum(len(d) for d in data)
+    assert result["summary"]["failed"] == 0
+    assert [f["bytes_staged"] for f in result["files"]] == [len(d) for d in data]  # Last blocks are short
+
+def test_batches_share_one_bounded_pool():
+    uploader = _uploader()
+    running, peak, lock = [0], [0], threading.Lock()
+    release = threading.Event()
+
+    class SlowBlob(FakeBlob):
+        def stage_block(self, block_id, data, length=None):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            release.wait(2)
+            super().stage_block(block_id, data, length)
+            with lock:
+                running[0] -= 1
+
+    def batch(prefix):
+        uploader.upload([UploadItem(f"{prefix}{i}", SlowBlob(f"{prefix}{i}"), io.BytesIO(b"x")) for i in range(3)])
+
+    threads = [threading.Thread(target=batch, args=(prefix,)) for prefix in "ab"]
+    for thread in threads:
+        thread.start()
+    threading.Timer(0.2, release.set).start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == uploader.workers  # Two batches of three never ran six files at once
+    uploader.shutdown()
+
+def test_failed_blocks_are_retried():
+    blob = FakeBlob("batch/b/menu.pdf", fail_blocks={1: 2})
+
+    result = _uploader(retries=2).upload([UploadItem("menu.pdf", blob, io.BytesIO(_data(BLOCK_SIZE * 3)))])
+
+    assert result["files"][0]["status"] == "uploaded"
+    assert result["files"][0]["retries"] == 2
+    assert blob.content() == _data(BLOCK_SIZE * 3)
+
+def test_failed_upload_resumes_from_staged_blocks():
+    data = _data(BLOCK_SIZE * 5, b"menu")
+    blob = FakeBlob("batch/b/menu.pdf", fail_blocks={3: 10})
+
+    first = _uploader(retries=1).upload([UploadItem("menu.pdf", blob, io.BytesIO(data))])
+    assert first["files"][0]["status"] == "failed"
+    assert first["summary"]["failed"] == 1
+    assert not blob.committed
+
+    blob.fail_blocks.clear()
+    blob.stage_calls = 0
+    second = _uploader().upload([UploadItem("menu.pdf", blob, io.BytesIO(data))])
+
+    assert second["files"][0]["status"] == "resumed"
+    assert second["files"][0]["blocks_reused"] == 3
+    assert blob.stage_calls == 2  # Only the blocks that never reached storage
+    assert blob.content() == data
+
+    third = _uploader().upload([UploadItem("menu.pdf", blob, io.BytesIO(data))])
+    assert third["files"][0]["status"] == "unchanged"
+
+def test_batch_endpoint(monkeypatch):
+    container = FakeContainer()
+    monkeypatch.setattr(main, "container_client", container)
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+    monkeypatch.setattr(main, "get_secure_file_url", lambda name: f"https://sas/{name}")
+
+    response = main.app.test_client().post("/api/upload/batch", data={
+        "upload_id": "week-42",
+        "file": [
+            (io.BytesIO(b"a" * 3000), "menu.pdf"),
+            (io.BytesIO(b"b" * 10), "photo.png"),
+            (io.BytesIO(b"c"), "script.exe")
+        ]
+    }, content_type="multipart/form-data")
+
+    body = response.get_json()
+    assert response.status_code == 207
+    assert body["upload_id"] == "week-42"
+    assert [f["status"] for f in body["files"]] == ["uploaded", "uploaded", "rejected"]
+    assert body["files"][0]["secure_url"] == "https://sas/week-42_menu.pdf"
+    assert container.blobs["week-42_menu.pdf"].content() == b"a" * 3000
+    assert body["summary"]["rejected"] == 1
+
+    bad = main.app.test_client().post("/api/upload/batch", data={"upload_id": "../x", "file": [(io.BytesIO(b"a"), "a.pdf")]},
+                                      content_type="multipart/form-data")
+    assert bad.status_code == 400
+
+def test_batch_upload_download_delete_round_trip(monkeypatch):
+    container = FakeContainer()
+    monkeypatch.setattr(main, "container_client", container)
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+    monkeypatch.setattr(main, "get_secure_file_url", lambda name: f"https://sas/{name}")
+    client = main.app.test_client()
+    unrelated = container.get_blob_client("menu.pdf")  # An unrelated top-level file
+    unrelated.staged, unrelated.committed = {"old": b"old menu"}, ["old"]
+
+    data = _data(BLOCK_SIZE * 5 + 7, b"menu")
+    upload = client.post("/api/upload/batch", data={"upload_id": "week-42", "file": [(io.BytesIO(data), "menu.pdf")]},
+                         content_type="multipart/form-data")
+    blob_name = upload.get_json()["files"][0]["blob_name"]
+    assert upload.status_code == 200 and blob_name == "week-42_menu.pdf"
+
+    download = client.get(f"/api/files/{blob_name}")
+    assert download.status_code == 200 and download.data == data
+    assert client.delete(f"/api/files/{blob_name}").status_code == 200
+    assert client.get(f"/api/files/{blob_name}").status_code == 404
+    assert client.delete(f"/api/files/{blob_name}").status_code == 404
+
+    # Nested paths are refused rather than sanitized into another blob's name
+    for path in ("batch/week-42/menu.pdf", "x/menu.pdf"):
+        assert client.get(f"/api/files/{path}").status_code == 400
+        assert client.delete(f"/api/files/{path}").status_code == 400
+    assert unrelated.content() == b"old menu"
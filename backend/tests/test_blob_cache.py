@@ -0,0 +1,103 @@
+# backend test file for the two-tier restaurant snapshot cache
+
+import json
+import time
+
+from azure.core.exceptions import ResourceNotFoundError, ResourceNotModifiedError
+
+from services.blob_cache import BlobSnapshotCache
+
+class FakeDownloader:
+    def __init__(self, data, etag):
+        self.data = data
+        self.properties = {"etag": etag}
+
+    def readall(self):
+        return self.data
+
+class FakeContainer:
+    """Stands in for an Azure ContainerClient, honouring If-None-Match"""
+    container_name = "restaurants"
+
+    def __init__(self):
+        self.blobs = {}
+        self.requests = []
+
+    def put(self, name, value):
+        version = len(self.requests) + len(self.blobs) + 1
+        self.blobs[name] = (json.dumps(value).encode("utf-8"), f'"etag-{name}-{version}-{time.time()}"')
+
+    def get_blob_client(self, name):
+        container = self
+
+        class Client:
+            def download_blob(self, etag=None, match_condition=None):
+                container.requests.append((name, etag))
+                if name not in container.blobs:
+                    raise ResourceNotFoundError("missing")
+                data, current = container.blobs[name]
+                if etag == current:
+                    raise ResourceNotModifiedError("not modified")
+                downloader = FakeDownloader(data, current)
+                downloader.properties = type("Properties", (), {"etag": current})()
+                return downloader
+        return Client()
+
+def test_serves_from_memory_within_ttl(tmp_path):
+    container = FakeContainer()
+    container.put("restaurants/1.json", {"name": "Bistro"})
+    cache = BlobSnapshotCache(ttl_seconds=60, cache_dir=str(tmp_path))
+
+    for _ in range(5):
+        assert cache.get(container, "restaurants/1.json") == {"name": "Bistro"}
+
+    assert len(container.requests) == 1
+    assert cache.stats()["memory_hits"] == 4
+
+def test_stale_entries_are_served_while_revalidating(tmp_path):
+    container = FakeContainer()
+    container.put("restaurants/1.json", {"name": "Bistro"})
+    cache = BlobSnapshotCache(ttl_seconds=0, cache_dir=str(tmp_path))
+    cache.get(container, "restaurants/1.json")
+
+    assert cache.get(container, "restaurants/1.json") == {"name": "Bistro"}
+    cache._executor.shutdown(wait=True)
+
+    stats = cache.stats()
+    assert stats["stale_served"] == 1 and stats["not_modified"] == 1
+    assert container.requests[-1][1] is not None  # Conditional request
+
+def test_revalidation_picks_up_changes(tmp_path):
+    container = FakeContainer()
+    container.put("restaurants/1.json", {"name": "Bistro"})
+    cache = BlobSnapshotCache(ttl_seconds=60, max_stale_seconds=0, cache_dir=str(tmp_path))
+    cache.get(container, "restaurants/1.json")
+    container.put("restaurants/1.json", {"name": "Bistro Nuovo"})
+
+    cache.ttl_seconds = 0
+    assert cache.get(container, "restaurants/1.json") == {"name": "Bistro Nuovo"}
+    assert cache.stats()["downloads"] == 2
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    container = FakeContainer()
+    container.put("restaurants/1.json", {"name": "Bistro"})
+    BlobSnapshotCache(cache_dir=str(tmp_path)).get(container, "restaurants/1.json")
+
+    restarted = BlobSnapshotCache(cache_dir=str(tmp_path))
+    assert restarted.get(container, "restaurants/1.json") == {"name": "Bistro"}
+    assert len(container.requests) == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+def test_missing_blobs_and_storage_errors(tmp_path):
+    container = FakeContainer()
+    cache = BlobSnapshotCache(cache_dir=str(tmp_path))
+    assert cache.get(container, "restaurants/404.json") is None
+
+    container.put("restaurants/1.json", {"name": "Bistro"})
+    cache.get(container, "restaurants/1.json")
+    cache.ttl_seconds = cache.max_stale_seconds = 0
+    container.get_blob_client = lambda name: (_ for _ in ()).throw(ConnectionError("storage down"))
+
+    # Falls back to the cached copy rather than failing the chat turn
+    assert cache.get(container, "restaurants/1.json") == {"name": "Bistro"}
+    assert cache.stats()["errors"] == 1
@@ -0,0 +1,70 @@
+# backend test file for the Server-Sent Events chat stream
+
+import json
+
+import pytest
+
+import main
+from utils.utils import format_sse
+
+class FakeStream:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def stream_completion(self, messages, model, temperature, max_tokens, usage=None):
+        for n, chunk in enumerate(self.chunks):
+            if n == self.fail_after:
+                raise ConnectionError("upstream reset")
+            yield chunk
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "get_restaurant_info", lambda restaurant_id: None)
+    monkeypatch.setattr(main, "check_chat_rate_limit", lambda data: None)
+    return main.app.test_client()
+
+def _events(body):
+    """Split a response body into (event, data) pairs, checking the framing of each"""
+    assert body.endswith("\n\n")
+    events = []
+    for frame in body[:-2].split("\n\n"):
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+def test_format_sse_frames_one_event():
+    assert format_sse("token", {"content": "Hi\nthere"}) == 'event: token\ndata: {"content": "Hi\\nthere"}\n\n'
+
+def test_stream_sends_tokens_then_done(client, monkeypatch):
+    monkeypatch.setattr(main, "chatgpt_service", FakeStream(["We open ", "at 11.\n", "Welcome!"]))
+
+    response = client.post("/api/chat/stream", json={"message": "Hours?", "session_id": "sse-done"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = _events(response.get_data(as_text=True))
+    assert [data["content"] for event, data in events if event == "token"] == ["We open ", "at 11.\n", "Welcome!"]
+    event, done = events[-1]
+    assert event == "done" and [name for name, _ in events].count("done") == 1
+    assert done["session_id"] == "sse-done" and done["finish_reason"] == "stop"
+    assert done["usage"]["completion_tokens"] > 0
+
+def test_stream_failure_ends_with_an_error_frame(client, monkeypatch):
+    monkeypatch.setattr(main, "chatgpt_service", FakeStream(["We open ", "at 11."], fail_after=1))
+
+    response = client.post("/api/chat/stream", json={"message": "Hours?", "session_id": "sse-error"})
+
+    events = _events(response.get_data(as_text=True))
+    assert events[0] == ("token", {"content": "We open "})
+    assert events[-1] == ("error", {"error": "An error occurred while processing chat request."})
+    assert "done" not in [name for name, _ in events]  # The client treats a missing done event as a failure
+
+def test_refused_stream_is_not_an_event_stream(client, monkeypatch):
+    monkeypatch.setattr(main, "chatgpt_service", FakeStream(["x"]))
+
+    response = client.post("/api/chat/stream", json={"session_id": "sse-bad"})
+
+    assert response.status_code == 400 and response.is_json
@@ -0,0 +1,76 @@
+# backend test file for token-budgeted restaurant context
+
+import pytest
+
+from services.context_serializer import count_tokens, serialize_restaurant_context
+
+def _item(n, popular=False):
+    return {
+        "name": f"Dish {n}",
+        "price": 10 + n,
+        "description": f"A long description of dish {n} " + "with plenty of words " * 4,
+        "ingredients": [f"ingredient {n}-{i}" for i in range(5)],
+        "dietary_info": {"vegetarian": n % 2 == 0, "gluten_free": False, "spice_level": n % 3},
+        "popular": popular
+    }
+
+def _restaurant(items=40, faqs=20):
+    return {
+        "restaurant_info": {"name": "Bistro", "cuisine_type": "Italian", "description": "Family run since 1980"},
+        "locations": [{"address": "1 Main St", "phone": "555-0100", "is_primary": True}],
+        "hours": [{"day": "Monday", "hours": "11:00:00 - 22:00:00"}, {"day": "Tuesday", "is_closed": True}],
+        "reservations": {"accepts_reservations": True, "min_party_size": 1, "max_party_size": 8,
+                         "advance_reservation_days": 30},
+        "menus": [{"name": "Dinner", "categories": [
+            {"name": "Mains", "items": [_item(n, popular=n == items - 1) for n in range(items)]}
+        ]}],
+        "faqs": {"General": [{"question": f"Question {n}?", "answer": f"Answer {n}."} for n in range(faqs)]}
+    }
+
+def test_small_restaurant_keeps_full_detail():
+    result = serialize_restaurant_context(_restaurant(items=2, faqs=1), token_budget=3000)
+
+    assert not result["truncated"] and result["dropped_lines"] == 0
+    assert "ingredient 1-4" in result["text"]
+    assert "Dish 0 $10.00 [V]" in result["text"]
+    assert "Mon 11:00-22:00; Tue closed" in result["text"]
+    assert result["token_count"] == count_tokens(result["text"])
+
+def test_detail_is_removed_before_entries():
+    full = serialize_restaurant_context(_restaurant(), token_budget=100000)
+    budget = full["token_count"] // 2
+
+    result = serialize_restaurant_context(_restaurant(), token_budget=budget)
+
+    assert result["truncated"] and result["dropped_lines"] == 0
+    assert "ingredient" not in result["text"]
+    assert "Dish 39" in result["text"]
+
+@pytest.mark.parametrize("budget", [130, 150, 200, 300, 400])
+def test_truncation_stays_within_budget(budget):
+    result = serialize_restaurant_context(_restaurant(), token_budget=budget)
+
+    assert result["truncated"] and result["dropped_lines"] > 0
+    assert result["token_count"] <= budget
+    assert count_tokens(result["text"]) == result["token_count"]
+
+def test_truncation_keeps_priority_order():
+    result = serialize_restaurant_context(_restaurant(), token_budget=300)
+    text = result["text"]
+
+    # Essential sections always survive
+    for expected in ("Name: Bistro", "1 Main St", "Mon 11:00-22:00", "party size 1-8"):
+        assert expected in text
+    # Popular items outrank regular items and FAQ entries
+    assert "Dish 39" in text
+    assert "Q: Question" not in text
+    # Regular items are dropped from the end, so the earliest survive longest
+    kept = [n for n in range(39) if f"Dish {n} " in text]
+    assert kept == list(range(len(kept)))
+    assert "entries not shown" in text
+
+def test_empty_sections_lose_their_headers():
+    result = serialize_restaurant_context(_restaurant(), token_budget=300)
+
+    assert "# FAQs" not in result["text"]
+    assert "## General" not in result["text"]
@@ -0,0 +1,74 @@
+# backend test file for the rolling conversation summary
+
+import threading
+
+from services.conversation_compactor import ConversationCompactor
+from services.session_store import ConversationStore
+
+def _summarizer(previous, turns):
+    questions = [m["content"] for m in turns if m["role"] == "user"]
+    return "; ".join(filter(None, [previous] + questions))
+
+def _run(compactor, session_id):
+    # Run a compaction inline instead of on the executor
+    job = compactor.store.start_compaction(session_id, compactor._fold_count)
+    if job:
+        compactor.compact(session_id, job)
+
+def test_history_stays_bounded_with_a_running_summary():
+    store = ConversationStore(max_turns=20)
+    compactor = ConversationCompactor(store, token_threshold=40, keep_turns=2, summarizer=_summarizer)
+    for n in range(12):
+        store.append("s1", 1, f"question {n} " + "word " * 10, "answer " * 10)
+        _run(compactor, "s1")
+
+    history = store.get_history("s1", 1)
+    stats = store.session_stats("s1")
+
+    assert history[0]["role"] == "system"
+    assert "question 0" in history[0]["content"]
+    assert len(history) <= 1 + 3 * 2
+    assert stats["compactions"] >= 3
+    assert stats["turns_folded"] + stats["turns"] == 12
+    assert compactor.stats()["tokens_saved"] > 0
+
+def test_compacts_before_the_turn_limit_drops_turns():
+    store = ConversationStore(max_turns=3)
+    compactor = ConversationCompactor(store, token_threshold=10000, keep_turns=1, summarizer=_summarizer)
+    for n in range(3):
+        store.append("s1", 1, f"q{n}", "a")
+    _run(compactor, "s1")
+
+    assert store.get_history("s1", 1)[0]["content"].endswith("q0; q1")
+
+def test_turns_added_during_compaction_are_kept():
+    store = ConversationStore(max_turns=20)
+    release = threading.Event()
+    def slow_summarizer(previous, turns):
+        release.wait(5)
+        return "earlier"
+    compactor = ConversationCompactor(store, token_threshold=0, keep_turns=1, summarizer=slow_summarizer)
+    store.append("s1", 1, "q0", "a0")
+    store.append("s1", 1, "q1", "a1")
+
+    assert compactor.schedule("s1")
+    store.append("s1", 1, "q2", "a2")
+    assert not compactor.schedule("s1")  # One compaction per session at a time
+    release.set()
+    compactor.shutdown()
+
+    assert [m["content"] for m in store.get_history("s1", 1)] == [
+        "Summary of the earlier conversation: earlier", "q1", "a1", "q2", "a2"
+    ]
+
+def test_failed_summary_leaves_the_turns_alone():
+    store = ConversationStore()
+    def failing(previous, turns):
+        raise RuntimeError("upstream down")
+    compactor = ConversationCompactor(store, token_threshold=0, keep_turns=0, summarizer=failing)
+    store.append("s1", 1, "q0", "a0")
+    _run(compactor, "s1")
+
+    assert len(store.get_history("s1", 1)) == 2
+    assert store.session_stats("s1")["failures"] == 1
+    assert compactor.stats()["failed"] == 1
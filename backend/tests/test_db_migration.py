@@ -0,0 +1,34 @@
+# backend test file for the additive schema migration
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, ChatbotLog, Restaurant
+from db_migration import add_missing_columns
+
+def test_missing_columns_are_added_to_existing_tables():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        # Tables as created before the chatbot columns were added to the models
+        connection.execute(text("CREATE TABLE restaurants (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL)"))
+        connection.execute(text("CREATE TABLE chatbot_logs (id INTEGER PRIMARY KEY, restaurant_id INTEGER, "
+                                "session_id VARCHAR(255), user_input TEXT NOT NULL, chatbot_response TEXT NOT NULL)"))
+        connection.execute(text("INSERT INTO restaurants (id, name) VALUES (1, 'Bistro')"))
+    Base.metadata.create_all(bind=engine)  # Creates the other tables, leaves these two alone
+
+    added = add_missing_columns(engine)
+
+    assert {"restaurants.context_token_budget", "restaurants.faq_match_threshold", "restaurants.timezone",
+            "chatbot_logs.response_source", "chatbot_logs.total_ms"} <= set(added)
+    assert not any(name.startswith("menus.") for name in added)
+    columns = {column["name"] for column in inspect(engine).get_columns("chatbot_logs")}
+    assert {column.name for column in ChatbotLog.__table__.columns} <= columns
+
+    session = sessionmaker(bind=engine)()
+    restaurant = session.query(Restaurant).filter(Restaurant.id == 1).one()
+    assert restaurant.name == "Bistro" and restaurant.timezone is None
+    assert session.query(ChatbotLog).count() == 0
+    session.close()
+
+    assert add_missing_columns(engine) == []  # Running again changes nothing
+    engine.dispose()
@@ -0,0 +1,51 @@
+# backend test file for fuzzy FAQ matching
+
+import pytest
+
+from services.faq_matcher import FAQMatcher
+
+FAQS = [
+    {"id": 1, "question": "Do you take reservations?", "answer": "Yes, online."},
+    {"id": 2, "question": "Is there parking nearby?", "answer": "Street parking."},
+    {"id": 3, "question": "Do you have gluten free options?", "answer": "Yes, marked GF."}
+]
+
+@pytest.fixture
+def matcher():
+    return FAQMatcher(FAQS)
+
+@pytest.mark.parametrize("question, faq_id", [
+    ("Do you take reservations?", 1),
+    ("do you take resevations", 1),  # Typo
+    ("DO YOU TAKE RESERVATIONS!!", 1),
+    ("parking nearby?", 2),  # Filler words dropped
+    ("Is there parking nearby?", 2)
+])
+def test_close_phrasings_match(matcher, question, faq_id):
+    result = matcher.match(question, threshold=0.8)
+
+    assert result is not None and result["id"] == faq_id
+    assert result["answer"] == FAQS[faq_id - 1]["answer"]
+    assert result["score"] >= 0.8
+
+@pytest.mark.parametrize("question", [
+    "Reservations, do you take them?",  # ~0.78, same topic but just under
+    "Do you have gluten free pasta?",  # ~0.75, asks about something the FAQ doesn't say
+    "Do you have dairy free options?",  # ~0.73, one word away but a different question
+    "Is there a park nearby?",  # ~0.66
+    "Do you take credit cards?",  # ~0.51
+    "Do you take reservations for a party of 12 on New Year Eve with a cake?",  # Extra detail the FAQ doesn't cover
+    "hello"
+])
+def test_near_misses_do_not_match(matcher, question):
+    assert matcher.match(question, threshold=0.8) is None
+
+def test_threshold_decides_borderline_questions(matcher):
+    score = matcher.match("Reservations, do you take them?", threshold=0)["score"]
+
+    assert matcher.match("Reservations, do you take them?", threshold=score - 0.001)["id"] == 1
+    assert matcher.match("Reservations, do you take them?", threshold=score + 0.01) is None
+
+def test_empty_index_and_stopword_only_questions():
+    assert FAQMatcher([]).match("Do you take reservations?") is None
+    assert len(FAQMatcher([{"question": "is it?", "answer": "Yes"}])) == 0
@@ -0,0 +1,74 @@
+# backend test file for paginated file listings and cached SAS URLs
+
+from types import SimpleNamespace
+
+from azure.core.paging import ItemPaged
+from azure.storage.blob import BlobServiceClient
+
+import main
+from services.azure_storage import SasUrlCache
+
+CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=https;AccountName=account;"
+    "AccountKey=a2V5a2V5a2V5a2V5a2V5a2V5a2V5a2V5a2V5a2V5a2V5a2V5;EndpointSuffix=core.windows.net"
+)
+
+class FakeContainer:
+    """Lists blobs in pages the way ContainerClient.list_blobs does"""
+
+    def __init__(self, count):
+        self.blobs = [
+            SimpleNamespace(name=f"menus/{n:03d}.pdf", size=n, content_settings=None, creation_time=None, last_modified=None)
+            for n in range(count)
+        ]
+
+    def list_blobs(self, name_starts_with=None, results_per_page=None):
+        blobs = [blob for blob in self.blobs if blob.name.startswith(name_starts_with or "")]
+
+        def extract(start):
+            end = start + results_per_page
+            return (str(end) if end < len(blobs) else None), iter(blobs[start:end])
+        return ItemPaged(lambda token: int(token or 0), extract)
+
+def test_sas_urls_are_reused_until_close_to_expiry():
+    client = BlobServiceClient.from_connection_string(CONNECTION_STRING)
+    cache = SasUrlCache(expiry_hours=1, refresh_margin_seconds=600)
+
+    first = cache.url(client, "files", "menus/dinner menu.pdf")
+    assert cache.url(client, "files", "menus/dinner menu.pdf") == first
+    assert first.startswith("https://account.blob.core.windows.net/files/menus/dinner%20menu.pdf?")
+    assert "sp=r" in first
+
+    cache.refresh_margin_seconds = 3600  # Every cached URL is now too close to expiry
+    cache.url(client, "files", "menus/dinner menu.pdf")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_listing_pages_through_the_container(monkeypatch):
+    monkeypatch.setattr(main, "container_client", FakeContainer(25))
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+    client = main.app.test_client()
+
+    names, token, pages = [], None, 0
+    while True:
+        query = {"page_size": 10, "fields": "name,size"}
+        if token:
+            query["continuation_token"] = token
+        data = client.get("/api/files", query_string=query).get_json()
+        names += [file["name"] for file in data["files"]]
+        pages += 1
+        assert all(set(file) == {"name", "size"} for file in data["files"])
+        token = data["continuation_token"]
+        if not token:
+            break
+
+    assert pages == 3
+    assert names == [f"menus/{n:03d}.pdf" for n in range(25)]
+
+def test_listing_rejects_unknown_fields(monkeypatch):
+    monkeypatch.setattr(main, "container_client", FakeContainer(1))
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+
+    response = main.app.test_client().get("/api/files?fields=name,owner")
+
+    assert response.status_code == 400
+    assert "owner" in response.get_json()["error"]
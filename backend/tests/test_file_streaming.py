@@ -0,0 +1,121 @@
+# backend test file for streamed blob uploads and downloads
+
+import io
+
+import pytest
+from azure.core.pipeline.transport import HttpResponse, HttpTransport
+from azure.storage.blob import ContainerClient
+
+import main
+from services.azure_storage import BLOB_CLIENT_OPTIONS, upload_stream
+
+BLOCK_SIZE = 1024
+
+class _Response(HttpResponse):
+    def __init__(self, request, status_code, headers):
+        super().__init__(request, None)
+        self.status_code = status_code
+        self.headers = headers
+        self.reason = "Created"
+        self.content_type = None
+
+    def body(self):
+        return b""
+
+class RecordingTransport(HttpTransport):
+    """Answers every blob request with 201 and records (url, body size)"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, request, **kwargs):
+        data = request.data if request.data is not None else b""
+        if hasattr(data, "read"):
+            data = data.read()
+        self.requests.append((request.url, len(data)))
+        return _Response(request, 201, {"ETag": '"1"', "Last-Modified": "Sat, 17 Oct 2026 00:00:00 GMT"})
+
+class OneWayStream:
+    """A request body: readable once, not seekable, and tracking the largest read"""
+
+    def __init__(self, size):
+        self._data = io.BytesIO(b"m" * size)
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size)
+        return self._data.read(size)
+
+@pytest.fixture
+def transport():
+    return RecordingTransport()
+
+@pytest.fixture
+def container(transport):
+    options = {**BLOB_CLIENT_OPTIONS, "max_single_put_size": BLOCK_SIZE, "max_block_size": BLOCK_SIZE}
+    return ContainerClient("https://account.blob.core.windows.net", "files", transport=transport, **options)
+
+def test_upload_stream_sends_bounded_blocks(container, transport):
+    body = OneWayStream(10 * BLOCK_SIZE + 10)
+
+    _, size = upload_stream(container.get_blob_client("menu.pdf"), body)
+
+    assert size == 10 * BLOCK_SIZE + 10
+    assert body.largest_read <= BLOCK_SIZE
+    blocks = [length for url, length in transport.requests if "comp=block&" in url]
+    assert len(blocks) == 11 and max(blocks) <= BLOCK_SIZE
+    assert "comp=blocklist" in transport.requests[-1][0]
+
+def test_raw_body_upload_is_streamed(monkeypatch, container, transport):
+    monkeypatch.setattr(main, "container_client", container)
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+    monkeypatch.setattr(main, "get_secure_file_url", lambda name: f"https://sas/{name}")
+    client = main.app.test_client()
+
+    response = client.post(
+        "/api/upload?filename=menu.pdf",
+        data=b"m" * (3 * BLOCK_SIZE),
+        content_type="application/pdf"
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["size"] == 3 * BLOCK_SIZE
+    assert max(length for _, length in transport.requests) <= BLOCK_SIZE
+
+def test_download_streams_chunks(monkeypatch):
+    chunks = [b"a" * 100, b"b" * 100, b"c" * 5]
+
+    class Downloader:
+        size = 205
+        properties = type("Properties", (), {"content_settings": type("Settings", (), {"content_type": "application/pdf"})()})()
+
+        def chunks(self):
+            yield from chunks
+
+        def readall(self):
+            raise AssertionError("download was buffered")
+
+    class Container:
+        def get_blob_client(self, name):
+            return type("Blob", (), {"download_blob": lambda self, **kwargs: Downloader()})()
+
+    monkeypatch.setattr(main, "container_client", Container())
+    monkeypatch.setattr(main, "is_blob_storage_configured", lambda: True)
+
+    response = main.app.test_client().get("/api/files/menu.pdf")
+
+    assert response.is_streamed
+    assert response.headers["Content-Length"] == "205"
+    assert response.data == b"".join(chunks)
@@ -0,0 +1,124 @@
+# backend test file for deterministic intent routing
+
+from datetime import datetime, timezone
+
+import pytest
+from zoneinfo import ZoneInfo
+
+from services.intent_router import answer_intent, classify_intent, restaurant_timezone
+
+UTC = ZoneInfo("UTC")
+NEW_YORK = ZoneInfo("America/New_York")
+
+# 2026-10-12 is a Monday
+MONDAY, TUESDAY, FRIDAY, SATURDAY, SUNDAY = 12, 13, 16, 17, 18
+
+DATA = {
+    "hours": [
+        {"day": "Monday", "hours": "11:00:00 - 22:00:00"},
+        {"day": "Tuesday", "is_closed": True},
+        {"day": "Wednesday", "hours": "11:00:00 - 22:00:00"},
+        {"day": "Thursday", "hours": "11:00:00 - 22:00:00"},
+        {"day": "Friday", "hours": "17:00:00 - 02:00:00"},  # Past midnight
+        {"day": "Saturday", "hours": "12:00:00 - 01:30:00"},
+        {"day": "Sunday", "is_closed": True}
+    ],
+    "locations": [{"address": "1 Main St", "phone": "555-0100", "email": "hi@bistro.test", "is_primary": True}],
+    "reservations": {"accepts_reservations": True, "min_party_size": 1, "max_party_size": 8,
+                     "advance_reservation_days": 30, "special_instructions": "Call for groups over 8"}
+}
+
+def _at(day, hour, minute=0):
+    return datetime(2026, 10, day, hour, minute)
+
+@pytest.mark.parametrize("text, name, fields", [
+    ("Are you open?", "hours", {"now": True}),
+    ("Are you open right now?", "hours", {"now": True}),
+    ("What are your hours?", "hours", {"general": True, "now": False}),
+    ("When do you close on Friday?", "hours", {"day": 4}),
+    ("Are you open tomorrow?", "hours", {"tomorrow": True}),
+    ("What time do you close tonight?", "hours", {"today": True}),
+    ("Where are you located?", "location", {}),
+    ("What is your phone number?", "contact", {}),
+    ("Do you take reservations?", "reservations", {}),
+    ("How many people for a party?", "reservations", {}),
+    # Anything outside an intent's vocabulary goes to the LLM
+    ("Are you open on Christmas?", None, {}),
+    ("Can I book for 7pm Friday?", None, {}),
+    ("Open Monday or Tuesday?", None, {}),
+    ("When?", None, {}),
+    ("Do you have vegan food?", None, {}),
+    ("", None, {}),
+    ("Are you open " + "really " * 40 + "?", None, {})
+])
+def test_classify_intent(text, name, fields):
+    intent = classify_intent(text)
+
+    if name is None:
+        assert intent is None
+        return
+    assert intent["name"] == name
+    for key, value in fields.items():
+        assert intent[key] == value
+
+@pytest.mark.parametrize("now, expected", [
+    (_at(MONDAY, 12), "Yes, we're open right now until 10 PM."),
+    (_at(MONDAY, 9), "We're closed right now. We open today at 11 AM."),
+    (_at(MONDAY, 0, 30), "We're closed right now. We open today at 11 AM."),  # Sunday was closed
+    (_at(MONDAY, 23), "We're closed right now. We open again on Wednesday at 11 AM."),
+    (_at(FRIDAY, 23, 30), "Yes, we're open right now until 2 AM."),
+    (_at(SATURDAY, 1), "Yes, we're open right now until 2 AM."),  # Friday's hours past midnight
+    (_at(SATURDAY, 2), "We're closed right now. We open today at 12 PM."),
+    (_at(SUNDAY, 1, 15), "Yes, we're open right now until 1:30 AM."),
+    (_at(SUNDAY, 1, 45), "We're closed right now. We open again tomorrow at 11 AM.")
+])
+def test_open_now(now, expected):
+    assert answer_intent(classify_intent("Are you open now?"), DATA, UTC, now=now) == expected
+
+@pytest.mark.parametrize("text, now, expected", [
+    ("Are you open today?", _at(MONDAY, 8), "Today (Monday) we're open from 11 AM to 10 PM."),
+    ("Are you open today?", _at(TUESDAY, 8), "We're closed today (Tuesday)."),
+    ("Are you open tomorrow?", _at(FRIDAY, 8), "Tomorrow (Saturday) we're open from 12 PM to 1:30 AM."),
+    ("When do you close on Friday?", _at(MONDAY, 8), "On Friday we're open from 5 PM to 2 AM.")
+])
+def test_day_answers(text, now, expected):
+    assert answer_intent(classify_intent(text), DATA, UTC, now=now) == expected
+
+def test_general_hours_list_every_day():
+    answer = answer_intent(classify_intent("What are your hours?"), DATA, UTC, now=_at(MONDAY, 8))
+
+    assert answer.startswith("Our hours are:\nMonday: 11 AM - 10 PM\nTuesday: closed")
+    assert "Friday: 5 PM - 2 AM" in answer
+
+@pytest.mark.parametrize("tz, expected", [
+    # Saturday 04:00 UTC is still Friday night (midnight) in New York
+    (NEW_YORK, "Yes, we're open right now until 2 AM."),
+    (UTC, "We're closed right now. We open today at 12 PM.")
+])
+def test_open_now_uses_the_restaurant_timezone(tz, expected):
+    now = datetime(2026, 10, SATURDAY, 4, 0, tzinfo=timezone.utc)
+
+    assert answer_intent(classify_intent("Are you open?"), DATA, tz, now=now) == expected
+
+def test_today_follows_the_restaurant_timezone():
+    # Tuesday 01:00 UTC is Monday evening in New York
+    now = datetime(2026, 10, TUESDAY, 1, 0, tzinfo=timezone.utc)
+
+    assert answer_intent(classify_intent("Are you open today?"), DATA, NEW_YORK, now=now).startswith("Today (Monday)")
+    assert answer_intent(classify_intent("Are you open today?"), DATA, UTC, now=now) == "We're closed today (Tuesday)."
+
+def test_unknown_timezone_falls_back():
+    assert restaurant_timezone("Mars/Olympus") == ZoneInfo("UTC")
+    assert restaurant_timezone("America/New_York") == NEW_YORK
+
+def test_other_intents_and_missing_data():
+    assert answer_intent(classify_intent("Where are you located?"), DATA, UTC) == (
+        "We're located at 1 Main St. You can reach us at 555-0100."
+    )
+    assert answer_intent(classify_intent("What is your phone number?"), DATA, UTC) == (
+        "You can call us at 555-0100 or email us at hi@bistro.test."
+    )
+    assert answer_intent(classify_intent("Do you take reservations?"), DATA, UTC).endswith("Call for groups over 8.")
+    # No data: fall through to the LLM
+    assert answer_intent(classify_intent("Are you open?"), {}, UTC) is None
+    assert answer_intent(classify_intent("Where are you located?"), {"locations": []}, UTC) is None
@@ -0,0 +1,91 @@
+# backend test file for the LLM backend selection and the stand-in server
+
+import time
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import llm_stub
+from services import openai_client
+from services.llm_backend import LLMBackend, LLM_STUB_URL
+
+@pytest.fixture
+def stub():
+    previous = llm_stub.settings.as_dict()
+    llm_stub.settings.update({"latency_ms": 0, "jitter_ms": 0, "tokens_per_second": 0, "rate_limit_rate": 0,
+                              "error_rate": 0, "timeout_rate": 0})
+    llm_stub.stats.reset()
+    client = openai.AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_stub.app))
+    )
+    yield client
+    llm_stub.settings.update(previous)
+
+def test_stub_backend_needs_no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    assert LLMBackend("stub").configured
+    assert LLMBackend("stub").describe()["base_url"] == LLM_STUB_URL
+    assert not LLMBackend("openai").configured
+    with pytest.raises(ValueError):
+        LLMBackend("mock")
+
+def test_stub_streams_chunks_like_the_api(stub):
+    async def collect():
+        stream = await stub.chat.completions.create(
+            model="gpt-4",
+            messages=[{"role": "user", "content": "What do you recommend?"}],
+            max_tokens=6,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        chunks = [chunk async for chunk in stream]
+        return chunks
+
+    chunks = asyncio.run(collect())
+    text = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+
+    assert len(text.split()) == 6
+    assert any(c.choices and c.choices[0].finish_reason == "stop" for c in chunks)
+    assert chunks[-1].usage.completion_tokens == 6
+    assert llm_stub.stats.as_dict()["streamed"] == 1
+
+def test_stub_injects_rate_limits_with_retry_after(stub):
+    llm_stub.settings.update({"rate_limit_rate": 1.0, "retry_after": 2})
+
+    with pytest.raises(openai.RateLimitError) as error:
+        asyncio.run(stub.chat.completions.create(
+            model="gpt-4", messages=[{"role": "user", "content": "Hi"}]
+        ))
+
+    assert error.value.response.headers["retry-after"] == "2.0"
+    assert llm_stub.stats.as_dict()["rate_limited"] == 1
+
+def test_stub_hangs_timed_out_requests(stub):
+    # The in-process transport ignores client timeouts, so the stub's own 504 ends the request
+    llm_stub.settings.update({"timeout_rate": 1.0, "hang_seconds": 0.2})
+
+    started_at = time.perf_counter()
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(stub.chat.completions.create(
+            model="gpt-4", messages=[{"role": "user", "content": "Hi"}]
+        ))
+
+    assert time.perf_counter() - started_at >= 0.2
+    assert llm_stub.stats.as_dict()["timed_out"] == 1
+
+def test_shared_clients_are_per_api_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-env")
+    monkeypatch.setattr(openai_client, "_clients", {})
+    monkeypatch.setattr(openai_client, "_async_clients", {})
+
+    default = openai_client.get_openai_client()
+    assert openai_client.get_openai_client("sk-env") is default
+    assert openai_client.get_openai_client("sk-other").api_key == "sk-other"
+    assert openai_client.get_async_openai_client("sk-other").api_key == "sk-other"
+    assert openai_client.get_async_openai_client().api_key == "sk-env"
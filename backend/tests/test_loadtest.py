@@ -0,0 +1,56 @@
+# backend test file for the load test harness and the LLM stub
+
+import asyncio
+
+import httpx
+import openai
+
+import llm_stub
+from loadtest import LoadTestResults, compare_reports, parse_restaurants, percentile
+
+def test_stub_speaks_the_chat_completions_protocol():
+    llm_stub.settings.latency_ms = 0
+    llm_stub.settings.tokens_per_second = 0
+    llm_stub.stats.reset()
+    client = openai.AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_stub.app))
+    )
+
+    response = asyncio.run(client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": "Do you have parking?"}],
+        max_tokens=5
+    ))
+
+    assert len(response.choices[0].message.content.split()) == 5
+    assert response.usage.completion_tokens == 5
+    assert llm_stub.stats.as_dict()["requests"] == 1
+
+def test_percentiles_and_error_rate():
+    results = LoadTestResults()
+    for n in range(1, 101):
+        results.record("menu", float(n), 200, source="llm")
+    results.record("menu", 5000.0, "timeout", error="timeout")
+
+    summary = results.summary(elapsed_seconds=10)
+
+    assert percentile(sorted(results.latencies), 99) == 99.0
+    assert summary["latency_ms"]["p50"] == 50.0
+    assert summary["throughput_rps"] == 10.0
+    assert summary["error_rate"] == round(1 / 101, 4)
+
+def test_compare_reports_flags_regressions():
+    config = {"target": "fastapi"}
+    previous = {"config": config, "results": {"throughput_rps": 100.0, "latency_ms": {"p95": 200.0}}}
+    current = {"config": config, "results": {"throughput_rps": 80.0, "latency_ms": {"p95": 150.0}}}
+
+    lines = compare_reports(previous, current)
+
+    assert any(line.startswith("throughput_rps") and "(worse)" in line for line in lines)
+    assert any(line.startswith("p95_ms") and "(better)" in line for line in lines)
+
+def test_parse_restaurants():
+    assert parse_restaurants("1-3,7") == [1, 2, 3, 7]
+    assert parse_restaurants("restaurant123,restaurant456") == ["restaurant123", "restaurant456"]
@@ -0,0 +1,139 @@
+# backend test file for the background chatbot log writer
+
+import json
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base, ChatbotLog
+from services.log_writer import LOG_ID_RESERVE_BACKOFF_SECONDS, ChatbotLogWriter, LogIdAllocator
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def writer(engine, tmp_path):
+    writer = ChatbotLogWriter(batch_size=10, flush_interval_ms=5000,
+                              spill_path=str(tmp_path / "spill.jsonl"),
+                              quarantine_path=str(tmp_path / "quarantine.jsonl"))
+    writer.session_factory = sessionmaker(bind=engine)
+    return writer
+
+def _record(log_id, user_input="Are you open?"):
+    return {"id": log_id, "restaurant_id": 1, "session_id": "s", "user_input": user_input,
+            "chatbot_response": "Yes", "timestamp": datetime(2026, 10, 17, 12, 0)}
+
+def _ids(engine):
+    with engine.connect() as connection:
+        return sorted(row[0] for row in connection.exec_driver_sql("SELECT id FROM chatbot_logs"))
+
+def _lines(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")] if path.exists() else []
+
+def test_poison_record_is_quarantined_and_the_rest_written(writer, engine, tmp_path):
+    batch = [_record(1), _record(2, user_input=None), _record(3)]  # user_input is NOT NULL
+
+    assert writer._write(batch)
+
+    assert _ids(engine) == [1, 3]
+    quarantined = _lines(tmp_path / "quarantine.jsonl")
+    assert [entry["record"]["id"] for entry in quarantined] == [2]
+    assert "NOT NULL" in quarantined[0]["error"]
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert writer.stats()["quarantined"] == 1 and writer.written == 2
+
+def test_duplicate_ids_do_not_block_later_batches(writer, engine, tmp_path):
+    writer._write([_record(1)])
+
+    writer._write([_record(1), _record(2)])
+    writer._write([_record(3)])
+
+    assert _ids(engine) == [1, 2, 3]
+    assert len(_lines(tmp_path / "quarantine.jsonl")) == 1
+
+def test_outage_spills_and_replays_without_losing_records(writer, engine, tmp_path):
+    ChatbotLog.__table__.drop(engine)  # Writes fail with OperationalError, as when the database is down
+
+    assert not writer._write([_record(1), _record(2)])
+    assert [record["id"] for record in _lines(tmp_path / "spill.jsonl")] == [1, 2]
+    assert not (tmp_path / "quarantine.jsonl").exists()
+
+    ChatbotLog.__table__.create(engine)
+    # A poison record in the spill file is quarantined during replay instead of looping forever
+    writer._spill([_record(4, user_input=None)])
+    assert writer._write([_record(3)])
+
+    assert _ids(engine) == [1, 2, 3]
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert [entry["record"]["id"] for entry in _lines(tmp_path / "quarantine.jsonl")] == [4]
+    assert writer.replayed == 2
+
+def test_unreadable_spill_lines_are_quarantined(writer, engine, tmp_path):
+    (tmp_path / "spill.jsonl").write_text('{"broken\n' + json.dumps(_record(5), default=str) + "\n")
+
+    writer._replay_spill()
+
+    assert _ids(engine) == [5]
+    assert len(_lines(tmp_path / "quarantine.jsonl")) == 1
+
+def test_wait_for_only_waits_for_its_own_record(writer):
+    writer._pending_ids.update({1, 2})
+
+    assert writer.wait_for(99, timeout=0)  # Not queued: nothing to wait for
+    assert not writer.wait_for(1, timeout=0.01)
+
+    threading.Timer(0.05, writer._settle, args=([{"id": 1}],)).start()
+    assert writer.wait_for(1, timeout=2)
+    assert writer._pending_ids == {2}
+
+def test_submit_never_reserves_ids_on_the_calling_thread(writer, engine, monkeypatch):
+    reserving_threads = []
+    reserve_block = LogIdAllocator._reserve_block
+
+    def tracked_reserve(allocator):
+        reserving_threads.append(threading.current_thread().name)
+        return reserve_block(allocator)
+
+    monkeypatch.setattr(LogIdAllocator, "_reserve_block", tracked_reserve)
+    writer.start(writer.session_factory)
+    try:
+        ids = []
+        for _ in range(12):  # More than one LOG_ID_BLOCK_SIZE block
+            ids += [writer.submit(_record(None)) for _ in range(8)]
+            assert writer.flush()
+    finally:
+        writer.stop()
+
+    # The first block is reserved by start(), every later one by the writer thread
+    assert reserving_threads[0] == threading.current_thread().name
+    assert len(reserving_threads) > 1 and set(reserving_threads[1:]) == {"chatbot-log-writer"}
+    assert None not in ids and len(set(ids)) == 96
+    assert _ids(engine) == sorted(ids)
+
+def test_failed_reservations_back_off(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("services.log_writer.time.monotonic", lambda: clock[0])
+
+    def unavailable():
+        raise OperationalError("SELECT nextval", {}, Exception("connection refused"))
+
+    allocator = LogIdAllocator(unavailable, block_size=4)
+    allocator.refill()
+    assert allocator.allocate() is None
+    assert not allocator.needs_refill()  # Backing off instead of retrying on every record
+
+    clock[0] += LOG_ID_RESERVE_BACKOFF_SECONDS
+    assert allocator.needs_refill()
+    allocator.refill()
+    clock[0] += LOG_ID_RESERVE_BACKOFF_SECONDS
+    assert not allocator.needs_refill()  # The backoff doubled
+    assert allocator.failed_reservations == 2
@@ -0,0 +1,140 @@
+# backend test file for bulk menu and FAQ imports
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Restaurant, MenuItem, FAQ
+from services.menu_import import MenuImportError, MenuImportService, parse_faq_csv, parse_menu_csv, validate_import
+
+def _payload(items=("Margherita", "Diavola"), faqs=("Do you deliver?",), price=12):
+    return {
+        "menus": [{"name": "Dinner", "start_time": "17:00", "categories": [{
+            "name": "Pizza",
+            "items": [{"name": name, "price": price, "ingredients": ["tomato", {"name": "milk", "is_allergen": True}]}
+                      for name in items]
+        }]}],
+        "faqs": [{"question": question, "answer": "Yes."} for question in faqs]
+    }
+
+def _errors(payload):
+    with pytest.raises(MenuImportError) as error:
+        validate_import(payload)
+    return error.value.errors
+
+@pytest.mark.parametrize("payload, expected", [
+    (["x"], "payload: must be an object with menus and/or faqs"),
+    ("menus", "payload: must be an object with menus and/or faqs"),
+    ({"menus": ["x"]}, "menus[0]: must be an object"),
+    ({"menus": {"a": 1}}, "menus: must be a list"),
+    ({"faqs": [None]}, "faqs[0]: must be an object"),
+    ({"faqs": "Do you deliver?"}, "faqs: must be a list"),
+    ({"menus": [{"name": "M", "categories": "abc"}]}, "menus[0].categories: must be a list"),
+    ({"menus": [{"name": "M", "categories": [{"name": "C", "items": [7]}]}]}, "menus[0].categories[0].items[0]: must be an object"),
+    ({"menus": [{"name": {"en": "M"}}]}, "menus[0].name: must be text"),
+    ({"menus": [{"name": "M", "start_time": "25:00"}]}, "menus[0].start_time: must be a valid time of day")
+])
+def test_structural_errors_are_reported(payload, expected):
+    assert expected in _errors(payload)
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("price", "nan", "price: must be a non-negative number"),
+    ("price", "inf", "price: must be a non-negative number"),
+    ("price", -1, "price: must be a non-negative number"),
+    ("price", "twelve", "price: is invalid"),
+    ("ingredients", [1], "ingredients: must be names or objects with a name"),
+    ("ingredients", [{"is_allergen": True}], "ingredients: must all have a name"),
+    ("spice_level", 9, "spice_level: must be between 0 and 5"),
+    ("display_order", float("inf"), "display_order: is invalid"),
+    ("vegan", None, None)
+])
+def test_item_field_errors(field, value, expected):
+    item = {"name": "Margherita", "price": 12, field: value}
+    payload = {"menus": [{"name": "Dinner", "categories": [{"name": "Pizza", "items": [item]}]}]}
+
+    if expected is None:
+        validate_import(payload)
+        return
+    assert _errors(payload) == [f"menus[0].categories[0].items[0].{expected}"]
+
+def test_every_error_is_collected():
+    errors = _errors({
+        "menus": [{"name": "Dinner"}, {"name": "dinner"}, "x"],
+        "faqs": [{"question": "Q?"}, {"answer": "A"}]
+    })
+
+    assert sorted(errors) == [
+        "faqs[0].answer: is required",
+        "faqs[1].question: is required",
+        "menus[1]: duplicate menu 'dinner'",
+        "menus[2]: must be an object"
+    ]
+
+def test_csv_payloads():
+    menu = parse_menu_csv("menu,category,item,price,vegan,ingredients\nDinner,Pizza,Marinara,9,yes,tomato;garlic\n")
+    faqs = parse_faq_csv("question,answer\nDo you deliver?,Yes\n")
+
+    menus, _ = validate_import(menu)
+    item = menus[0]["categories"][0]["items"][0]
+    assert item["name"] == "Marinara" and item["price"] == 9.0 and item["is_vegan"] is True
+    assert [ingredient["name"] for ingredient in item["ingredients"]] == ["tomato", "garlic"]
+    assert validate_import(faqs)[1][0]["question"] == "Do you deliver?"
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Restaurant(id=1, name="Bistro"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_first_import_creates_everything(db):
+    summary = MenuImportService.import_restaurant_data(db, 1, _payload())
+
+    assert summary["menus"] == {"created": 1, "updated": 0, "unchanged": 0, "deactivated": 0}
+    assert summary["items"]["created"] == 2
+    assert summary["ingredients"]["created"] == 4
+    assert summary["faqs"]["created"] == 1
+    assert db.query(MenuItem).count() == 2
+
+def test_merge_counts_updates_and_leaves_missing_rows_alone(db):
+    MenuImportService.import_restaurant_data(db, 1, _payload())
+
+    summary = MenuImportService.import_restaurant_data(
+        db, 1, _payload(items=("Margherita", "Funghi"), faqs=("Do you deliver?", "Is there parking?"), price=13)
+    )
+
+    assert summary["items"] == {"created": 1, "updated": 1, "unchanged": 0, "deactivated": 0}
+    assert summary["menus"]["unchanged"] == 1
+    assert summary["faqs"] == {"created": 1, "updated": 0, "unchanged": 1, "deactivated": 0}
+    assert db.query(MenuItem).filter(MenuItem.is_active == True).count() == 3  # noqa: E712
+
+def test_replace_deactivates_missing_rows(db):
+    MenuImportService.import_restaurant_data(db, 1, _payload(faqs=("Do you deliver?", "Is there parking?")))
+
+    summary = MenuImportService.import_restaurant_data(db, 1, _payload(items=("Margherita",)), mode="replace")
+
+    assert summary["items"] == {"created": 0, "updated": 0, "unchanged": 1, "deactivated": 1}
+    assert summary["faqs"] == {"created": 0, "updated": 0, "unchanged": 1, "deactivated": 1}
+    assert [item.name for item in db.query(MenuItem).filter(MenuItem.is_active == True)] == ["Margherita"]  # noqa: E712
+    assert db.query(FAQ).filter(FAQ.is_active == True).count() == 1  # noqa: E712
+
+def test_reimport_is_a_no_op(db):
+    MenuImportService.import_restaurant_data(db, 1, _payload())
+
+    summary = MenuImportService.import_restaurant_data(db, 1, _payload())
+
+    assert summary["items"] == {"created": 0, "updated": 0, "unchanged": 2, "deactivated": 0}
+    assert summary["ingredients"]["replaced_for_items"] == 0
+
+def test_invalid_payload_writes_nothing_and_unknown_restaurant(db):
+    with pytest.raises(MenuImportError):
+        MenuImportService.import_restaurant_data(db, 1, {"menus": [{"name": "Dinner", "categories": "abc"}]})
+    with pytest.raises(MenuImportError):
+        MenuImportService.import_restaurant_data(db, 1, _payload(), mode="upsert")
+
+    assert db.query(MenuItem).count() == 0
+    assert MenuImportService.import_restaurant_data(db, 99, _payload()) is None
@@ -0,0 +1,66 @@
+# backend test file for the menu loader
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Restaurant, Menu, MenuCategory, MenuItem, MenuItemIngredient
+from services.database_services import MenuService
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.query_count = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(*args):
+        session.query_count += 1
+
+    yield session
+    session.close()
+
+def seed_menu(db, restaurant_id, categories, items_per_category):
+    db.add(Restaurant(id=restaurant_id, name=f"Restaurant {restaurant_id}"))
+    menu = Menu(restaurant_id=restaurant_id, name="Dinner")
+    for c in range(categories):
+        category = MenuCategory(name=f"Category {c}", display_order=categories - c)
+        for i in range(items_per_category):
+            item = MenuItem(
+                name=f"Item {c}-{i}",
+                price=10.0,
+                display_order=items_per_category - i,
+                is_active=(i != 0)
+            )
+            item.ingredients = [MenuItemIngredient(name="salt"), MenuItemIngredient(name="pepper")]
+            category.items.append(item)
+        menu.categories.append(category)
+    db.add(menu)
+    db.commit()
+    db.expunge_all()
+
+def count_menu_queries(db, restaurant_id):
+    db.query_count = 0
+    menus = MenuService.get_full_menu_by_restaurant(db, restaurant_id)
+    return db.query_count, menus
+
+def test_query_count_is_constant_as_menu_grows(db):
+    seed_menu(db, 1, categories=2, items_per_category=3)
+    seed_menu(db, 2, categories=10, items_per_category=15)
+
+    small_count, _ = count_menu_queries(db, 1)
+    large_count, large_menus = count_menu_queries(db, 2)
+
+    assert small_count == large_count
+    assert large_count <= 4
+    assert sum(len(c["items"]) for c in large_menus[0]["categories"]) == 10 * 14
+
+def test_menu_honors_display_order_and_skips_inactive_items(db):
+    seed_menu(db, 1, categories=3, items_per_category=4)
+
+    _, menus = count_menu_queries(db, 1)
+    categories = menus[0]["categories"]
+
+    assert [c["name"] for c in categories] == ["Category 2", "Category 1", "Category 0"]
+    assert [i["name"] for i in categories[0]["items"]] == ["Item 2-3", "Item 2-2", "Item 2-1"]
+    assert categories[0]["items"][0]["ingredients"] == ["salt", "pepper"]
@@ -0,0 +1,134 @@
+# backend test file for the compiled prompt cache
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, Restaurant
+from services.chatbot_integration import ChatbotService
+from services.database_services import RestaurantService
+from services.prompt_cache import PromptCache, prompt_cache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("services.prompt_cache.time.monotonic", clock)
+    return clock
+
+def test_entries_are_versioned():
+    cache = PromptCache()
+    cache.put(1, "v1", "prompt")
+
+    assert cache.get(1, "v1") == "prompt"
+    assert cache.get(1, "v2") is None
+    cache.put(1, "v2", "newer")
+    assert cache.get(1, "v1") is None and cache.get(1, "v2") == "newer"
+    assert cache.stats()["entries"] == 1
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = PromptCache(max_bytes=10)
+    cache.put(1, "v", "aaaa")
+    cache.put(2, "v", "bbbb")
+    cache.get(1, "v")  # Now 2 is the least recently used
+
+    cache.put(3, "v", "cccc")
+
+    assert cache.get(2, "v") is None
+    assert cache.get(1, "v") == "aaaa" and cache.get(3, "v") == "cccc"
+    assert cache.stats()["bytes"] == 8 and cache.evictions == 1
+
+def test_evicts_least_recently_used_by_entries():
+    cache = PromptCache(max_entries=2)
+    for restaurant_id in (1, 2, 3):
+        cache.put(restaurant_id, "v", "x")
+
+    assert [cache.get(restaurant_id, "v") for restaurant_id in (1, 2, 3)] == [None, "x", "x"]
+    assert cache.stats()["entries"] == 2
+
+def test_oversized_value_is_not_cached():
+    cache = PromptCache(max_bytes=3)
+    cache.put(1, "v", "small")
+
+    assert cache.get(1, "v") is None and cache.stats()["bytes"] == 0
+
+def test_missing_restaurants_expire_after_the_ttl(clock):
+    cache = PromptCache(negative_ttl=30)
+    cache.mark_missing(9)
+
+    assert cache.is_known_missing(9)
+    clock.now += 31
+    assert not cache.is_known_missing(9)
+    assert cache.stats()["negative_entries"] == 0
+
+    cache.mark_missing(9)
+    cache.put(9, "v", "created since")
+    assert not cache.is_known_missing(9)
+
+def test_recent_entries_skip_the_version_check_until_the_ttl(clock):
+    cache = PromptCache(version_ttl=5)
+    cache.put(1, "v1", "prompt")
+
+    assert cache.get_recent(1) == "prompt"
+    clock.now += 5
+    assert cache.get_recent(1) is None
+    assert cache.get(1, "v1") == "prompt"  # Confirming the version starts the TTL again
+    assert cache.get_recent(1) == "prompt"
+    cache.invalidate(1)
+    assert cache.get_recent(1) is None
+
+def test_stats():
+    cache = PromptCache()
+    cache.put(1, "v", "abc")
+    cache.get(1, "v")
+    cache.get(1, "old")
+    cache.get_recent(1)
+    cache.mark_missing(2)
+    cache.is_known_missing(2)
+
+    stats = cache.stats()
+
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["unchecked_hits"] == 1 and stats["negative_hits"] == 1
+    assert (stats["entries"], stats["negative_entries"], stats["bytes"]) == (1, 1, 3)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Restaurant(id=1, name="Bistro", updated_at=datetime(2026, 10, 1)))
+    session.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    prompt_cache.clear()
+    yield session, statements
+    prompt_cache.clear()
+    session.close()
+    engine.dispose()
+
+def test_chat_turns_within_the_ttl_do_not_query_the_restaurant(db, clock):
+    session, statements = db
+    service = ChatbotService(session)
+    service.llm_backend = type("Backend", (), {"configured": True})()
+
+    first, _ = service._load_snapshot(1, "s")
+    statements.clear()
+    assert service._load_snapshot(1, "s")[0] is first
+    assert statements == []
+
+    clock.now += prompt_cache.version_ttl
+    assert service._load_snapshot(1, "s")[0] is first  # Version re-checked, snapshot reused
+    assert len(statements) == 1
+
+    RestaurantService.touch_restaurant(session, 1)
+    session.commit()
+    assert service._load_snapshot(1, "s")[0] is not first
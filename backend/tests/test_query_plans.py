@@ -0,0 +1,138 @@
+# backend test file for query plans of the hot service queries
+#
+# Runs EXPLAIN on every statement a service call issues and fails if any of
+# them falls back to a full table scan. Uses in-memory SQLite by default; set
+# TEST_DATABASE_URL to a scratch PostgreSQL database to check real plans
+# (sequential scans are disabled there, so a Seq Scan means no usable index).
+
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database.models import (
+    Base, Restaurant, Location, OperatingHours, Menu, MenuCategory, MenuItem,
+    MenuItemIngredient, FAQ, ChatbotLog, ReservationSettings
+)
+from services.database_services import (
+    RestaurantService, LocationService, OperatingHoursService, MenuService,
+    FAQService, ChatbotLogService, ChatbotDataService
+)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Tables whose rows grow with restaurants, menus or traffic
+HOT_TABLES = {
+    "restaurants", "locations", "operating_hours", "menus", "menu_categories",
+    "menu_items", "menu_item_ingredients", "faqs", "chatbot_logs", "reservation_settings"
+}
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine(TEST_DATABASE_URL or "sqlite://")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed(sessionmaker(bind=engine)())
+    yield engine
+    if TEST_DATABASE_URL:
+        Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            session.statements.append((statement, parameters))
+
+    yield session
+    event.remove(engine, "before_cursor_execute", capture)
+    session.close()
+
+def seed(db):
+    started = datetime(2024, 1, 1)
+    for restaurant_id in range(1, 21):
+        db.add(Restaurant(id=restaurant_id, name=f"Restaurant {restaurant_id}"))
+        db.add(Location(restaurant_id=restaurant_id, address_line1="1 Main St", city="Springfield",
+                        postal_code="62701", country="US", is_primary=True))
+        db.add(ReservationSettings(restaurant_id=restaurant_id))
+        for day in range(7):
+            db.add(OperatingHours(restaurant_id=restaurant_id, day_of_week=day,
+                                  open_time="11:00:00", close_time="22:00:00"))
+        for m in range(2):
+            menu = Menu(restaurant_id=restaurant_id, name=f"Menu {m}", is_active=(m == 0))
+            for c in range(4):
+                category = MenuCategory(name=f"Category {c}", display_order=c)
+                for i in range(8):
+                    item = MenuItem(name=f"Item {c}-{i}", price=10.0, display_order=i, is_active=(i != 0))
+                    item.ingredients = [MenuItemIngredient(name="salt")]
+                    category.items.append(item)
+                menu.categories.append(category)
+            db.add(menu)
+        for f in range(10):
+            db.add(FAQ(restaurant_id=restaurant_id, question=f"Question {f}?", answer="Answer.",
+                       category=f"Category {f % 3}", display_order=f, is_active=(f != 0)))
+        for t in range(50):
+            db.add(ChatbotLog(restaurant_id=restaurant_id, session_id=f"session-{restaurant_id}-{t % 5}",
+                              user_input="Hi", chatbot_response="Hello",
+                              timestamp=started + timedelta(minutes=restaurant_id * 100 + t)))
+    db.commit()
+    db.close()
+
+def explain(db, statement, parameters):
+    """Return the plan lines for a captured statement"""
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+        return [row[0] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def full_scans(plan):
+    """Tables the plan reads in full"""
+    scanned = set()
+    for line in plan:
+        # PostgreSQL: "Seq Scan on faqs"; SQLite: "SCAN faqs" (SEARCH means an index lookup)
+        match = re.search(r"Seq Scan on (\w+)", line) or re.match(r"SCAN (\w+)", line.strip())
+        if match and match.group(1) in HOT_TABLES:
+            scanned.add(match.group(1))
+    return scanned
+
+SERVICE_QUERIES = {
+    "get_restaurant_by_id": lambda db: RestaurantService.get_restaurant_by_id(db, 7),
+    "get_locations_by_restaurant": lambda db: LocationService.get_locations_by_restaurant(db, 7),
+    "get_hours_by_restaurant": lambda db: OperatingHoursService.get_hours_by_restaurant(db, 7),
+    "is_restaurant_open_now": lambda db: OperatingHoursService.is_restaurant_open_now(db, 7),
+    "get_menus_by_restaurant": lambda db: MenuService.get_menus_by_restaurant(db, 7),
+    "get_full_menu_by_restaurant": lambda db: MenuService.get_full_menu_by_restaurant(db, 7),
+    "get_faqs_by_restaurant": lambda db: FAQService.get_faqs_by_restaurant(db, 7),
+    "get_logs_by_restaurant": lambda db: ChatbotLogService.get_logs_by_restaurant(db, 7, limit=20),
+    "get_logs_by_session": lambda db: ChatbotLogService.get_logs_by_session(db, "session-7-3"),
+    "get_recent_turns": lambda db: ChatbotLogService.get_recent_turns(db, 7, "session-7-3", 12),
+    "get_usage_aggregates": lambda db: ChatbotLogService.get_usage_aggregates(db, 7, days=30),
+    "get_restaurant_chatbot_data": lambda db: ChatbotDataService.get_restaurant_chatbot_data(db, 7),
+}
+
+@pytest.mark.parametrize("name", sorted(SERVICE_QUERIES))
+def test_service_query_uses_indexes(db, name):
+    SERVICE_QUERIES[name](db)
+    assert db.statements, f"{name} issued no queries"
+
+    for statement, parameters in db.statements:
+        plan = explain(db, statement, parameters)
+        assert not full_scans(plan), f"{name} scans {full_scans(plan)}:\n{statement}\n" + "\n".join(plan)
+
+def test_log_queries_need_no_sort(db):
+    # The (restaurant_id, timestamp) and (session_id, timestamp) indexes return rows already ordered
+    ChatbotLogService.get_logs_by_restaurant(db, 7, limit=20)
+    ChatbotLogService.get_logs_by_session(db, "session-7-3")
+
+    for statement, parameters in db.statements:
+        plan = "\n".join(explain(db, statement, parameters))
+        assert "TEMP B-TREE" not in plan and "Sort" not in plan, plan
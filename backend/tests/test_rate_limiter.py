@@ -0,0 +1,68 @@
+# backend test file for the chat rate limiter
+
+import pytest
+
+from services.rate_limiter import MemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore, sliding_window
+from utils.utils import rate_limiter
+
+def limiter(store=None, **limits):
+    settings = {"per_restaurant": None, "per_session": None, "per_ip": None}
+    settings.update(limits)
+    return RateLimiter(store=store or MemoryRateLimitStore(), enabled=True, **settings)
+
+def test_denies_over_the_limit_with_retry_after():
+    limits = limiter(per_session="3/60")
+
+    results = [limits.check(session_id="abc", now=1000.0) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert results[2].remaining == 0
+    assert results[3].scope == "session"
+    assert 1 <= results[3].retry_after <= 120
+    assert results[3].headers()["Retry-After"] == str(results[3].retry_after)
+
+def test_keys_are_counted_independently():
+    limits = limiter(per_session="1/60", per_ip="10/60")
+
+    assert limits.check(session_id="a", client_ip="1.1.1.1", now=0.0).allowed
+    assert limits.check(session_id="b", client_ip="1.1.1.1", now=0.0).allowed
+    assert not limits.check(session_id="a", client_ip="1.1.1.1", now=0.0).allowed
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_denied_requests_do_not_count_against_other_scopes(store, tmp_path):
+    store = MemoryRateLimitStore() if store == "memory" else SQLiteRateLimitStore(str(tmp_path / "limits.sqlite3"))
+    limits = limiter(store, per_session="5/60", per_ip="2/60")
+
+    results = [limits.check(session_id="a", client_ip="1.1.1.1", now=0.0) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, False, False]
+    assert results[2].scope == "ip"
+    # The two requests the IP limit refused didn't use up the session's allowance
+    result = limits.check(session_id="a", now=0.0)
+    assert result.allowed and result.scope == "session" and result.remaining == 2
+
+def test_window_slides_instead_of_resetting():
+    # 10 requests at the end of one window still weigh on the start of the next
+    allowed, _, retry_after = sliding_window(previous=10, current=0, elapsed=0, window=60, limit=10)
+    assert not allowed and round(retry_after, 6) == 6.0
+
+    allowed, estimate, _ = sliding_window(previous=10, current=0, elapsed=6, window=60, limit=10)
+    assert allowed and round(estimate, 6) == 10.0
+
+def test_sqlite_store_shares_counts_between_workers(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    worker_a = limiter(SQLiteRateLimitStore(path), per_restaurant="2/60")
+    worker_b = limiter(SQLiteRateLimitStore(path), per_restaurant="2/60")
+
+    assert worker_a.check(restaurant_id=7, now=10.0).allowed
+    assert worker_b.check(restaurant_id=7, now=10.0).allowed
+    assert not worker_a.check(restaurant_id=7, now=10.0).allowed
+    assert worker_b.check(restaurant_id=8, now=10.0).allowed
+
+def test_decorator_still_limits_calls():
+    @rate_limiter(max_calls=2, time_frame=60)
+    def endpoint():
+        return "ok"
+
+    assert [endpoint(), endpoint()] == ["ok", "ok"]
+    assert endpoint()[1] == 429
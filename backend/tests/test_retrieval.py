@@ -0,0 +1,105 @@
+# backend test file for BM25 retrieval and when restaurant snapshots use it
+
+from types import SimpleNamespace
+
+import pytest
+
+from services import restaurant_snapshot
+from services.context_serializer import count_tokens
+from services.restaurant_snapshot import RestaurantSnapshot
+from services.retrieval import BM25Index, tokenize
+
+DISHES = [
+    (1, "Margherita pizza", "tomato mozzarella basil"),
+    (2, "Salmon fillet", "grilled salmon with lemon butter"),
+    (3, "Salmon tartare", "raw salmon salmon capers on toast"),
+    (4, "Mushroom risotto", "arborio rice porcini parmesan"),
+    (5, "Tiramisu", "coffee mascarpone cocoa"),
+]
+
+def test_tokenize_drops_stopwords_and_stems_plurals():
+    assert tokenize("What are your vegan options?") == ["vegan", "option"]
+    assert tokenize("Any berries or a glass") == ["berry", "glass"]
+
+def test_bm25_ranks_by_term_weight():
+    index = BM25Index((key, f"{name} {description}") for key, name, description in DISHES)
+
+    results = index.search("salmon tartare")
+
+    assert [key for key, _ in results] == [3, 2]  # Both mention salmon; only one matches tartare
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("pizza please")[0][0] == 1
+    assert index.search("the and of") == []
+
+def test_bm25_rare_terms_outweigh_common_ones():
+    index = BM25Index([(1, "salmon lemon"), (2, "salmon capers"), (3, "salmon dill"), (4, "beef lemon")])
+
+    assert index.search("salmon beef")[0][0] == 4
+
+def test_bm25_returns_at_most_k():
+    index = BM25Index((n, f"dish {n} with rice") for n in range(50))
+
+    assert len(index.search("rice", k=7)) == 7
+    assert index.search("rice", k=0) == []
+    assert BM25Index([]).search("rice") == []
+
+def _restaurant(**overrides):
+    fields = {"id": 1, "name": "Bistro", "chatbot_greeting": None, "context_token_budget": None,
+              "faq_match_threshold": None, "timezone": None}
+    return SimpleNamespace(**{**fields, **overrides})
+
+def _data(items):
+    names = ["Salmon", "Risotto", "Curry", "Burger", "Ramen", "Tacos", "Gnocchi", "Paella"]
+    return {
+        "restaurant_info": {"name": "Bistro"},
+        "menus": [{"name": "Dinner", "categories": [{"name": "Mains", "items": [
+            {"id": n, "name": f"{names[n % len(names)]} {n}", "price": 10 + n,
+             "description": "slow cooked house special " * 3, "ingredients": [f"ingredient {n}-{i}" for i in range(4)],
+             "dietary_info": {"vegetarian": n % 2 == 0}, "popular": n == 0}
+            for n in range(items)
+        ]}]}],
+        "faqs": {"General": [{"question": "Do you have parking?", "answer": "Yes, behind the building."},
+                             {"question": "Can I bring my dog?", "answer": "Dogs are welcome on the patio."}]}
+    }
+
+def test_small_restaurants_get_their_full_context():
+    snapshot = RestaurantSnapshot(_restaurant(), _data(3))
+
+    assert not snapshot.use_retrieval and snapshot.item_index is None
+    assert snapshot.context_for("salmon") == snapshot.full_context["text"]
+
+def test_retrieval_switches_on_above_the_token_threshold(monkeypatch):
+    data = _data(6)
+    tokens = RestaurantSnapshot(_restaurant(), data).full_context["token_count"]
+
+    monkeypatch.setattr(restaurant_snapshot, "RETRIEVAL_FULL_CONTEXT_MAX_TOKENS", tokens)
+    assert not RestaurantSnapshot(_restaurant(), data).use_retrieval
+    monkeypatch.setattr(restaurant_snapshot, "RETRIEVAL_FULL_CONTEXT_MAX_TOKENS", tokens - 1)
+    assert RestaurantSnapshot(_restaurant(), data).use_retrieval
+
+def test_retrieval_switches_on_when_the_context_is_truncated():
+    snapshot = RestaurantSnapshot(_restaurant(context_token_budget=150), _data(20))
+
+    assert snapshot.full_context["truncated"]
+    assert snapshot.full_context["token_count"] <= restaurant_snapshot.RETRIEVAL_FULL_CONTEXT_MAX_TOKENS
+    assert snapshot.use_retrieval
+
+def test_retrieved_context_keeps_only_relevant_entries(monkeypatch):
+    monkeypatch.setattr(restaurant_snapshot, "RETRIEVAL_TOP_K_ITEMS", 3)
+    monkeypatch.setattr(restaurant_snapshot, "RETRIEVAL_TOP_K_FAQS", 1)
+    snapshot = RestaurantSnapshot(_restaurant(), _data(200))
+    assert snapshot.use_retrieval
+
+    context = snapshot.context_for("Is the ramen 12 any good? Also, is there parking?")
+
+    assert "Ramen 12 " in context
+    assert "parking" in context and "dog" not in context
+    assert "Risotto 1 " not in context
+    assert count_tokens(context) < snapshot.full_context["token_count"] / 5
+
+@pytest.mark.parametrize("question", ["", "hello there"])
+def test_vague_questions_fall_back_to_featured_items(question):
+    snapshot = RestaurantSnapshot(_restaurant(context_token_budget=150), _data(20))
+
+    assert "Salmon 0" in snapshot.context_for(question)  # Popular items top up a thin selection
+    assert "Risotto 1 " not in snapshot.context_for(question)
@@ -0,0 +1,67 @@
+# backend test file for the server-side conversation store
+
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import Base, ChatbotLog, Restaurant
+from services.database_services import ChatbotLogService
+from services.session_store import ConversationStore, is_follow_up
+
+def test_keeps_only_recent_bounded_turns():
+    store = ConversationStore(max_turns=2, max_message_chars=10)
+    for n in range(3):
+        store.append("s1", 1, f"question {n}", "a long answer that gets clipped")
+
+    history = store.get_history("s1", 1)
+
+    assert [m["content"] for m in history if m["role"] == "user"] == ["question 1", "question 2"]
+    assert history[1]["content"] == "a long ans..."
+
+def test_evicts_least_recently_used_and_expired_sessions(monkeypatch):
+    store = ConversationStore(max_sessions=2, ttl_seconds=60)
+    store.append("a", 1, "hi", "hello")
+    store.append("b", 1, "hi", "hello")
+    store.get_history("a", 1)
+    store.append("c", 1, "hi", "hello")
+
+    assert store.get_history("b", 1) == []
+    assert store.get_history("a", 1)
+
+    clock = time.monotonic() + 61
+    monkeypatch.setattr("services.session_store.time.monotonic", lambda: clock)
+    assert store.get_history("a", 1) == []
+    assert store.stats()["sessions"] == 0
+
+def test_sessions_are_not_shared_across_restaurants():
+    store = ConversationStore()
+    store.append("s1", 1, "Do you have vegan dishes?", "Yes, several.")
+
+    assert store.get_history("s1", 2) == []
+
+def test_reloads_missing_sessions_from_chatbot_logs():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Restaurant(id=1, name="Bistro"))
+    started = datetime(2024, 1, 1)
+    for n in range(5):
+        db.add(ChatbotLog(restaurant_id=1, session_id="s1", user_input=f"q{n}", chatbot_response=f"a{n}",
+                          timestamp=started + timedelta(minutes=n)))
+    db.add(ChatbotLog(restaurant_id=1, session_id="s1", user_input="q5", chatbot_response="Error occurred",
+                      feedback_text="Error generating chatbot response: timeout", timestamp=started + timedelta(minutes=5)))
+    db.commit()
+    store = ConversationStore(max_turns=2)
+
+    history = store.get_history("s1", 1, loader=lambda sid, n: ChatbotLogService.get_recent_turns(db, 1, sid, n))
+
+    assert [m["content"] for m in history] == ["q3", "a3", "q4", "a4"]
+    assert store.get_history("s1", 1) == history
+    assert store.stats()["reloads"] == 1
+
+def test_follow_up_detection():
+    assert is_follow_up("Is it spicy?")
+    assert is_follow_up("What about dessert?")
+    assert not is_follow_up("Do you have vegan options?")
@@ -0,0 +1,154 @@
+# backend test file for content-addressed snapshot publishing
+
+import json
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from services.blob_cache import blob_cache
+from services.snapshot_publisher import SnapshotPublisher, manifest_blob_name
+
+class FakeContainer:
+    """Records uploads like an Azure ContainerClient, honouring overwrite and ETag conditions"""
+    container_name = "restaurant-data"
+
+    def __init__(self):
+        self.blobs = {}
+        self.etags = {}
+        self.uploads = []
+        self.before_upload = None  # Lets a test slip in another worker's write
+
+    def exists(self):
+        return True
+
+    def get_blob_client(self, name):
+        container = self
+
+        class Client:
+            def download_blob(self):
+                if name not in container.blobs:
+                    raise ResourceNotFoundError("missing")
+                data, etag = container.blobs[name], container.etags[name]
+                return SimpleNamespace(readall=lambda: data, properties=SimpleNamespace(etag=etag))
+
+            def upload_blob(self, data, overwrite=False, content_settings=None, etag=None, match_condition=None):
+                if container.before_upload:
+                    hook, container.before_upload = container.before_upload, None
+                    hook(name)
+                if name in container.blobs and not overwrite:
+                    raise ResourceExistsError("exists")
+                if match_condition == MatchConditions.IfNotModified and container.etags.get(name) != etag:
+                    raise ResourceModifiedError("precondition failed")
+                container.blobs[name] = data
+                container.uploads.append(name)
+                container.etags[name] = f'"{len(container.uploads)}"'
+                return {"etag": container.etags[name]}
+        return Client()
+
+def test_unchanged_snapshots_are_not_uploaded_again(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    publisher = SnapshotPublisher()
+
+    first, changed = publisher.publish(container, 7, {"name": "Bistro", "faqs": []})
+    again, changed_again = publisher.publish(container, 7, {"faqs": [], "name": "Bistro"})
+
+    assert changed and not changed_again
+    assert first == again and first.startswith("restaurant_7/snapshots/")
+    assert container.uploads == [first, manifest_blob_name(7)]
+    assert json.loads(container.blobs[manifest_blob_name(7)])["blob"] == first
+    assert publisher.stats()["skipped"] == 1
+
+def test_changes_publish_a_new_version_and_move_the_manifest(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    publisher = SnapshotPublisher()
+    first, _ = publisher.publish(container, 7, {"name": "Bistro"})
+
+    second, changed = publisher.publish(container, 7, {"name": "Bistro Nuovo"})
+
+    assert changed and second != first
+    assert json.loads(container.blobs[manifest_blob_name(7)])["blob"] == second
+    # A restaurant already pointing at the current version is skipped by any worker
+    assert SnapshotPublisher().publish(container, 7, {"name": "Bistro Nuovo"}, current_blob=second) == (second, False)
+
+def test_background_publish_reports_the_new_blob(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    publisher = SnapshotPublisher()
+    published = []
+    done = threading.Event()
+
+    def on_published(blob_name):
+        published.append(blob_name)
+        done.set()
+
+    assert publisher.publish_in_background(container, 7, {"name": "Bistro"}, on_published=on_published)
+    assert done.wait(5)
+    publisher.shutdown()
+
+    assert published and published[0] in container.blobs
+
+def test_content_another_worker_published_is_not_uploaded_again(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    blob_name, _ = SnapshotPublisher().publish(container, 7, {"name": "Bistro"})
+    uploads = list(container.uploads)
+
+    other_worker = SnapshotPublisher()
+    assert other_worker.publish(container, 7, {"name": "Bistro"}) == (blob_name, False)
+    assert container.uploads == uploads
+    assert other_worker.publish(container, 7, {"name": "Bistro"}) == (blob_name, False)  # Remembered locally now
+    assert other_worker.stats()["skipped"] == 2
+
+def test_older_data_never_replaces_a_newer_manifest(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    read_at = datetime(2026, 10, 17, 12, 0)
+    newer, _ = SnapshotPublisher().publish(container, 7, {"name": "Bistro Nuovo"}, captured_at=read_at)
+
+    stale = SnapshotPublisher().publish(container, 7, {"name": "Bistro"}, captured_at=read_at - timedelta(seconds=1))
+
+    assert stale == (newer, False)
+    assert json.loads(container.blobs[manifest_blob_name(7)])["blob"] == newer
+
+def test_manifest_write_loses_a_race_to_newer_data(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    read_at = datetime(2026, 10, 17, 12, 0)
+    SnapshotPublisher().publish(container, 7, {"name": "Bistro"}, captured_at=read_at - timedelta(minutes=5))
+    racing = {}
+
+    def newer_worker_publishes(name):
+        if name != manifest_blob_name(7):
+            container.before_upload = newer_worker_publishes  # Wait for the manifest write
+            return
+        racing["blob"], _ = SnapshotPublisher().publish(container, 7, {"name": "Bistro Nuovo"},
+                                                       captured_at=read_at + timedelta(seconds=1))
+
+    container.before_upload = newer_worker_publishes
+
+    result = SnapshotPublisher().publish(container, 7, {"name": "Bistro Vecchio"}, captured_at=read_at)
+
+    assert result == (racing["blob"], False)  # Re-read after the failed conditional write
+    assert json.loads(container.blobs[manifest_blob_name(7)])["blob"] == racing["blob"]
+
+def test_manifest_write_retries_when_beaten_by_older_data(monkeypatch):
+    monkeypatch.setattr(blob_cache, "enabled", False)
+    container = FakeContainer()
+    read_at = datetime(2026, 10, 17, 12, 0)
+
+    def older_worker_creates_the_manifest(name):
+        if name != manifest_blob_name(7):
+            container.before_upload = older_worker_creates_the_manifest  # Wait for the manifest write
+            return
+        SnapshotPublisher().publish(container, 7, {"name": "Bistro"}, captured_at=read_at - timedelta(minutes=5))
+
+    container.before_upload = older_worker_creates_the_manifest
+    blob_name, changed = SnapshotPublisher().publish(container, 7, {"name": "Bistro Nuovo"}, captured_at=read_at)
+
+    assert changed
+    assert json.loads(container.blobs[manifest_blob_name(7)])["blob"] == blob_name
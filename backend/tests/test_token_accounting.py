@@ -0,0 +1,137 @@
+# backend test file for prompt token budgets and usage aggregates
+
+import time
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+
+from database.models import Base, ChatbotLog, Restaurant
+from services import chatbot_integration
+from services.chatbot_integration import ChatbotService
+from services.prompt_cache import prompt_cache
+from services.token_accounting import (
+    PromptTooLargeError, UsageTracker, count_prompt_tokens, fit_prompt, turn_cost
+)
+
+def _messages(history_turns):
+    messages = [{"role": "system", "content": "context " * 50}]
+    for n in range(history_turns):
+        messages.append({"role": "user", "content": f"question {n} " + "word " * 20})
+        messages.append({"role": "assistant", "content": "answer " * 20})
+    messages.append({"role": "user", "content": "Is it spicy?"})
+    return messages
+
+def test_fit_prompt_drops_oldest_turns_first():
+    messages = _messages(10)
+    budget = count_prompt_tokens(_messages(3))
+
+    fitted, tokens = fit_prompt(messages, budget)
+
+    assert tokens <= budget
+    assert tokens == count_prompt_tokens(fitted)
+    assert fitted[0]["role"] == "system" and fitted[-1]["content"] == "Is it spicy?"
+    assert fitted[1]["content"].startswith("question 7")
+
+@pytest.mark.parametrize("spare", [0, 1, 10, 20])
+def test_fit_prompt_drops_whole_turns(spare):
+    messages = _messages(4)
+    # Room for the last answer but not the question before it, so trimming
+    # one message at a time would keep the answer on its own
+    budget = count_prompt_tokens([messages[0], messages[-2], messages[-1]]) + spare
+
+    fitted, tokens = fit_prompt(messages, budget)
+
+    assert tokens <= budget
+    history = [m["role"] for m in fitted[1:-1]]
+    assert history == ["user", "assistant"] * (len(history) // 2)
+
+def test_fit_prompt_drops_a_leading_answer_first():
+    messages = _messages(2)
+    messages.insert(1, {"role": "assistant", "content": "an answer to an older question"})
+
+    fitted, _ = fit_prompt(messages, count_prompt_tokens(messages) - 1)
+
+    assert [m["role"] for m in fitted] == ["system", "user", "assistant", "user", "assistant", "user"]
+
+def test_fit_prompt_refuses_what_cannot_fit():
+    with pytest.raises(PromptTooLargeError) as error:
+        fit_prompt(_messages(2), max_prompt_tokens=20)
+    assert error.value.prompt_tokens > 20
+
+def test_turn_cost_uses_base_model_prices():
+    assert turn_cost("gpt-4-0613", 1000, 1000) == pytest.approx(0.09)
+    assert turn_cost("gpt-4o-mini-2024-07-18", 1000, 0) == pytest.approx(0.00015)
+    assert turn_cost("local-model", 1000, 1000) is None
+
+def test_usage_tracker_aggregates_per_restaurant():
+    tracker = UsageTracker()
+    tracker.record(7, "gpt-4", 1000, 100, 800.0, 850.0)
+    tracker.record("7", "gpt-4", 500, 50, 400.0, 450.0)
+    tracker.record(7, None, None, None, None, 5.0)
+
+    usage = tracker.stats("7")
+
+    assert usage["turns"] == 3 and usage["llm_turns"] == 2
+    assert usage["prompt_tokens"] == 1500
+    assert usage["avg_upstream_ms"] == 600.0
+    assert usage["cost_usd"] == pytest.approx(0.054)
+    assert tracker.stats(8)["turns"] == 0
+
+def test_stream_records_upstream_time_separately(monkeypatch):
+    class SlowStream:
+        def stream_completion(self, messages, model, temperature, max_tokens, usage=None):
+            yield "Open "
+            time.sleep(0.02)
+            yield "until 10."
+
+    def slow_restaurant_info(restaurant_id):
+        time.sleep(0.1)  # Work before the API call is not upstream time
+        return None
+
+    monkeypatch.setattr(main, "chatgpt_service", SlowStream())
+    monkeypatch.setattr(main, "get_restaurant_info", slow_restaurant_info)
+    monkeypatch.setattr(main, "check_chat_rate_limit", lambda data: None)
+
+    response = main.app.test_client().post("/api/chat/stream", json={"message": "Hours?", "restaurantId": "stream-timing"})
+    assert b"event: done" in response.get_data()
+
+    stats = main.usage_tracker.stats("stream-timing")
+    assert 20 <= stats["avg_upstream_ms"] < 100
+    assert stats["avg_total_ms"] >= stats["avg_upstream_ms"] + 100
+
+def test_oversized_chatbot_prompt_is_refused_not_reported_as_upstream_error(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Restaurant(id=1, name="Bistro", updated_at=datetime(2026, 10, 1)))
+    db.commit()
+    prompt_cache.clear()
+    monkeypatch.setattr(chatbot_integration, "fit_prompt", lambda messages: fit_prompt(messages, max_prompt_tokens=20))
+
+    async def no_upstream_call(messages, usage):
+        raise AssertionError("the LLM must not be called")
+
+    service = ChatbotService(db)
+    service.llm_backend = type("Backend", (), {"configured": True})()
+    service._complete = no_upstream_call
+
+    response = asyncio.run(service.generate_chatbot_response(1, "Tell me about the tasting menu", "s"))
+
+    assert response["source"] == "too_large" and response["error"].startswith("Message too long")
+    assert "trouble connecting" not in response["response"]
+    log = db.query(ChatbotLog).one()
+    assert log.response_source == "too_large" and log.feedback_text is None
+
+    async def stream():
+        return [event async for event in service.stream_chatbot_response(1, "Tell me about the tasting menu", "s")]
+
+    events = asyncio.run(stream())
+    assert [event["event"] for event in events] == ["error"] and events[0]["source"] == "too_large"
+    prompt_cache.clear()
+    db.close()
+    engine.dispose()
@@ -42,23 +42,24 @@ def rate_limiter(max_calls, time_frame):
     """
     Decorator to implement rate limiting
     
+    Counts calls to the decorated function with a thread-safe, O(1)
+    sliding-window counter. For per-restaurant, per-session and per-IP
+    limits shared across workers, use services.rate_limiter instead.
+    
     Args:
         max_calls (int): Maximum number of calls allowed in the time frame
         time_frame (int): Time frame in seconds
     """
-    calls = []
+    from services.rate_limiter import MemoryRateLimitStore
+    store = MemoryRateLimitStore()
     
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            now = time.time()
-            
-            # Remove calls older than the time frame
-            while calls and calls[0] < now - time_frame:
-                calls.pop(0)
+            allowed, _, _ = store.hit(func.__qualname__, max_calls, time_frame, time.time())
                 
             # Check if we've reached the maximum number of calls
-            if len(calls) >= max_calls:
+            if not allowed:
                 logger.warning(f"Rate limit exceeded: {max_calls} calls in {time_frame} seconds")
                 return {
                     "error": "Rate limit exceeded",
@@ -66,7 +67,6 @@ def rate_limiter(max_calls, time_frame):
                     "status_code": 429
                 }, 429
                 
-            calls.append(now)
             return func(*args, **kwargs)
         return wrapper
     return decorator
@@ -95,3 +95,13 @@ def log_api_call(endpoint, request_data, response_data, duration_ms):
         f"Request: {json.dumps(request_data)[:200]} | "
         f"Response: {json.dumps(response_data)[:200]}"
     )
+
+def format_sse(event, data):
+    """
+    Format a Server-Sent Events message
+    
+    Args:
+        event (str): The event name (e.g. 'token', 'done', 'error')
+        data (dict): JSON-serializable payload for the event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
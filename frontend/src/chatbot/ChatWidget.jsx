@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import ChatMessage from './ChatMessage';
 import ChatInput from './ChatInput';
+import { streamMessage } from '../services/chatService';
 import './ChatStyles.css';
 
 const ChatWidget = ({ restaurantId, theme = 'light' }) => {
@@ -25,37 +26,40 @@ const ChatWidget = ({ restaurantId, theme = 'light' }) => {
     // Set loading state
     setIsLoading(true);
     
+    const botMessageId = messages.length + 2;
+    
+    // Add the bot message on the first token, then update it in place
+    const upsertBotMessage = (botText) => {
+      setMessages(prev => {
+        if (prev.some(message => message.id === botMessageId)) {
+          return prev.map(message => 
+            message.id === botMessageId ? { ...message, text: botText } : message
+          );
+        }
+        return [...prev, { id: botMessageId, text: botText, sender: 'bot' }];
+      });
+    };
+    
     try {
-      // Make API call to your backend
-      const response = await fetch('http://localhost:5000/api/chat', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          message: text,
-          restaurantId: restaurantId || 'demo-restaurant'
-        }),
+      // Stream the response from the backend, updating the bot message as tokens arrive
+      const result = await streamMessage(text, restaurantId || 'demo-restaurant', (token, fullText) => {
+        setIsLoading(false);
+        upsertBotMessage(fullText);
       });
       
-      if (!response.ok) {
-        throw new Error('Network response was not ok');
+      if (result.error) {
+        // Keep any text that already arrived, but make the failure visible
+        upsertBotMessage(result.partialMessage
+          ? `${result.partialMessage}\n\n(The response was interrupted. ${result.message})`
+          : result.message);
+      } else {
+        upsertBotMessage(result.message);
       }
-      
-      const data = await response.json();
-      
-      // Add bot response
-      const botResponse = { 
-        id: messages.length + 2, 
-        text: data.message, 
-        sender: 'bot' 
-      };
-      setMessages(prev => [...prev, botResponse]);
     } catch (error) {
       console.error('Error:', error);
       // Add error message
       const errorResponse = { 
-        id: messages.length + 2, 
+        id: botMessageId, 
         text: "Sorry, I'm having trouble connecting to the server. Please try again later.", 
         sender: 'bot' 
       };
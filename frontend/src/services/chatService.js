@@ -3,6 +3,9 @@ const API_URL = process.env.NODE_ENV === 'production'
   ? 'https://api.yourdomain.com' 
   : 'http://localhost:5000';
 
+// The server keeps each conversation's history; we only send back its session id
+const sessionIds = {};
+
 export const sendMessage = async (message, restaurantId) => {
   try {
     const response = await fetch(`${API_URL}/api/chat`, {
@@ -12,7 +15,8 @@ export const sendMessage = async (message, restaurantId) => {
       },
       body: JSON.stringify({
         message,
-        restaurantId
+        restaurantId,
+        session_id: sessionIds[restaurantId]
       }),
     });
     
@@ -21,6 +25,7 @@ export const sendMessage = async (message, restaurantId) => {
     }
     
     const data = await response.json();
+    if (data.session_id) sessionIds[restaurantId] = data.session_id;
     
     // Handle the updated response format
     return {
@@ -38,6 +43,92 @@ export const sendMessage = async (message, restaurantId) => {
   }
 };
 
+// Stream a chat response from /api/chat/stream (Server-Sent Events).
+// onToken is called with each chunk of text as it arrives; the returned
+// promise resolves with the full message once the stream has finished,
+// or with error: true (and the partial text) if it fails midway.
+export const streamMessage = async (message, restaurantId, onToken) => {
+  let fullMessage = '';
+  let doneData = null;
+
+  try {
+    const response = await fetch(`${API_URL}/api/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+      },
+      body: JSON.stringify({
+        message,
+        restaurantId,
+        session_id: sessionIds[restaurantId]
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error('Network response was not ok');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE events are separated by a blank line
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let eventName = 'message';
+        let dataLine = '';
+        rawEvent.split('\n').forEach(line => {
+          if (line.startsWith('event:')) eventName = line.slice(6).trim();
+          if (line.startsWith('data:')) dataLine += line.slice(5).trim();
+        });
+        if (!dataLine) continue;
+
+        const data = JSON.parse(dataLine);
+        if (eventName === 'token') {
+          fullMessage += data.content;
+          if (onToken) onToken(data.content, fullMessage);
+        } else if (eventName === 'done') {
+          doneData = data;
+          if (data.session_id) sessionIds[restaurantId] = data.session_id;
+        } else if (eventName === 'error') {
+          throw new Error(data.error || 'Stream error');
+        }
+      }
+    }
+
+    // A stream that ends without a done event was cut off midway
+    if (!doneData) {
+      throw new Error('Stream ended before the response was complete');
+    }
+
+    return {
+      message: fullMessage || "Sorry, I couldn't process your request.",
+      error: false,
+      finish_reason: doneData ? doneData.finish_reason : null,
+      time_to_first_token_ms: doneData ? doneData.time_to_first_token_ms : null
+    };
+  } catch (error) {
+    console.error('Error streaming message:', error);
+    // partialMessage is whatever text arrived before the failure, so the caller can keep showing it
+    return {
+      message: "Sorry, I'm having trouble connecting to the server. Please try again later.",
+      partialMessage: fullMessage,
+      error: true
+    };
+  }
+};
+
 export const getRestaurantInfo = async (restaurantId) => {
   try {
     const response = await fetch(`${API_URL}/api/restaurant/${restaurantId}`);